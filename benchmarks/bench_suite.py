@@ -0,0 +1,226 @@
+#!/usr/bin/python
+"""
+    bench suite
+    ~~~~~~~~~~~
+
+    Scaling benchmarks on synthetic Enron shaped data.
+
+    For every dataset size the suite times featureFormat,
+    outliers.screen, email_ratios, feature_scaling.scale,
+    feature_selection.selection, each tune function and
+    tester.test_classifier, and records wall time,
+    throughput (rows per second) and peak traced memory.
+
+    Results are compared with stored baselines in
+    baselines.json next to this file; a benchmark more
+    than --tolerance times slower than its baseline is
+    reported as a regression. Regressions and failed
+    benchmarks give an exit code of 1.
+
+    usage: python benchmarks/bench_suite.py [--sizes 1000 10000]
+                                            [--only NAME ...] [--save]
+"""
+from __future__ import print_function
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+
+file_dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.dirname(file_dir))
+
+from learnEnron import (  # noqa: E402
+                        feature_engineering,
+                        feature_format,
+                        feature_scaling,
+                        feature_selection,
+                        outliers,
+                        synthetic,
+                        tune
+                        )
+
+BASELINE_FILE = os.path.join(file_dir, "baselines.json")
+
+FEATURES = ["poi"] + synthetic.FINANCIAL_FEATURES + synthetic.EMAIL_FEATURES
+
+
+def _formatted(data):
+    matrix = feature_format.featureFormat(data, FEATURES, sort_keys=True)
+    return feature_format.targetFeatureSplit(matrix)
+
+
+def bench_feature_format(data):
+    feature_format.featureFormat(data, FEATURES, sort_keys=True)
+
+
+def bench_outliers(data):
+    outliers.screen(data)
+
+
+def bench_email_ratios(data):
+    feature_engineering.email_ratios(data)
+
+
+def bench_scale(data):
+    feature_scaling.scale(data, FEATURES[1:])
+
+
+def bench_selection(data):
+    feature_selection.selection(data, list(FEATURES),
+                                feature_selection.get_fs_clf())
+
+
+def bench_tune_gb(data):
+    labels, features = _formatted(data)
+    tune.param_optimize_gb(features, labels, grid_search=False)
+
+
+def bench_tune_lr(data):
+    labels, features = _formatted(data)
+    tune.param_optimize_lr(features, labels, grid_search=False)
+
+
+def bench_tune_lr_pipe(data):
+    labels, features = _formatted(data)
+    tune.param_optimize_lr_pipe(features, labels, grid_search=False)
+
+
+def bench_tester(data):
+    import tester
+    from sklearn.linear_model import LogisticRegression
+    tester.test_classifier(LogisticRegression(), data, FEATURES, folds=100)
+
+
+BENCHMARKS = [
+              ("featureFormat", bench_feature_format),
+              ("outliers", bench_outliers),
+              ("email_ratios", bench_email_ratios),
+              ("scale", bench_scale),
+              ("selection", bench_selection),
+              ("tune_gb", bench_tune_gb),
+              ("tune_lr", bench_tune_lr),
+              ("tune_lr_pipe", bench_tune_lr_pipe),
+              ("test_classifier", bench_tester)
+              ]
+
+
+def run_one(func, data):
+    """
+    Time one benchmark, with stdout and warnings silenced.
+
+    Returns
+    -------
+    result = dict
+        wall_s, rows_per_s and peak_mb, or error.
+    """
+
+    tracemalloc.start()
+    t0 = time.time()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), \
+                warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            func(data)
+    except Exception as e:
+        message = str(e).strip().split("\n")[0]
+        return {"error": "{0}: {1}".format(type(e).__name__, message)}
+    finally:
+        wall = time.time() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+            "wall_s": round(wall, 4),
+            "rows_per_s": round(len(data) / wall, 1) if wall else None,
+            "peak_mb": round(peak / 1e6, 2)
+            }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scaling benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--only", nargs="+", default=None,
+                        help="benchmark names to run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--typed", action="store_true",
+                        help="run on columnar.TypedDataset instead of dicts")
+    parser.add_argument("--dtype", default="float64",
+                        choices=["float64", "float32"],
+                        help="column dtype of the typed dataset")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="slowdown factor reported as a regression")
+    parser.add_argument("--save", action="store_true",
+                        help="store the results as the new baselines")
+    args = parser.parse_args(argv)
+    if args.dtype != "float64" and not args.typed:
+        parser.error("--dtype needs --typed")
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+
+    profile = synthetic.fit_profile()
+    results = {}
+    regressions = []
+    errors = []
+
+    for n in args.sizes:
+        columns = synthetic.generate_columns(n, profile, seed=args.seed)
+        if args.typed:
+            data = synthetic.to_typed(columns).astype(args.dtype)
+        else:
+            data = synthetic.to_datadict(columns)
+        for name, func in BENCHMARKS:
+            if args.only and name not in args.only:
+                continue
+
+            key = "{0}{1}{2}@{3}".format(
+                  name, ":typed" if args.typed else "",
+                  "" if args.dtype == "float64" else ":" + args.dtype, n)
+            # Benchmarks may modify the dict, give each a fresh copy.
+            # Typed datasets are never changed in place.
+            result = run_one(func, data if args.typed else
+                             dict((k, dict(v)) for k, v in data.items()))
+            results[key] = result
+
+            line = "{0:<34}".format(key)
+            if "error" in result:
+                line += " failed: " + result["error"]
+                errors.append(key)
+            else:
+                line += " {0:>9.3f} s {1:>12} rows/s {2:>9.2f} MB".format(
+                        result["wall_s"], result["rows_per_s"], result["peak_mb"])
+                base = baselines.get(key, {}).get("wall_s")
+                if base:
+                    ratio = result["wall_s"] / base
+                    line += "  x{0:.2f} vs baseline".format(ratio)
+                    if ratio > args.tolerance:
+                        line += "  REGRESSION"
+                        regressions.append(key)
+            print(line)
+
+    if args.save:
+        baselines.update((k, v) for k, v in results.items() if "error" not in v)
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=4, sort_keys=True)
+        print("baselines written to", args.baseline)
+
+    if errors:
+        print("{0} benchmarks failed: {1}".format(len(errors),
+                                                  ", ".join(errors)))
+    if regressions:
+        print("{0} regressions: {1}".format(len(regressions),
+                                            ", ".join(regressions)))
+
+    return 1 if regressions or errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
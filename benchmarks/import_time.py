@@ -0,0 +1,128 @@
+#!/usr/bin/python
+"""
+    import time
+    ~~~~~~~~~~~
+
+    Measure the import cost of the project scripts
+    with python -X importtime and fail if a budget
+    is exceeded.
+
+    Only the top level import statements of each
+    script are run, so poi_id.py is measured without
+    running the pipeline itself.
+
+    Budgets are in milliseconds and kept in
+    import_budget.json next to this file.
+
+    usage: python benchmarks/import_time.py [--budget FILE] [--repeat N]
+"""
+from __future__ import print_function
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+file_dir = os.path.dirname(os.path.realpath(__file__))
+project_dir = os.path.dirname(file_dir)
+BUDGET_FILE = os.path.join(file_dir, "import_budget.json")
+
+
+def import_statements(script):
+    """
+    Source of the top level import statements
+    of a script, in order.
+    """
+
+    with open(script) as f:
+        source = f.read()
+    tree = ast.parse(source)
+    lines = source.splitlines()
+
+    statements = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            end = getattr(node, "end_lineno", node.lineno)
+            statements.append("\n".join(lines[node.lineno - 1:end]))
+
+    return "\n".join(statements)
+
+
+def parse_importtime(stderr):
+    """
+    Parse -X importtime output.
+
+    Returns
+    -------
+    total = float
+        Cumulative time of the top level imports in ms.
+    modules = list
+        (cumulative ms, module) for every top level
+        import, slowest first.
+    """
+
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        # Nested imports are indented under their parent.
+        if len(name) - len(name.lstrip()) == 1:
+            modules.append((int(cumulative) / 1000.0, name.strip()))
+
+    modules.sort(reverse=True)
+
+    return sum(ms for ms, _ in modules), modules
+
+
+def measure(script, python=sys.executable):
+    """Run the imports of script under -X importtime."""
+
+    code = import_statements(script)
+    process = subprocess.Popen(
+                               [python, "-X", "importtime", "-c", code],
+                               cwd=project_dir,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE,
+                               universal_newlines=True
+                               )
+    _, stderr = process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError("importing {0} failed:\n{1}".format(script, stderr))
+
+    return parse_importtime(stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import time budget check")
+    parser.add_argument("--budget", default=BUDGET_FILE)
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="take the best of N runs")
+    parser.add_argument("--top", type=int, default=5,
+                        help="slowest imports to report")
+    args = parser.parse_args(argv)
+
+    with open(args.budget) as f:
+        budgets = json.load(f)
+
+    failed = False
+    for script, budget in sorted(budgets.items()):
+        runs = [measure(os.path.join(project_dir, script))
+                for _ in range(args.repeat)]
+        total, modules = min(runs)
+
+        status = "ok" if total <= budget else "OVER BUDGET"
+        failed = failed or total > budget
+        print("{0}: {1:.1f} ms (budget {2} ms) {3}"
+              .format(script, total, budget, status))
+        for ms, name in modules[:args.top]:
+            print("    {0:8.1f} ms  {1}".format(ms, name))
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
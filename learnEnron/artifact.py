@@ -0,0 +1,295 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    artifact
+    ~~~~~~~~
+
+    Versioned bundle for the classifier, the dataset
+    and the feature list written by poi_id.py.
+
+    Instead of pickling the whole dict of dicts, the
+    bundle keeps only the selected features as one
+    float column per feature (NaN for missing
+    values), in person name order. Columns keep the
+    dtype of a columnar.TypedDataset, so a float32
+    run is tested in float32; plain dicts give float64.
+
+        my_artifact/
+            manifest.json   format version, features,
+                            dtype, fitted scaling, sha256
+                            of every other file
+            classifier.pkl
+            columns.npy     (n_features, n_people)
+            names.json      sorted person names
+
+    Files are read lazily: the columns are memory
+    mapped, and each file is checked against its
+    manifest checksum the first time it is used.
+"""
+from __future__ import print_function
+import json
+import os
+import pickle
+import shutil
+import numpy as np
+from .fileutil import file_digest
+
+FORMAT = "learnEnron-artifact"
+VERSION = 1
+MANIFEST_FILENAME = "manifest.json"
+CLASSIFIER_FILENAME = "classifier.pkl"
+COLUMNS_FILENAME = "columns.npy"
+NAMES_FILENAME = "names.json"
+
+
+def _column(dataset, names, feature):
+    """One feature of every person as floats, NaN if missing."""
+
+    if hasattr(dataset, "column"):
+        # columnar.TypedDataset, rows already sorted
+        return dataset.column(feature, np.nan)
+
+    column = np.empty(len(names), dtype=np.float64)
+    for i, name in enumerate(names):
+        value = dataset[name][feature]
+        column[i] = np.nan if value == "NaN" else float(value)
+
+    return column
+
+
+def write_bundle(path, clf, dataset, feature_list, scaling=None):
+    """
+    Write a bundle holding only the features in feature_list.
+
+    The bundle is built next to path and moved into
+    place at the end, so an existing bundle is never
+    left half written.
+
+    Parameters
+    ----------
+    path = string
+        Bundle directory.
+    clf = classifier
+    dataset = dict or columnar.TypedDataset
+        Dataset keyed by person. The columns are
+        stored in the dtype of a TypedDataset.
+    feature_list = list
+        Features to keep, "poi" first.
+    scaling = feature_scaling.ScalingTransform
+        Fitted scaling of the dataset, stored so new
+        records can be scaled the same way.
+    """
+
+    names = sorted(dataset.keys())
+    features = list(feature_list)
+    tmp = path + ".tmp"
+    if os.path.isdir(tmp):
+        shutil.rmtree(tmp)
+    os.makedirs(tmp)
+
+    dtype = np.dtype(getattr(dataset, "dtype", np.float64))
+    columns = np.empty((len(features), len(names)), dtype=dtype)
+    for j, feature in enumerate(features):
+        columns[j] = _column(dataset, names, feature)
+    np.save(os.path.join(tmp, COLUMNS_FILENAME), columns)
+
+    with open(os.path.join(tmp, NAMES_FILENAME), "w") as out:
+        json.dump(names, out)
+    with open(os.path.join(tmp, CLASSIFIER_FILENAME), "wb") as out:
+        pickle.dump(clf, out, protocol=2)
+
+    files = [CLASSIFIER_FILENAME, COLUMNS_FILENAME, NAMES_FILENAME]
+    manifest = {
+                "format": FORMAT,
+                "version": VERSION,
+                "features": features,
+                "rows": len(names),
+                "dtype": dtype.name,
+                "scaling": scaling.to_dict() if scaling is not None else None,
+                "files": dict((name, file_digest(os.path.join(tmp, name)))
+                              for name in files)
+                }
+    with open(os.path.join(tmp, MANIFEST_FILENAME), "w") as out:
+        json.dump(manifest, out, indent=4, sort_keys=True)
+
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.rename(tmp, path)
+
+
+def is_bundle(path):
+    return os.path.isfile(os.path.join(path, MANIFEST_FILENAME))
+
+
+class ColumnarDataset(object):
+    """
+    Read only view of a bundle's columns that
+    behaves like the dict of dicts dataset.
+
+    dataset[name][feature] gives floats, bools for
+    "poi" and "NaN" for missing values. featureFormat
+    hands its work to feature_matrix, which works on
+    whole columns instead of row by row.
+    """
+
+    def __init__(self, bundle):
+        self._bundle = bundle
+        self.features = bundle.feature_list
+        self.dtype = bundle.dtype
+        self._position = dict((f, j) for j, f in enumerate(self.features))
+        self._rows = None
+
+    @property
+    def columns(self):
+        return self._bundle.columns
+
+    def _row_index(self):
+        if self._rows is None:
+            self._rows = dict((name, i) for i, name
+                              in enumerate(self._bundle.names))
+        return self._rows
+
+    def __len__(self):
+        return self._bundle.rows
+
+    def __iter__(self):
+        return iter(self._bundle.names)
+
+    def keys(self):
+        return list(self._bundle.names)
+
+    def __contains__(self, name):
+        return name in self._row_index()
+
+    def __getitem__(self, name):
+        i = self._row_index()[name]
+        person = {}
+        for j, feature in enumerate(self.features):
+            value = float(self.columns[j, i])
+            if value != value:
+                person[feature] = "NaN"
+            elif feature == "poi":
+                person[feature] = bool(value)
+            else:
+                person[feature] = value
+
+        return person
+
+    def items(self):
+        return [(name, self[name]) for name in self]
+
+    def values(self):
+        return [self[name] for name in self]
+
+    def feature_matrix(self, features, remove_NaN=True,
+                       remove_all_zeroes=True, remove_any_zeroes=False,
+                       dtype=None):
+        """
+        Same result as featureFormat with sort_keys=True,
+        computed on the stored columns. dtype defaults
+        to the dtype the bundle was written in.
+        """
+
+        for feature in features:
+            if feature not in self._position:
+                print("error: key ", feature, " not present")
+                return
+
+        rows = [self._position[f] for f in features]
+        data = np.array(self.columns[rows].T, dtype=dtype or self.dtype)
+        if remove_NaN:
+            data[np.isnan(data)] = 0
+
+        test = data[:, 1:] if features[0] == "poi" else data
+        keep = np.ones(len(data), dtype=bool)
+        if remove_all_zeroes:
+            keep &= (test != 0).any(axis=1)
+        if remove_any_zeroes:
+            keep &= ~(test == 0).any(axis=1)
+
+        return data[keep]
+
+
+class ArtifactBundle(object):
+    """
+    Lazily loaded bundle.
+
+    Example
+    -------
+    bundle = ArtifactBundle("my_artifact")
+    clf = bundle.classifier
+    data = featureFormat(bundle.dataset, bundle.feature_list)
+
+    Parameters
+    ----------
+    path = string
+        Bundle directory.
+    verify = Boolean
+        Check each file's sha256 before first use.
+    """
+
+    def __init__(self, path, verify=True):
+        self.path = path
+        self.verify = verify
+        with open(os.path.join(path, MANIFEST_FILENAME)) as f:
+            self.manifest = json.load(f)
+
+        if self.manifest.get("format") != FORMAT:
+            raise ValueError("{0} is not an artifact bundle".format(path))
+        if self.manifest.get("version", 0) > VERSION:
+            raise ValueError("artifact version {0} is newer than supported "
+                             "version {1}".format(self.manifest["version"],
+                                                  VERSION))
+
+        self.feature_list = list(self.manifest["features"])
+        self.rows = self.manifest["rows"]
+        # Bundles written before the dtype was recorded are float64.
+        self.dtype = np.dtype(self.manifest.get("dtype", "float64"))
+        self._loaded = {}
+
+    def _file(self, name):
+        """Path of a bundle file, checked against the manifest."""
+
+        path = os.path.join(self.path, name)
+        if self.verify and file_digest(path) != self.manifest["files"][name]:
+            raise ValueError("checksum mismatch for {0}".format(path))
+
+        return path
+
+    @property
+    def classifier(self):
+        if "classifier" not in self._loaded:
+            with open(self._file(CLASSIFIER_FILENAME), "rb") as f:
+                self._loaded["classifier"] = pickle.load(f)
+        return self._loaded["classifier"]
+
+    @property
+    def columns(self):
+        if "columns" not in self._loaded:
+            self._loaded["columns"] = np.load(self._file(COLUMNS_FILENAME),
+                                              mmap_mode="r")
+        return self._loaded["columns"]
+
+    @property
+    def names(self):
+        if "names" not in self._loaded:
+            with open(self._file(NAMES_FILENAME)) as f:
+                self._loaded["names"] = json.load(f)
+        return self._loaded["names"]
+
+    @property
+    def scaling(self):
+        """Fitted ScalingTransform, None if the data was not scaled."""
+
+        state = self.manifest.get("scaling")
+        if state is None:
+            return None
+        from .feature_scaling import ScalingTransform
+
+        return ScalingTransform.from_dict(state)
+
+    @property
+    def dataset(self):
+        if "dataset" not in self._loaded:
+            self._loaded["dataset"] = ColumnarDataset(self)
+        return self._loaded["dataset"]
@@ -0,0 +1,288 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    author id
+    ~~~~~~~~~
+
+    Out-of-core author identification on the
+    from_sara / from_chris corpus.
+
+    Emails are streamed from disk, parsed with
+    parseOutText, hashed into a fixed width sparse
+    matrix and fed in mini-batches to classifiers
+    with partial_fit. Only one batch of text is held
+    in memory at a time.
+"""
+from __future__ import print_function
+import io
+import os
+import pickle
+import zlib
+from time import time
+from .parse_out_email_txt import parseOutText
+
+file_dir = os.path.dirname(os.path.realpath(__file__))
+resources_dir = os.path.join(file_dir, "..", "resources")
+
+# Email lists in label order: the first block of
+# email_authors.pkl is Sara (0), the second Chris (1).
+AUTHOR_FILES = [
+                os.path.join(resources_dir, "other_data", "from_sara.txt"),
+                os.path.join(resources_dir, "other_data", "from_chris.txt")
+                ]
+AUTHOR_LABELS = os.path.join(resources_dir, "tools", "email_authors.pkl")
+
+CLASSES = [0, 1]
+
+
+def get_author_clfs():
+    """
+    Classifiers that support partial_fit,
+    keyed by a short name.
+    """
+
+    from sklearn.linear_model import SGDClassifier, Perceptron
+    from sklearn.naive_bayes import MultinomialNB
+
+    clfs = {
+            "sgd": SGDClassifier(alpha=1e-5),
+            "perceptron": Perceptron(),
+            "naive_bayes": MultinomialNB(alpha=0.01)
+            }
+
+    return clfs
+
+
+def get_vectorizer(n_features=2 ** 18):
+    """
+    Stateless hashing vectorizer with non-negative
+    values, so it also suits MultinomialNB.
+    """
+
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    try:
+        return HashingVectorizer(n_features=n_features,
+                                 alternate_sign=False,
+                                 stop_words="english")
+    except TypeError:
+        # scikit-learn < 0.19
+        return HashingVectorizer(n_features=n_features,
+                                 non_negative=True,
+                                 stop_words="english")
+
+
+def load_author_labels(path=AUTHOR_LABELS):
+    """Load the label list from email_authors.pkl."""
+
+    with open(path, "rb") as labels_file:
+        return pickle.load(labels_file)
+
+
+def _count_lines(path):
+    with open(path, "r") as f:
+        return sum(1 for _ in f)
+
+
+def _labelled_paths(path, labels, offset):
+    with open(path, "r") as f:
+        for i, line in enumerate(f):
+            yield line.strip(), labels[offset + i]
+
+
+def labelled_emails(author_files=AUTHOR_FILES, labels=None):
+    """
+    Yield (email path, label) pairs.
+
+    The author files are read in turn, one line
+    from each, so every mini-batch holds both
+    authors. Labels come from email_authors.pkl,
+    which lists all of the first file's emails
+    before the second's.
+
+    Parameters
+    ----------
+    author_files = list
+        Files listing email paths, one per line.
+    labels = list
+        Defaults to load_author_labels().
+    """
+
+    if labels is None:
+        labels = load_author_labels()
+
+    streams = []
+    offset = 0
+    for path in author_files:
+        streams.append(_labelled_paths(path, labels, offset))
+        offset += _count_lines(path)
+
+    if offset != len(labels):
+        raise ValueError("{0} emails listed but {1} labels"
+                         .format(offset, len(labels)))
+
+    while streams:
+        for stream in list(streams):
+            try:
+                yield next(stream)
+            except StopIteration:
+                streams.remove(stream)
+
+
+def is_test(email_path, test_size):
+    """
+    Held-out split decided by a hash of the path,
+    so it is stable between runs and needs no state.
+    """
+
+    bucket = zlib.crc32(email_path.encode("utf-8")) % 1000
+
+    return bucket < test_size * 1000
+
+
+def read_email(corpus_dir, email_path, stem=True):
+    """Parse one email from the corpus with parseOutText."""
+
+    # Not every Enron email is valid UTF-8.
+    with io.open(os.path.join(corpus_dir, email_path),
+                 encoding="latin-1") as email_file:
+        return parseOutText(email_file, stem=stem)
+
+
+def store_reader(store, stem=True):
+    """
+    Reader for batches that takes emails from a
+    mail_store.MailStore instead of the maildir.
+    The corpus_dir argument is then ignored.
+    """
+
+    def reader(corpus_dir, email_path):
+        return parseOutText(store.open_text(email_path), stem=stem)
+
+    return reader
+
+
+def batches(corpus_dir, test=False, test_size=0.1, batch_size=1000,
+            reader=None, emails=None):
+    """
+    Yield (texts, labels) mini-batches from
+    either the training or the held-out set.
+
+    Parameters
+    ----------
+    corpus_dir = string
+        Directory holding the maildir folder.
+    test = Boolean
+        True yields the held-out set.
+    test_size = float
+        Share of emails held out.
+    batch_size = int
+        Emails per batch.
+    reader = function
+        Called as reader(corpus_dir, email_path), defaults
+        to read_email. See store_reader to read from a
+        mail store. A ParsedTextCache can be plugged in
+        with lambda d, p: cache.parse(os.path.join(d, p)).
+    emails = iterable
+        (path, label) pairs, defaults to labelled_emails().
+    """
+
+    if reader is None:
+        reader = read_email
+    if emails is None:
+        emails = labelled_emails()
+
+    texts, labels = [], []
+    for email_path, label in emails:
+        if is_test(email_path, test_size) != test:
+            continue
+        texts.append(reader(corpus_dir, email_path))
+        labels.append(label)
+        if len(texts) == batch_size:
+            yield texts, labels
+            texts, labels = [], []
+
+    if texts:
+        yield texts, labels
+
+
+def train(corpus_dir, clfs=None, test_size=0.1, batch_size=1000,
+          n_features=2 ** 18, reader=None, author_files=AUTHOR_FILES,
+          labels=None):
+    """
+    Train every classifier in one streaming pass,
+    then score them on the held-out set.
+
+    Parameters
+    ----------
+    corpus_dir = string
+        Directory holding the maildir folder.
+    clfs = dict
+        Name mapped to a classifier with partial_fit,
+        defaults to get_author_clfs().
+    test_size = float
+        Share of emails held out.
+    batch_size = int
+        Emails per mini-batch.
+    n_features = int
+        Width of the hashed feature space.
+    reader = function
+        See batches.
+    author_files = list
+        Files listing email paths, see labelled_emails.
+    labels = list
+        Defaults to load_author_labels().
+
+    Returns
+    -------
+    clfs = dict
+        The fitted classifiers.
+    results = dict
+        Name mapped to accuracy, precision and
+        recall on the held-out set (Chris as positive).
+    """
+
+    if clfs is None:
+        clfs = get_author_clfs()
+    vectorizer = get_vectorizer(n_features)
+    if labels is None:
+        labels = load_author_labels()
+
+    t0 = time()
+    n_train = 0
+    for texts, y in batches(corpus_dir, False, test_size, batch_size, reader,
+                            labelled_emails(author_files, labels)):
+        features = vectorizer.transform(texts)
+        for clf in clfs.values():
+            clf.partial_fit(features, y, classes=CLASSES)
+        n_train += len(y)
+    print("trained on", n_train, "emails in", round(time()-t0, 3), "s")
+
+    counts = dict((name, [0, 0, 0, 0]) for name in clfs)
+    for texts, y in batches(corpus_dir, True, test_size, batch_size, reader,
+                            labelled_emails(author_files, labels)):
+        features = vectorizer.transform(texts)
+        for name, clf in clfs.items():
+            tp, fp, fn, tn = counts[name]
+            for prediction, truth in zip(clf.predict(features), y):
+                if prediction == 1 and truth == 1:
+                    tp += 1
+                elif prediction == 1:
+                    fp += 1
+                elif truth == 1:
+                    fn += 1
+                else:
+                    tn += 1
+            counts[name] = [tp, fp, fn, tn]
+
+    results = {}
+    for name, (tp, fp, fn, tn) in counts.items():
+        total = tp + fp + fn + tn
+        results[name] = {
+                         "accuracy": 1.0*(tp + tn)/total if total else 0.0,
+                         "precision": 1.0*tp/(tp + fp) if tp + fp else 0.0,
+                         "recall": 1.0*tp/(tp + fn) if tp + fn else 0.0
+                         }
+        print(name, results[name])
+
+    return clfs, results
@@ -0,0 +1,362 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    columnar
+    ~~~~~~~~
+
+    Typed, column oriented form of the dataset.
+
+    final_project_dataset.pkl stores every value in
+    a dict per person, with the string "NaN" for
+    missing numbers. TypedDataset converts it once
+    into one float column per numeric feature, with
+    0 in the missing slots and a packed bitmask
+    (one bit per person) recording which slots were
+    missing. Text features such as email_address are
+    kept as lists with None for missing values.
+
+    Rows are in sorted name order, so a matrix of
+    some features is the columns stacked side by
+    side, with missing values already 0 as
+    featureFormat produces them: no string
+    comparison or casting pass is needed.
+
+    The class still reads like the dict of dicts,
+    dataset[name][feature] gives "NaN" for missing
+    values, for code that has not moved to columns.
+"""
+from __future__ import print_function
+import numbers
+import numpy as np
+
+
+def _is_number(value):
+    return isinstance(value, numbers.Number)
+
+
+class TypedDataset(object):
+    """
+    Columnar dataset with missing-value masks.
+
+    Build one with from_datadict; the methods that
+    change data return a new dataset sharing the
+    unchanged columns.
+
+    Parameters
+    ----------
+    names = list
+        Sorted person names, the row order.
+    arrays = dict
+        Numeric feature mapped to a float array,
+        0 where the value is missing.
+    masks = dict
+        Feature mapped to np.packbits of its missing
+        values. Features without one have none.
+    text = dict
+        Other features mapped to lists, None
+        where missing.
+    booleans = set
+        Numeric features that were booleans (poi).
+    dtype = numpy dtype
+        float64 or float32.
+    """
+
+    def __init__(self, names, arrays, masks=None, text=None, booleans=(),
+                 dtype=np.float64):
+        self.names = list(names)
+        self.arrays = dict(arrays)
+        self.masks = dict(masks or {})
+        self.text = dict(text or {})
+        self.booleans = set(booleans)
+        self.dtype = np.dtype(dtype)
+        self._rows = None
+        self._missing = {}
+
+    @classmethod
+    def from_datadict(cls, datadict, dtype=np.float64):
+        """
+        One-time conversion from the dict of dicts
+        format, the only place "NaN" is compared.
+        """
+
+        names = sorted(datadict.keys())
+        features = set()
+        for record in datadict.values():
+            features.update(record.keys())
+
+        values, masks, text, booleans = {}, {}, {}, set()
+        for feature in sorted(features):
+            column = [datadict[name].get(feature, "NaN") for name in names]
+            missing = np.array([v == "NaN" for v in column], dtype=bool)
+            present = [v for v, m in zip(column, missing) if not m]
+
+            if all(_is_number(v) for v in present):
+                array = np.zeros(len(names), dtype=dtype)
+                array[~missing] = present
+                values[feature] = array
+                if missing.any():
+                    masks[feature] = np.packbits(missing)
+                if present and all(isinstance(v, bool) for v in present):
+                    booleans.add(feature)
+            else:
+                text[feature] = [None if m else v for v, m in zip(column, missing)]
+
+        return cls(names, values, masks, text, booleans, dtype)
+
+    def to_datadict(self):
+        """The dict of dicts format, "NaN" for missing values."""
+
+        return dict((name, self[name]) for name in self.names)
+
+    @property
+    def features(self):
+        return sorted(set(self.arrays) | set(self.text))
+
+    def missing(self, feature):
+        """Boolean array, True where feature is missing."""
+
+        if feature in self.text:
+            return np.array([v is None for v in self.text[feature]], dtype=bool)
+        if feature not in self.masks:
+            return np.zeros(len(self.names), dtype=bool)
+        if feature not in self._missing:
+            bits = np.unpackbits(self.masks[feature])[:len(self.names)]
+            self._missing[feature] = bits.astype(bool)
+
+        return self._missing[feature]
+
+    def column(self, feature, missing=0):
+        """
+        Values of a numeric feature, with missing
+        ones set to missing (e.g. np.nan).
+        """
+
+        array = self.arrays[feature]
+        if missing == 0 or feature not in self.masks:
+            return array
+        array = array.copy()
+        array[self.missing(feature)] = missing
+
+        return array
+
+    def matrix(self, features, missing=0, rows=None, dtype=None):
+        """
+        (rows x features) array of numeric features.
+
+        Parameters
+        ----------
+        features = list
+        missing = float
+            Value of missing entries, 0 as in featureFormat.
+        rows = slice
+            Subset of rows, all by default.
+        dtype = numpy dtype
+            The dataset's dtype by default.
+        """
+
+        rows = slice(None) if rows is None else rows
+        out = np.empty((len(self.names[rows]), len(features)),
+                       dtype=dtype or self.dtype)
+        for j, feature in enumerate(features):
+            out[:, j] = self.column(feature, missing)[rows]
+
+        return out
+
+    def feature_matrix(self, features, remove_NaN=True,
+                       remove_all_zeroes=True, remove_any_zeroes=False,
+                       dtype=None):
+        """featureFormat on the columns, rows in sorted name order."""
+
+        for feature in features:
+            if feature not in self.arrays:
+                print("error: key ", feature, " not present")
+                return
+
+        data = self.matrix(features, 0 if remove_NaN else np.nan, dtype=dtype)
+        test = data[:, 1:] if features[0] == "poi" else data
+        keep = np.ones(len(data), dtype=bool)
+        if remove_all_zeroes:
+            keep &= (test != 0).any(axis=1)
+        if remove_any_zeroes:
+            keep &= ~(test == 0).any(axis=1)
+
+        return data[keep]
+
+    def with_columns(self, columns, masks=None):
+        """
+        New dataset with numeric columns added or replaced.
+
+        Parameters
+        ----------
+        columns = dict
+            Feature mapped to an array in row order.
+        masks = dict
+            Feature mapped to a boolean missing array,
+            none missing by default.
+        """
+
+        values = dict(self.arrays)
+        new_masks = dict(self.masks)
+        for feature, array in columns.items():
+            values[feature] = np.asarray(array, dtype=self.dtype)
+            new_masks.pop(feature, None)
+            if masks is not None and feature in masks and masks[feature].any():
+                new_masks[feature] = np.packbits(masks[feature])
+
+        return TypedDataset(self.names, values, new_masks, self.text,
+                            self.booleans - set(columns), self.dtype)
+
+    def with_record(self, name, record):
+        """
+        New dataset with one person added, or some of
+        their variables changed.
+
+        Only the columns named in record are copied,
+        the others are shared. A new person is missing
+        every variable not in record.
+
+        Parameters
+        ----------
+        name = string
+            Person's key.
+        record = dict
+            Variables to set, with "NaN" for missing values.
+        """
+
+        import bisect
+
+        names = self.names
+        arrays = dict(self.arrays)
+        masks = dict(self.masks)
+        text = dict(self.text)
+        booleans = set(self.booleans)
+
+        # Missing arrays of the columns that change.
+        missing = {}
+        i = self._row_index().get(name)
+        if i is None:
+            # Insert an all missing row in name order.
+            i = bisect.bisect_left(names, name)
+            names = names[:i] + [name] + names[i:]
+            for feature, array in self.arrays.items():
+                arrays[feature] = np.insert(array, i, 0)
+                missing[feature] = np.insert(self.missing(feature), i, True)
+            for feature, column in self.text.items():
+                text[feature] = column[:i] + [None] + column[i:]
+
+        for feature, value in record.items():
+            is_missing = value == "NaN"
+            if feature not in arrays and feature not in text:
+                if is_missing or _is_number(value):
+                    arrays[feature] = np.zeros(len(names), dtype=self.dtype)
+                    missing[feature] = np.ones(len(names), dtype=bool)
+                    if isinstance(value, bool):
+                        booleans.add(feature)
+                else:
+                    text[feature] = [None] * len(names)
+
+            if feature in text:
+                column = list(text[feature])
+                column[i] = None if is_missing else value
+                text[feature] = column
+                continue
+
+            array = arrays[feature].copy()
+            array[i] = 0 if is_missing else value
+            arrays[feature] = array
+            if feature not in missing:
+                missing[feature] = self.missing(feature).copy()
+            missing[feature][i] = is_missing
+
+        for feature, bits in missing.items():
+            masks.pop(feature, None)
+            if bits.any():
+                masks[feature] = np.packbits(bits)
+
+        return TypedDataset(names, arrays, masks, text, booleans, self.dtype)
+
+    def fill_missing(self):
+        """
+        New dataset with every missing numeric value
+        taken as 0, like replacing "NaN" with 0. Text
+        features keep their missing values.
+        """
+
+        return TypedDataset(self.names, self.arrays, {}, self.text,
+                            self.booleans, self.dtype)
+
+    def drop(self, names):
+        """New dataset without the given people, unknown names are ignored."""
+
+        drop = set(names)
+        keep = np.array([name not in drop for name in self.names], dtype=bool)
+        if keep.all():
+            return self
+
+        kept_names = [name for name, k in zip(self.names, keep) if k]
+        values = dict((f, a[keep]) for f, a in self.arrays.items())
+        masks = dict((f, np.packbits(self.missing(f)[keep]))
+                     for f in self.masks)
+        text = dict((f, [v for v, k in zip(column, keep) if k])
+                    for f, column in self.text.items())
+
+        return TypedDataset(kept_names, values, masks, text, self.booleans,
+                            self.dtype)
+
+    def astype(self, dtype):
+        """Copy with numeric columns in another float dtype."""
+
+        values = dict((f, a.astype(dtype)) for f, a in self.arrays.items())
+
+        return TypedDataset(self.names, values, self.masks, self.text,
+                            self.booleans, dtype)
+
+    # Read only dict of dicts interface.
+
+    def _row_index(self):
+        if self._rows is None:
+            self._rows = dict((name, i) for i, name in enumerate(self.names))
+        return self._rows
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name):
+        return name in self._row_index()
+
+    def keys(self):
+        return list(self.names)
+
+    def __getitem__(self, name):
+        i = self._row_index()[name]
+        person = {}
+        for feature, array in self.arrays.items():
+            if feature in self.masks and self.missing(feature)[i]:
+                person[feature] = "NaN"
+            elif feature in self.booleans:
+                person[feature] = bool(array[i])
+            else:
+                person[feature] = array[i].item()
+        for feature, column in self.text.items():
+            person[feature] = "NaN" if column[i] is None else column[i]
+
+        return person
+
+    def items(self):
+        return [(name, self[name]) for name in self.names]
+
+    def values(self):
+        return [self[name] for name in self.names]
+
+
+def is_typed(dataset):
+    return isinstance(dataset, TypedDataset)
+
+
+def from_datadict(datadict, dtype=np.float64):
+    """See TypedDataset.from_datadict."""
+
+    return TypedDataset.from_datadict(datadict, dtype)
@@ -0,0 +1,236 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    communication graph
+    ~~~~~~~~~~~~~~~~~~~
+
+    Sparse person to person message count graph
+    built from the maildir headers, and graph
+    features computed with sparse linear algebra.
+
+    The graph is held as a CSR matrix over all
+    addresses in the corpus, no dense
+    (addresses x addresses) array is ever built.
+"""
+from __future__ import print_function
+import numpy as np
+from .poi_matcher import POIMatcher
+
+GRAPH_FEATURES = [
+                  "pagerank",
+                  "weighted_degree",
+                  "poi_proximity"
+                  ]
+
+
+def _row_normalize(matrix):
+    """Divide each row of a sparse matrix by its sum."""
+
+    from scipy import sparse
+
+    totals = np.asarray(matrix.sum(axis=1)).ravel()
+    inverse = np.zeros_like(totals)
+    inverse[totals > 0] = 1.0 / totals[totals > 0]
+
+    return sparse.diags(inverse).dot(matrix).tocsr()
+
+
+class CommunicationGraph(object):
+    """
+    Directed, weighted graph of message counts.
+
+    matrix[i, j] is the number of messages sent
+    from address i to address j.
+
+    Example
+    -------
+    index = header_index.HeaderIndex()
+    index.update("maildir")
+    graph = CommunicationGraph.from_index(index)
+    features = graph.person_features(header_index.person_addresses(data))
+
+    Parameters
+    ----------
+    matrix = scipy.sparse matrix
+        Square message count matrix.
+    addresses = dict
+        Address mapped to its row/column in matrix.
+    """
+
+    def __init__(self, matrix, addresses):
+        from scipy import sparse
+
+        self.matrix = sparse.csr_matrix(matrix)
+        self.addresses = addresses
+
+    @classmethod
+    def from_index(cls, index):
+        """
+        Build the graph from a header_index.HeaderIndex.
+
+        The sender and recipient incidence matrices
+        (messages x addresses) give the graph as
+        sent.T * received. Self addressed mail is dropped.
+        """
+
+        from scipy import sparse
+
+        sent, received = index.matrices()
+        matrix = sent.T.dot(received).tocsr()
+        matrix = matrix - sparse.diags(matrix.diagonal())
+        matrix.eliminate_zeros()
+
+        return cls(matrix, dict(index.addresses))
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def weighted_degree(self):
+        """
+        Messages sent plus messages received
+        for every address.
+        """
+
+        out_degree = np.asarray(self.matrix.sum(axis=1)).ravel()
+        in_degree = np.asarray(self.matrix.sum(axis=0)).ravel()
+
+        return out_degree + in_degree
+
+    def pagerank(self, damping=0.85, tol=1e-10, max_iter=100):
+        """
+        PageRank by power iteration over the
+        weighted graph.
+
+        Addresses that never send mail spread their
+        rank evenly over all addresses.
+
+        Parameters
+        ----------
+        damping = float
+            Probability of following an edge.
+        tol = float
+            Stop once the L1 change is below tol.
+        max_iter = int
+            Upper limit on iterations.
+
+        Returns
+        -------
+        rank = numpy array
+            Sums to one over all addresses.
+        """
+
+        n = len(self)
+        if n == 0:
+            return np.zeros(0)
+
+        transition = _row_normalize(self.matrix).T.tocsr()
+        dangling = np.asarray(self.matrix.sum(axis=1)).ravel() == 0
+
+        rank = np.ones(n) / n
+        for _ in range(max_iter):
+            leak = damping * rank[dangling].sum() / n
+            new_rank = damping * transition.dot(rank) + leak + (1 - damping) / n
+            change = np.abs(new_rank - rank).sum()
+            rank = new_rank
+            if change < tol:
+                break
+
+        return rank
+
+    def poi_proximity(self, matcher):
+        """
+        How close each address is to the POIs.
+
+        The graph is made symmetric and row normalized
+        into a random walk. The proximity is the mean
+        of the probabilities of standing on a POI after
+        one and after two steps. Two step walks back to
+        the starting address are left out, so a POI's
+        own label does not count towards its feature.
+
+        Parameters
+        ----------
+        matcher = POIMatcher
+            Used to flag POI addresses.
+
+        Returns
+        -------
+        proximity = numpy array
+            Values between 0 and 1.
+        """
+
+        poi = np.zeros(len(self))
+        for address, idx in self.addresses.items():
+            if address in matcher:
+                poi[idx] = 1
+
+        walk = _row_normalize(self.matrix + self.matrix.T)
+        one_hop = walk.dot(poi)
+        # The diagonal of walk * walk is the probability
+        # of returning to the start after two steps.
+        returns = np.asarray(walk.multiply(walk.T).sum(axis=1)).ravel()
+        two_hop = walk.dot(one_hop) - returns * poi
+
+        return 0.5 * (one_hop + two_hop)
+
+    def person_features(self, people, matcher=None):
+        """
+        Graph features aggregated per person.
+
+        PageRank and weighted degree are summed over
+        a person's addresses, POI proximity is averaged
+        weighted by degree.
+
+        Parameters
+        ----------
+        people = dict
+            Person name mapped to a list of addresses.
+        matcher = POIMatcher
+            Defaults to POIMatcher().
+
+        Returns
+        -------
+        features = dict
+            Person name mapped to a dict of the
+            features in GRAPH_FEATURES. Persons with
+            no address in the graph are left out.
+        """
+
+        from scipy import sparse
+
+        if matcher is None:
+            matcher = POIMatcher()
+
+        names = []
+        rows, cols = [], []
+        for name in sorted(people):
+            found = [self.addresses[a.lower()] for a in people[name]
+                     if a.lower() in self.addresses]
+            if not found:
+                continue
+            for idx in found:
+                rows.append(len(names))
+                cols.append(idx)
+            names.append(name)
+
+        member = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)),
+                                   shape=(len(names), len(self)))
+
+        degree = self.weighted_degree()
+        rank = member.dot(self.pagerank())
+        person_degree = member.dot(degree)
+        weighted_proximity = member.dot(degree * self.poi_proximity(matcher))
+
+        proximity = np.zeros(len(names))
+        mask = person_degree > 0
+        proximity[mask] = weighted_proximity[mask] / person_degree[mask]
+
+        features = {}
+        for i, name in enumerate(names):
+            features[name] = {
+                              "pagerank": float(rank[i]),
+                              "weighted_degree": float(person_degree[i]),
+                              "poi_proximity": float(proximity[i])
+                              }
+
+        return features
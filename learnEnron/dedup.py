@@ -0,0 +1,185 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    dedup
+    ~~~~~
+
+    Duplicate message elimination for corpus ingest.
+
+    The Enron maildir stores the same message in
+    several folders (_sent_mail, sent, all_documents,
+    inbox...). Messages are hashed on their Message-ID
+    and a digest of the normalized body, and every
+    duplicate is mapped to the first copy seen, its
+    canonical copy. Per-folder counts of the original
+    copies are kept so they can still be reported.
+"""
+from __future__ import print_function
+import hashlib
+import re
+from collections import Counter
+
+MESSAGE_ID = re.compile(br"^message-id:[ \t]*(.*?)\s*$",
+                        re.IGNORECASE | re.MULTILINE)
+TRAILING_SPACE = re.compile(br"[ \t]+$", re.MULTILINE)
+
+
+def split_message(data):
+    """Split raw message bytes into header and body."""
+
+    data = bytes(data).replace(b"\r\n", b"\n")
+    header, _, body = data.partition(b"\n\n")
+
+    return header, body
+
+
+def message_digest(data, use_message_id=True):
+    """
+    Content hash identifying copies of one message.
+
+    Parameters
+    ----------
+    data = bytes or memoryview
+        Raw message.
+    use_message_id = Boolean
+        Include the Message-ID header. Set False to also
+        catch copies that were stamped with a new id.
+
+    Returns
+    -------
+    digest = string
+        Hex sha1 digest.
+    """
+
+    header, body = split_message(data)
+
+    # Trailing white space and blank lines at either
+    # end differ between folders of the same message.
+    body = TRAILING_SPACE.sub(b"", body).strip(b"\n")
+
+    digest = hashlib.sha1()
+    if use_message_id:
+        match = MESSAGE_ID.search(header)
+        digest.update(match.group(1) if match else b"")
+        digest.update(b"\0")
+    digest.update(hashlib.sha1(body).digest())
+
+    return digest.hexdigest()
+
+
+def folder_of(key):
+    """
+    Top level folder of a maildir key, e.g.
+    "maildir/allen-p/_sent_mail/1." gives "_sent_mail".
+    """
+
+    parts = key.replace("\\", "/").split("/")
+    if parts and parts[0] == "maildir":
+        parts = parts[1:]
+
+    return parts[1] if len(parts) > 2 else ""
+
+
+class Deduplicator(object):
+    """
+    Map every message to its canonical copy.
+
+    Example
+    -------
+    dedup = Deduplicator()
+    for key, data in messages:
+        canonical, duplicate = dedup.add(key, data)
+        if not duplicate:
+            process(data)
+
+    Parameters
+    ----------
+    use_message_id = Boolean
+        Passed to message_digest.
+    """
+
+    def __init__(self, use_message_id=True):
+        self.use_message_id = use_message_id
+        self.digests = {}
+        self.canonical = {}
+        self.folders = Counter()
+        self.unique_folders = Counter()
+
+    def __len__(self):
+        return len(self.digests)
+
+    @property
+    def n_duplicates(self):
+        return len(self.canonical)
+
+    def add(self, key, data):
+        """
+        Register one message.
+
+        Adding a key again with the same message is
+        not counted twice, and the canonical copy is
+        never reported as a duplicate of itself.
+
+        Returns
+        -------
+        canonical = string
+            Key of the canonical copy (key itself
+            for the first copy seen).
+        duplicate = Boolean
+            True when an earlier copy exists.
+        """
+
+        digest = message_digest(data, self.use_message_id)
+        canonical = self.digests.get(digest)
+        if canonical == key:
+            return key, False
+        if canonical is not None and self.canonical.get(key) == canonical:
+            return canonical, True
+
+        folder = folder_of(key)
+        self.folders[folder] += 1
+
+        if canonical is None:
+            self.digests[digest] = key
+            self.unique_folders[folder] += 1
+            return key, False
+
+        self.canonical[key] = canonical
+        return canonical, True
+
+    def resolve(self, key):
+        """Canonical key of any registered key."""
+
+        return self.canonical.get(key, key)
+
+    def is_duplicate(self, key):
+        return key in self.canonical
+
+    def folder_counts(self, unique=False):
+        """
+        Number of messages per top level folder,
+        counting every copy or only canonical ones.
+        """
+
+        return dict(self.unique_folders if unique else self.folders)
+
+    def state(self):
+        """Picklable state, see from_state."""
+
+        return {
+                "use_message_id": self.use_message_id,
+                "digests": self.digests,
+                "canonical": self.canonical,
+                "folders": dict(self.folders),
+                "unique_folders": dict(self.unique_folders)
+                }
+
+    @classmethod
+    def from_state(cls, state):
+        dedup = cls(state["use_message_id"])
+        dedup.digests = state["digests"]
+        dedup.canonical = state["canonical"]
+        dedup.folders = Counter(state["folders"])
+        dedup.unique_folders = Counter(state["unique_folders"])
+
+        return dedup
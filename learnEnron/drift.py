@@ -0,0 +1,226 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    drift
+    ~~~~~
+
+    How far results move when the pipeline
+    computes in float32 instead of float64.
+
+    The same dataset is converted to each dtype,
+    robust scaled, formatted and scored with the
+    same cross validation plan. Metrics, predicted
+    probabilities and the fitted scaling are then
+    compared with the float64 run. Every matrix is
+    checked to still be in the requested dtype, so
+    an upcast anywhere on the way fails the check.
+
+    usage: python -m learnEnron.drift [--folds 5] [--tolerance 0.06]
+"""
+from __future__ import print_function
+import argparse
+import os
+import pickle
+import sys
+import numpy as np
+from . import columnar, feature_format, feature_scaling
+
+METRICS = ("accuracy", "precision", "recall", "f1")
+
+
+def _default_clf():
+    """
+    Same steps as tune.param_optimize_lr_pipe.
+    A logistic regression on the scaled features
+    alone is badly conditioned (columns with an
+    interquartile range of 0 are left unscaled),
+    its fit moves with any change of the input.
+    """
+
+    from sklearn import (
+                         decomposition,
+                         feature_selection,
+                         linear_model,
+                         pipeline
+                         )
+
+    return pipeline.Pipeline([
+                              ("anova", feature_selection.SelectKBest(
+                                  feature_selection.f_classif, k=10)),
+                              ("r_dim", decomposition.PCA(n_components=4,
+                                                          whiten=True)),
+                              ("clf", linear_model.LogisticRegression(
+                                  C=1, class_weight="balanced"))
+                              ])
+
+
+def _check_dtype(array, dtype, where):
+    if array.dtype != dtype:
+        raise TypeError("{0} is {1}, expected {2}".format(where, array.dtype,
+                                                          np.dtype(dtype)))
+
+
+def run(dataset, feature_list, dtype, clf=None, folds=5, seed=42):
+    """
+    Scale, format and cross validate in one dtype.
+
+    Parameters
+    ----------
+    dataset = dict or columnar.TypedDataset
+        Unscaled dataset.
+    feature_list = list
+        "poi" first.
+    dtype = numpy dtype
+        float32 or float64.
+    clf = sklearn clf object
+        ANOVA, PCA and logistic regression
+        pipeline by default.
+    folds = int
+        Stratified folds, shuffled with seed.
+
+    Returns
+    -------
+    result = dict
+        metrics, the out of fold probabilities and
+        predictions, the scaling and the nbytes of
+        the feature matrix.
+    """
+
+    from sklearn import metrics
+    from sklearn.base import clone
+    from sklearn.model_selection import StratifiedKFold, cross_val_predict
+
+    dtype = np.dtype(dtype)
+    if columnar.is_typed(dataset):
+        typed = dataset.astype(dtype)
+    else:
+        typed = columnar.from_datadict(dataset, dtype)
+
+    scaling = feature_scaling.fit(typed, feature_list[1:])
+    scaled = scaling.transform(typed)
+    data = feature_format.featureFormat(scaled, feature_list, sort_keys=True)
+    _check_dtype(data, dtype, "featureFormat output")
+
+    labels = data[:, 0].astype(int)
+    features = data[:, 1:]
+    cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+    clf = clone(clf if clf is not None else _default_clf())
+    probabilities = cross_val_predict(clf, features, labels, cv=cv,
+                                      method="predict_proba")[:, 1]
+    predictions = (probabilities > 0.5).astype(int)
+
+    return {
+            "metrics": {
+                        "accuracy": metrics.accuracy_score(labels, predictions),
+                        "precision": metrics.precision_score(labels,
+                                                             predictions),
+                        "recall": metrics.recall_score(labels, predictions),
+                        "f1": metrics.f1_score(labels, predictions)
+                        },
+            "probabilities": probabilities,
+            "predictions": predictions,
+            "scaling": scaling,
+            "nbytes": data.nbytes
+            }
+
+
+def compare(dataset, feature_list, clf=None, folds=5, seed=42,
+            dtype=np.float32):
+    """
+    Drift of a reduced precision run from float64.
+
+    Returns
+    -------
+    report = dict
+        metrics: metric mapped to its float64 value,
+        its value in dtype and the absolute drift.
+        max_probability_drift, changed_predictions,
+        max_center_drift and max_scale_drift (relative)
+        of the fitted scaling, and nbytes of both
+        feature matrices.
+    """
+
+    base = run(dataset, feature_list, np.float64, clf, folds, seed)
+    low = run(dataset, feature_list, dtype, clf, folds, seed)
+
+    report = {"dtype": np.dtype(dtype).name, "metrics": {}}
+    for metric in METRICS:
+        a = base["metrics"][metric]
+        b = low["metrics"][metric]
+        report["metrics"][metric] = {"float64": a, report["dtype"]: b,
+                                     "drift": abs(b - a)}
+
+    report["max_probability_drift"] = float(np.max(np.abs(
+        base["probabilities"] - low["probabilities"])))
+    report["changed_predictions"] = int(np.sum(
+        base["predictions"] != low["predictions"]))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for part in ("center", "scale"):
+            a = getattr(base["scaling"], part)
+            b = getattr(low["scaling"], part)
+            relative = np.abs(b - a) / np.maximum(np.abs(a), 1e-12)
+            report["max_{0}_drift".format(part)] = float(np.max(relative))
+
+    report["nbytes"] = {"float64": base["nbytes"],
+                        report["dtype"]: low["nbytes"]}
+
+    return report
+
+
+def format_report(report):
+    dtype = report["dtype"]
+    lines = ["{0:<10} {1:>10} {2:>10} {3:>10}".format("metric", "float64",
+                                                      dtype, "drift")]
+    for metric in METRICS:
+        values = report["metrics"][metric]
+        lines.append("{0:<10} {1:>10.5f} {2:>10.5f} {3:>10.2e}".format(
+                     metric, values["float64"], values[dtype], values["drift"]))
+    lines.append("max probability drift: {0:.2e}".format(
+                 report["max_probability_drift"]))
+    lines.append("changed predictions: {0}".format(
+                 report["changed_predictions"]))
+    lines.append("max scaling drift: center {0:.2e}, scale {1:.2e}".format(
+                 report["max_center_drift"], report["max_scale_drift"]))
+    lines.append("feature matrix: {0} bytes in float64, {1} in {2}".format(
+                 report["nbytes"]["float64"], report["nbytes"][dtype], dtype))
+
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    from . import feature_engineering, outliers
+
+    file_dir = os.path.dirname(os.path.realpath(__file__))
+    default = os.path.join(os.path.dirname(file_dir), "resources", "data",
+                           "final_project_dataset.pkl")
+
+    parser = argparse.ArgumentParser(description="float32 drift check")
+    parser.add_argument("--data", default=default)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    # One flipped POI prediction moves recall by 1/18
+    # on the Enron data.
+    parser.add_argument("--tolerance", type=float, default=0.06,
+                        help="largest metric drift accepted")
+    args = parser.parse_args(argv)
+
+    with open(args.data, "rb") as f:
+        dataset = columnar.from_datadict(pickle.load(f))
+    dataset, _ = outliers.screen(dataset)
+    dataset = feature_engineering.email_ratios(dataset)
+    feature_list = ["poi"] + [f for f in sorted(dataset.arrays) if f != "poi"]
+
+    report = compare(dataset, feature_list, folds=args.folds, seed=args.seed)
+    print(format_report(report))
+
+    worst = max(m["drift"] for m in report["metrics"].values())
+    if worst > args.tolerance:
+        print("drift {0:.2e} above tolerance {1}".format(worst, args.tolerance))
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,296 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    email cache
+    ~~~~~~~~~~~
+
+    On-disk cache of parseOutText results.
+
+    Parsed text is appended to zlib compressed
+    shard files and located through an offset
+    index, so that an email is only read and
+    stemmed again when the file has changed.
+"""
+from __future__ import print_function
+import hashlib
+import io
+import os
+import pickle
+import zlib
+from .fileutil import replace
+from .parse_out_email_txt import parseOutText
+
+INDEX_FILENAME = "index.pkl"
+SHARD_FORMAT = "shard_{0:05d}.z"
+
+# Roll over to a new shard after 64 MB of compressed text.
+DEFAULT_SHARD_SIZE = 64 * 1024 * 1024
+
+
+def file_signature(path, validate="stat"):
+    """
+    Signature used to decide if a cached entry
+    is still valid for a file.
+
+    Parameters
+    ----------
+    path = string
+        Path to the email file.
+    validate = string
+        "stat" uses the modification time and size,
+        "hash" uses a sha1 digest of the file content.
+
+    Returns
+    -------
+    signature = tuple
+    """
+
+    if validate == "stat":
+        st = os.stat(path)
+        mtime = getattr(st, "st_mtime_ns", int(st.st_mtime * 1e9))
+        return ("stat", mtime, st.st_size)
+    elif validate == "hash":
+        with open(path, "rb") as email_file:
+            digest = hashlib.sha1(email_file.read()).hexdigest()
+        return ("hash", digest)
+    raise ValueError("validate must be 'stat' or 'hash'")
+
+
+def cache_key(path, stem):
+    """
+    Key of an entry in the index, built from
+    the absolute path and the stem flag.
+    """
+
+    path = os.path.realpath(path)
+    return "{0}\0{1}".format(path, int(bool(stem)))
+
+
+class ParsedTextCache(object):
+    """
+    Content addressed cache of parsed email text.
+
+    Each entry in the index maps a cache key to
+    the file signature and the location of the
+    compressed text (shard number, offset, length).
+
+    Example
+    -------
+    with ParsedTextCache("cache/parsed") as cache:
+        text = cache.parse("maildir/bailey-s/deleted_items/101.")
+
+    Parameters
+    ----------
+    cache_dir = string
+        Directory holding the shards and index.
+    validate = string
+        "stat" (default) or "hash", see file_signature.
+    shard_size = int
+        Size in bytes after which a new shard is started.
+    level = int
+        zlib compression level.
+    """
+
+    def __init__(self, cache_dir, validate="stat",
+                 shard_size=DEFAULT_SHARD_SIZE, level=6):
+        self.cache_dir = cache_dir
+        self.validate = validate
+        self.shard_size = shard_size
+        self.level = level
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._writer = None
+
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+        self.index = self._load_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.index["entries"])
+
+    def _index_path(self):
+        return os.path.join(self.cache_dir, INDEX_FILENAME)
+
+    def _shard_path(self, shard):
+        return os.path.join(self.cache_dir, SHARD_FORMAT.format(shard))
+
+    def _load_index(self):
+        path = self._index_path()
+        if os.path.exists(path):
+            with open(path, "rb") as index_file:
+                return pickle.load(index_file)
+        return {"shard": 0, "entries": {}}
+
+    def _read(self, location):
+        shard, offset, length = location
+        with open(self._shard_path(shard), "rb") as shard_file:
+            shard_file.seek(offset)
+            blob = shard_file.read(length)
+        return zlib.decompress(blob).decode("utf-8")
+
+    def _append(self, text):
+        blob = zlib.compress(text.encode("utf-8"), self.level)
+
+        if self._writer is None:
+            self._writer = open(self._shard_path(self.index["shard"]), "ab")
+        elif self._writer.tell() + len(blob) > self.shard_size:
+            self._writer.close()
+            self.index["shard"] += 1
+            self._writer = open(self._shard_path(self.index["shard"]), "ab")
+
+        # Append mode always writes at the end of the file.
+        self._writer.seek(0, os.SEEK_END)
+        offset = self._writer.tell()
+        self._writer.write(blob)
+
+        return (self.index["shard"], offset, len(blob))
+
+    def get(self, path, stem=True):
+        """
+        Return the cached text for an email,
+        or None if it is missing or stale.
+        """
+
+        entry = self.index["entries"].get(cache_key(path, stem))
+        if entry is None:
+            return None
+
+        signature, location = entry
+        if signature != file_signature(path, self.validate):
+            return None
+
+        if self._writer is not None and location[0] == self.index["shard"]:
+            self._writer.flush()
+
+        return self._read(location)
+
+    def put(self, path, text, stem=True):
+        """
+        Store parsed text for an email, replacing
+        any earlier entry for the same key.
+        """
+
+        signature = file_signature(path, self.validate)
+        location = self._append(text)
+        self.index["entries"][cache_key(path, stem)] = (signature, location)
+        self._dirty = True
+
+    def parse(self, path, stem=True):
+        """
+        Drop in replacement for parseOutText
+        that takes a path rather than an open file.
+
+        Parameters
+        ----------
+        path = string
+            Path to the email file.
+        stem = Boolean
+            Passed through to parseOutText.
+
+        Returns
+        -------
+        words = string
+            Parsed text of the email.
+        """
+
+        text = self.get(path, stem)
+        if text is not None:
+            self.hits += 1
+            return text
+
+        self.misses += 1
+        # Not every Enron email is valid UTF-8.
+        with io.open(path, encoding="latin-1") as email_file:
+            text = parseOutText(email_file, stem=stem)
+        self.put(path, text, stem)
+
+        return text
+
+    def parse_store(self, store, key, stem=True):
+        """
+        Like parse, for a message in a
+        mail_store.MailStore. Entries are validated
+        against a sha1 of the message bytes.
+        """
+
+        view = store.view(key)
+        signature = ("hash", hashlib.sha1(view).hexdigest())
+        del view
+        entry_key = "{0}\0{1}\0{2}".format(os.path.realpath(store.store_dir),
+                                           store.resolve(key), int(bool(stem)))
+
+        entry = self.index["entries"].get(entry_key)
+        if entry is not None and entry[0] == signature:
+            if self._writer is not None and entry[1][0] == self.index["shard"]:
+                self._writer.flush()
+            self.hits += 1
+            return self._read(entry[1])
+
+        self.misses += 1
+        text = parseOutText(store.open_text(key), stem=stem)
+        self.index["entries"][entry_key] = (signature, self._append(text))
+        self._dirty = True
+
+        return text
+
+    def flush(self):
+        """
+        Write buffered shard data and the index
+        to disk. The index is replaced atomically.
+        """
+
+        if self._writer is not None:
+            self._writer.flush()
+            os.fsync(self._writer.fileno())
+
+        if not self._dirty:
+            return
+
+        path = self._index_path()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as index_file:
+            pickle.dump(self.index, index_file, protocol=2)
+        replace(tmp_path, path)
+        self._dirty = False
+
+    def close(self):
+        """Flush and close the current shard."""
+
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def compact(self):
+        """
+        Rewrite all live entries into fresh shards,
+        dropping text left behind by stale entries.
+        """
+
+        self.close()
+        old_shards = set(loc[0] for _, loc in self.index["entries"].values())
+        old_shards.update(range(self.index["shard"] + 1))
+
+        entries = self.index["entries"]
+        first_new = max(old_shards) + 1
+        self.index = {"shard": first_new, "entries": {}}
+
+        # Old shards are only read and new shards only appended,
+        # so entries can be streamed across one at a time.
+        for key, (signature, location) in entries.items():
+            text = self._read(location)
+            self.index["entries"][key] = (signature, self._append(text))
+        self._dirty = True
+        self.close()
+
+        for shard in old_shards:
+            if shard < first_new and os.path.exists(self._shard_path(shard)):
+                os.remove(self._shard_path(shard))
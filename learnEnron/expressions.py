@@ -0,0 +1,311 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    expressions
+    ~~~~~~~~~~~
+
+    Declare engineered features as expressions
+    and evaluate all of them in one vectorized
+    pass over the columnar data.
+
+    Expressions are built from columns with
+    ratio, difference, product (interactions),
+    sum, log_10 and sq_rt, or with the / - * +
+    operators:
+
+        registry = FeatureRegistry()
+        registry.ratio("ratio_to_poi",
+                       "from_this_person_to_poi", "from_messages")
+        registry.add("log_bonus_salary",
+                     log_10(col("bonus") / col("salary")))
+
+    The planner deduplicates subexpressions by
+    their structure, so a column or a ratio used
+    by several features is computed once.
+
+    Missing values are NaN throughout. Any result
+    that is not finite, from a missing input, a
+    division by zero or a log or square root out
+    of its domain, is NaN too; NaNs are filled
+    (with 0 by default) only when the features are
+    written back to the data dictionary.
+"""
+from __future__ import print_function
+import numpy as np
+from . import transformation
+
+
+class Expr(object):
+    """
+    Node of an expression tree.
+
+    Parameters
+    ----------
+    op = string
+        Operation name, one of OPERATIONS or "col".
+    args = tuple
+        Operand nodes, or the column name for "col".
+    """
+
+    def __init__(self, op, args):
+        self.op = op
+        self.args = tuple(args)
+        if op == "col":
+            self.key = ("col",) + self.args
+        else:
+            keys = [a.key for a in self.args]
+            if op in COMMUTATIVE:
+                keys.sort()
+            self.key = (op,) + tuple(keys)
+
+    def __repr__(self):
+        if self.op == "col":
+            return self.args[0]
+        return "{0}({1})".format(self.op, ", ".join(repr(a) for a in self.args))
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __eq__(self, other):
+        return isinstance(other, Expr) and self.key == other.key
+
+    def __ne__(self, other):
+        return not self == other
+
+    def columns(self):
+        """Input columns the expression depends on."""
+
+        if self.op == "col":
+            return set(self.args)
+        return set().union(*[a.columns() for a in self.args])
+
+    def __truediv__(self, other):
+        return ratio(self, other)
+
+    __div__ = __truediv__
+
+    def __sub__(self, other):
+        return difference(self, other)
+
+    def __mul__(self, other):
+        return product(self, other)
+
+    def __add__(self, other):
+        return total(self, other)
+
+
+def _as_expr(value):
+    return value if isinstance(value, Expr) else col(value)
+
+
+def col(name):
+    """Input column."""
+
+    return Expr("col", [name])
+
+
+def ratio(numerator, denominator):
+    return Expr("ratio", [_as_expr(numerator), _as_expr(denominator)])
+
+
+def difference(a, b):
+    return Expr("difference", [_as_expr(a), _as_expr(b)])
+
+
+def product(a, b):
+    """Interaction of two features."""
+
+    return Expr("product", [_as_expr(a), _as_expr(b)])
+
+
+def total(a, b):
+    return Expr("sum", [_as_expr(a), _as_expr(b)])
+
+
+def log_10(a):
+    return Expr("log_10", [_as_expr(a)])
+
+
+def sq_rt(a):
+    return Expr("sq_rt", [_as_expr(a)])
+
+
+OPERATIONS = {
+              "ratio": np.divide,
+              "difference": np.subtract,
+              "product": np.multiply,
+              "sum": np.add,
+              "log_10": transformation.log_10,
+              "sq_rt": transformation.sq_rt
+              }
+COMMUTATIVE = ("product", "sum")
+
+
+def to_columns(datadict, features):
+    """
+    Columnar copy of some features of the data dictionary.
+
+    Returns
+    -------
+    names = list
+        Sorted person names, the row order.
+    columns = dict
+        Feature mapped to a float array, NaN if missing.
+    """
+
+    if hasattr(datadict, "column"):
+        # columnar.TypedDataset, already sorted
+        return datadict.names, dict((f, datadict.column(f, np.nan))
+                                    for f in features)
+
+    names = sorted(datadict.keys())
+    columns = {}
+    for feature in features:
+        values = [datadict[name][feature] for name in names]
+        columns[feature] = np.array([np.nan if v == "NaN" else v
+                                     for v in values], dtype=np.float64)
+
+    return names, columns
+
+
+class FeatureRegistry(object):
+    """
+    Named feature expressions and their evaluation plan.
+
+    Example
+    -------
+    registry = FeatureRegistry()
+    registry.ratio("ratio_to_poi", "from_this_person_to_poi",
+                   "from_messages")
+    registry.add("bonus_x_salary", product("bonus", "salary"))
+    values = registry.evaluate(columns)
+    """
+
+    def __init__(self):
+        self.features = []
+        self.expressions = {}
+
+    def add(self, name, expr):
+        """Register expr as feature name."""
+
+        if name in self.expressions:
+            raise ValueError("feature {0} already registered".format(name))
+        self.features.append(name)
+        self.expressions[name] = _as_expr(expr)
+
+        return self
+
+    def ratio(self, name, numerator, denominator):
+        return self.add(name, ratio(numerator, denominator))
+
+    def difference(self, name, a, b):
+        return self.add(name, difference(a, b))
+
+    def interaction(self, name, a, b):
+        return self.add(name, product(a, b))
+
+    def log_10(self, name, a):
+        return self.add(name, log_10(a))
+
+    def sq_rt(self, name, a):
+        return self.add(name, sq_rt(a))
+
+    def subset(self, names):
+        """New registry with only the named features, in order."""
+
+        registry = FeatureRegistry()
+        for name in self.features:
+            if name in names:
+                registry.add(name, self.expressions[name])
+
+        return registry
+
+    def columns(self):
+        """Input columns needed by every registered feature."""
+
+        return sorted(set().union(*[e.columns() for e in
+                                    self.expressions.values()]))
+
+    def plan(self):
+        """
+        Unique nodes of every expression, each
+        after its operands (depth first).
+        """
+
+        order = []
+        seen = set()
+
+        def visit(node):
+            if node.key in seen:
+                return
+            for arg in node.args if node.op != "col" else ():
+                visit(arg)
+            seen.add(node.key)
+            order.append(node)
+
+        for name in self.features:
+            visit(self.expressions[name])
+
+        return order
+
+    def evaluate(self, columns):
+        """
+        Evaluate every feature in one pass.
+
+        Parameters
+        ----------
+        columns = dict
+            Column name mapped to a float array,
+            NaN for missing values.
+
+        Returns
+        -------
+        values = dict
+            Feature name mapped to a float array.
+        """
+
+        results = {}
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            for node in self.plan():
+                if node.op == "col":
+                    results[node.key] = np.asarray(columns[node.args[0]],
+                                                   dtype=np.float64)
+                    continue
+                value = OPERATIONS[node.op](*[results[a.key] for a in node.args])
+                value[~np.isfinite(value)] = np.nan
+                results[node.key] = value
+
+        return dict((name, results[self.expressions[name].key])
+                    for name in self.features)
+
+    def apply(self, datadict, fill=0):
+        """
+        Add every feature to the data dictionary.
+
+        Parameters
+        ----------
+        datadict = dictionary
+            Dataset keyed by person, changed in place,
+            or a columnar.TypedDataset.
+        fill = value
+            Written for NaN results.
+
+        Returns
+        -------
+        datadict = dictionary
+            Or a new TypedDataset.
+        """
+
+        names, columns = to_columns(datadict, self.columns())
+        values = self.evaluate(columns)
+
+        if hasattr(datadict, "with_columns"):
+            return datadict.with_columns(dict(
+                (f, np.where(np.isnan(v), fill, v)) for f, v in values.items()))
+
+        for feature in self.features:
+            column = values[feature].tolist()
+            for name, value in zip(names, column):
+                datadict[name][feature] = fill if value != value else value
+
+        return datadict
@@ -6,11 +6,89 @@
 
     Module to create new features
     for the machine learning pipeline.
+
+    The graph modules are imported inside
+    the functions that use them.
 """
-import pandas as pd
 import numpy as np
 
-def email_ratios(datadict):
+
+def email_registry():
+    """
+    The email ratios declared as expressions,
+    see expressions.FeatureRegistry.
+
+    This is the one definition of the derived
+    features: email_ratios, derive_row and
+    DerivedFeatures all evaluate it. A ratio with
+    a missing input or a zero denominator is 0.
+    """
+
+    from .expressions import FeatureRegistry
+
+    registry = FeatureRegistry()
+    registry.ratio("ratio_to_poi", "from_this_person_to_poi", "from_messages")
+    registry.ratio("ratio_from_poi", "from_poi_to_this_person", "to_messages")
+
+    return registry
+
+
+def dependents(registry=None):
+    """
+    Map each input column to the derived
+    features computed from it.
+    """
+
+    if registry is None:
+        registry = email_registry()
+
+    depends = {}
+    for name in registry.features:
+        for column in sorted(registry.expressions[name].columns()):
+            depends.setdefault(column, []).append(name)
+
+    return depends
+
+
+def derive_row(record, registry=None, names=None, fill=0):
+    """
+    Derived feature values of one person.
+
+    Parameters
+    ----------
+    record = dictionary
+        The person's variables, with "NaN" for
+        missing values.
+    registry = expressions.FeatureRegistry
+        Derived features, email_registry() by default.
+    names = iterable
+        Only compute these derived features,
+        all of them by default.
+    fill = value
+        Value for missing inputs, divisions by zero
+        and other undefined results.
+    """
+
+    if registry is None:
+        registry = email_registry()
+    if names is not None:
+        registry = registry.subset(names)
+
+    columns = dict((c, [np.nan if record[c] == "NaN" else record[c]])
+                   for c in registry.columns())
+    values = registry.evaluate(columns)
+
+    return dict((name, fill if np.isnan(value[0]) else float(value[0]))
+                for name, value in values.items())
+
+
+def _clean_row(record):
+    """Copy of a record with "NaN" replaced by zero."""
+
+    return dict((k, 0 if v == "NaN" else v) for k, v in record.items())
+
+
+def email_ratios(datadict, registry=None):
     """
     Add new features into the data
     dictionary based on email data.
@@ -24,40 +102,228 @@ def email_ratios(datadict):
     emails from a person and the number of
     emails this person to sent to a POI.
 
+    This is the bulk path, every row is
+    rebuilt in one vectorized pass. Use
+    DerivedFeatures to keep the ratios up
+    to date as records change.
+
     Parameters
     ----------
     datadict = dictionary
         A dictionary storing all of the dataset.
         Each key relates to a person while the value
         is a dictionary containing all of the variables.
+    registry = expressions.FeatureRegistry
+        Derived features, email_registry() by default.
     Returns
     -------
     data_dict = dictionary
         Almost identical to input but with two new variables
-        added.
+        added. Remaining NaNs are replaced with zeros so
+        the pipeline works.
+    """
+
+    if registry is None:
+        registry = email_registry()
+
+    if hasattr(datadict, "with_columns"):
+        return registry.apply(datadict).fill_missing()
+
+    # A missing input is 0 once cleaned, which gives
+    # the same ratios as the "NaN" it replaces.
+    data_dict = dict((name, _clean_row(record))
+                     for name, record in datadict.items())
+
+    return registry.apply(data_dict)
+
+
+class DerivedFeatures(object):
+    """
+    Dataset with derived features kept up
+    to date as records are added or changed.
+
+    Only the derived features whose input
+    columns changed are recomputed, and only
+    for the rows that changed, so an update
+    costs O(changed rows) instead of a full
+    email_ratios rebuild.
+
+    Example
+    -------
+    derived = DerivedFeatures(data_dict)
+    derived.update("LAY KENNETH L", {"from_messages": 40})
+    data_dict = derived.data
+
+    A columnar.TypedDataset stays typed: data is
+    replaced by a new dataset on each update, see
+    TypedDataset.with_record.
+
+    Parameters
+    ----------
+    datadict = dictionary or columnar.TypedDataset
+        Raw dataset, with "NaN" for missing values.
+    registry = expressions.FeatureRegistry
+        Derived features, email_registry() by default.
+    """
+
+    def __init__(self, datadict, registry=None):
+        self.registry = registry if registry is not None else email_registry()
+        self.depends = dependents(self.registry)
+        self.recomputed = 0
+        self.rebuild(datadict)
+
+    def rebuild(self, datadict):
+        """Bulk path: recompute every row."""
+
+        # Raw inputs are kept, since "NaN" and 0
+        # are the same in the cleaned rows.
+        self.raw = dict((name, dict((c, record[c]) for c in self.depends))
+                        for name, record in datadict.items())
+        self.data = email_ratios(datadict, self.registry)
+        self.recomputed += len(datadict) * len(self.registry.features)
+
+        return self.data
+
+    def update(self, name, changes):
+        """
+        Add a person, or change some of their variables.
+
+        Parameters
+        ----------
+        name = string
+            Person's key.
+        changes = dictionary
+            Variables to set, with "NaN" for missing
+            values. A new person needs every variable.
+
+        Returns
+        -------
+        names = list
+            Derived features that were recomputed.
+        """
+
+        if name not in self.data:
+            self.raw[name] = dict((c, changes[c]) for c in self.depends)
+            row = _clean_row(changes)
+            row.update(derive_row(changes, self.registry))
+            self._set_row(name, row)
+            self.recomputed += len(self.registry.features)
+            return list(self.registry.features)
+
+        raw = self.raw[name]
+        stale = set()
+        for column, value in changes.items():
+            if column in raw and raw[column] != value:
+                raw[column] = value
+                stale.update(self.depends[column])
+
+        row = _clean_row(changes)
+        if stale:
+            row.update(derive_row(raw, self.registry, stale))
+        self._set_row(name, row)
+        self.recomputed += len(stale)
+
+        return sorted(stale)
+
+    def _set_row(self, name, row):
+        """Add or change the variables in row of one person."""
+
+        if hasattr(self.data, "with_record"):
+            # Typed datasets are never changed in place.
+            self.data = self.data.with_record(name, row)
+        elif name in self.data:
+            self.data[name].update(row)
+        else:
+            self.data[name] = row
+
+    def update_many(self, records):
+        """Apply update to every name: changes pair of a dict."""
+
+        for name, changes in records.items():
+            self.update(name, changes)
+
+        return self.data
+
+    def remove(self, name):
+        self.raw.pop(name, None)
+        if not hasattr(self.data, "drop"):
+            return self.data.pop(name, None)
+
+        row = self.data[name] if name in self.data else None
+        self.data = self.data.drop([name])
+        return row
+
+
+def expression_features(datadict, registry=None, fill=0):
+    """
+    Add every feature declared in a registry
+    into the data dictionary in one vectorized
+    pass.
+
+    Parameters
+    ----------
+    datadict = dictionary
+        A dictionary storing all of the dataset.
+    registry = expressions.FeatureRegistry
+        Feature expressions, email_registry() by default.
+    fill = value
+        Value for missing inputs, divisions by zero
+        and other undefined results.
+
+    Returns
+    -------
+    datadict = dictionary
+        The same dictionary with the features added.
+    """
+
+    if registry is None:
+        registry = email_registry()
+
+    return registry.apply(datadict, fill)
+
+
+def graph_features(datadict, graph, matcher=None):
+    """
+    Add communication graph features into
+    the data dictionary.
+
+    Adds the columns in comm_graph.GRAPH_FEATURES
+    (pagerank, weighted_degree and poi_proximity)
+    alongside the ratios from email_ratios.
+
+    Parameters
+    ----------
+    datadict = dictionary
+        A dictionary storing all of the dataset.
+        Each key relates to a person while the value
+        is a dictionary containing all of the variables.
+    graph = comm_graph.CommunicationGraph
+        Graph built from the maildir headers.
+    matcher = poi_matcher.POIMatcher
+        Flags POI addresses, defaults to poiEmails.
+
+    Returns
+    -------
+    datadict = dictionary
+        The same dictionary with the graph features
+        added, or a new TypedDataset. Persons missing
+        from the graph get zeros so the pipeline works.
     """
 
-    # Convert data dictionary, tranpose
-    # to have columns as variables
-    df = pd.DataFrame(datadict)
-    df = df.replace('NaN', np.NaN)
-    df = df.transpose()
+    from . import comm_graph, header_index
 
-    df["ratio_to_poi"] = (
-                          df["from_this_person_to_poi"].dropna()
-                          /df["from_messages"].dropna()
-                          )
-    df["ratio_from_poi"] = (
-                            df["from_poi_to_this_person"].dropna()
-                            /df["to_messages"].dropna()
-                            )
+    people = header_index.person_addresses(datadict)
+    features = graph.person_features(people, matcher)
 
-    # Replace NaNs with zeros to so the pipeline works
-    df = df.replace(np.NaN, 0)
+    if hasattr(datadict, "with_columns"):
+        return datadict.with_columns(dict(
+            (feature, [features.get(name, {}).get(feature, 0)
+                       for name in datadict.names])
+            for feature in comm_graph.GRAPH_FEATURES))
 
-    # Tranpose back before convertin back to a
-    # dictionary
-    df = df.transpose()
-    data_dict = df.to_dict(orient='dict')
+    for name, values in datadict.items():
+        person = features.get(name, {})
+        for feature in comm_graph.GRAPH_FEATURES:
+            values[feature] = person.get(feature, 0)
 
-    return data_dict
+    return datadict
@@ -36,7 +36,7 @@ import numpy as np
 
 def featureFormat(dictionary, features, remove_NaN=True,
                   remove_all_zeroes=True, remove_any_zeroes=False,
-                  sort_keys=False):
+                  sort_keys=False, dtype=None):
     """ convert dictionary to numpy array of features
         remove_NaN = True will convert "NaN" string to 0.0
         remove_all_zeroes = True will omit any data points for which
@@ -47,10 +47,19 @@ def featureFormat(dictionary, features, remove_NaN=True,
             a string opens the corresponding pickle file with a preset key
             order (this is used for Python 3 compatibility, and sort_keys
             should be left as False for the course mini-projects).
+        dtype = numpy float dtype of the array, e.g. np.float32. By
+            default float64, or the dtype of a columnar.TypedDataset.
         NOTE: first feature is assumed to be 'poi' and is not checked for
             removal for zero or missing values.
     """
 
+    # Artifact bundle datasets format whole columns at once,
+    # their rows are already sorted by name.
+    if hasattr(dictionary, "feature_matrix") and not isinstance(sort_keys, str):
+        return dictionary.feature_matrix(features, remove_NaN,
+                                         remove_all_zeroes, remove_any_zeroes,
+                                         dtype)
+
     return_list = []
 
     # Key order - first branch is for Python 3 compatibility on mini-projects,
@@ -100,9 +109,23 @@ def featureFormat(dictionary, features, remove_NaN=True,
                 append = False
         ### Append the data point if flagged for addition.
         if append:
-            return_list.append(np.array(tmp_list))
+            return_list.append(np.array(tmp_list, dtype=dtype))
+
+    return np.array(return_list, dtype=dtype)
+
+
+def as_float(data):
+    """
+    data as a numpy array, float32 and float64
+    arrays kept as they are, anything else
+    (lists, integers) converted to float64.
+    """
+
+    data = np.asarray(data)
+    if data.dtype not in (np.float32, np.float64):
+        data = data.astype(np.float64)
 
-    return np.array(return_list)
+    return data
 
 
 def targetFeatureSplit(data):
@@ -9,11 +9,149 @@
     learning pipeline.
 """
 import numpy as np
-import pandas as pd
-from sklearn.preprocessing import RobustScaler
 
 
-def scale(datadict, feature_list):
+def _clean(value):
+    return 0 if value == "NaN" else value
+
+
+def _matrix(datadict, feature_list, rows=None):
+    """
+    Features of a slice of rows as a float
+    matrix, missing values replaced with zero.
+    """
+
+    if hasattr(datadict, "matrix"):
+        # columnar.TypedDataset
+        return datadict.matrix(feature_list, rows=rows)
+
+    names = list(datadict.keys())
+    if rows is not None:
+        names = names[rows]
+
+    return np.array([[_clean(datadict[n][f]) for f in feature_list]
+                     for n in names], dtype=np.float64).reshape(-1, len(feature_list))
+
+
+class ScalingTransform(object):
+    """
+    Fitted robust scaling: (x - center) / scale
+    for each feature.
+
+    It is plain data, so it can be stored with the
+    model artifact (to_dict / from_dict) and applied
+    to new records without refitting.
+
+    Parameters
+    ----------
+    features = list
+        Scaled features, in order.
+    center = array
+        Median of each feature.
+    scale = array
+        Interquartile range of each feature,
+        1 where it was zero.
+    """
+
+    def __init__(self, features, center, scale):
+        self.features = list(features)
+        self.center = np.asarray(center, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self._position = dict((f, j) for j, f in enumerate(self.features))
+
+    def to_dict(self):
+        return {
+                "features": self.features,
+                "center": self.center.tolist(),
+                "scale": self.scale.tolist()
+                }
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(state["features"], state["center"], state["scale"])
+
+    def transform_matrix(self, matrix, features=None):
+        """
+        Scale a (rows x features) matrix in one operation.
+
+        Parameters
+        ----------
+        matrix = array
+            Columns in the order of features.
+        features = list
+            Column names of matrix, self.features by
+            default. Columns that were not fitted are
+            left as they are.
+
+        A float32 matrix is scaled in float32.
+        """
+
+        from .feature_format import as_float
+
+        matrix = as_float(matrix)
+        dtype = matrix.dtype
+        if features is None:
+            return ((matrix - self.center.astype(dtype)) /
+                    self.scale.astype(dtype))
+
+        center = np.zeros(len(features), dtype=dtype)
+        scale = np.ones(len(features), dtype=dtype)
+        for j, feature in enumerate(features):
+            if feature in self._position:
+                center[j] = self.center[self._position[feature]]
+                scale[j] = self.scale[self._position[feature]]
+
+        return (matrix - center) / scale
+
+    def transform(self, datadict):
+        """
+        Scale every record of a data dictionary.
+
+        Returns
+        -------
+        data_dict = dict
+            New dictionary, as returned by scale, or a
+            new TypedDataset.
+        """
+
+        scaled = self.transform_matrix(_matrix(datadict, self.features))
+        if hasattr(datadict, "with_columns"):
+            columns = dict(zip(self.features, scaled.T))
+            return datadict.with_columns(columns).fill_missing()
+
+        names = list(datadict.keys())
+        scaled = scaled.tolist()
+
+        data_dict = {}
+        for name, values in zip(names, scaled):
+            person = dict((k, _clean(v)) for k, v in datadict[name].items())
+            person.update(zip(self.features, values))
+            data_dict[name] = person
+
+        return data_dict
+
+
+def fit(datadict, feature_list):
+    """
+    Fit robust scaling on the data dictionary,
+    missing values counted as zero.
+
+    Returns
+    -------
+    transform = ScalingTransform
+    """
+
+    matrix = _matrix(datadict, feature_list)
+    # Same statistics as sklearn's RobustScaler.
+    q25, center, q75 = np.percentile(matrix, [25, 50, 75], axis=0)
+    scale = q75 - q25
+    scale[scale == 0] = 1.0
+
+    return ScalingTransform(feature_list, center, scale)
+
+
+def scale(datadict, feature_list, streaming=False, batch_size=100000,
+          verbose=False):
     """
     Scale features within the data dictionary.
 
@@ -21,7 +159,9 @@ def scale(datadict, feature_list):
     data to be close to zero mean and unit variance.
 
     Uses a robust scaler to account for outliers
-    within the dataset.
+    within the dataset. Use fit and
+    ScalingTransform.transform to keep the
+    fitted scaling for new records.
 
     Parameters
     ----------
@@ -29,35 +169,232 @@ def scale(datadict, feature_list):
         Containing the data within a dictionary
     feature_list = list
         Contains all varibles to be scaled.
+    streaming = Boolean
+        Fit a StreamingRobustScaler over row batches
+        instead of in memory.
+    batch_size = int
+        Rows per batch when streaming.
+    verbose = Boolean
+        Print the change of the
+        exercised_stock_options mean.
     Returns
     -------
     data_dict = dict
         Data dicitonary after variable scaling.
     """
 
-    # Convert data dictionary, tranpose
-    # to have columns as variables
-    df = pd.DataFrame(datadict)
-    df = df.replace('NaN', np.NaN)
-    df = df.transpose()
+    if streaming:
+        transform = _fit_streaming(datadict, feature_list, batch_size)
+    else:
+        transform = fit(datadict, feature_list)
+    data_dict = transform.transform(datadict)
 
-    # Replace NaNs with zeros to so the pipeline works
-    df = df.replace(np.NaN, 0)
-    a = df['exercised_stock_options'].mean()
+    # Report results
+    if verbose:
+        feature = "exercised_stock_options"
+        a = np.mean(_matrix(datadict, [feature]))
+        b = np.mean(_matrix(data_dict, [feature]))
+        print("Mean changed from {0} to {1}".format(a, b))
 
-    # Robust scaler due to outliers in data
-    scl = RobustScaler()
+    return data_dict
 
-    # Return scaled featured back to DataFrame
-    df[feature_list] = scl.fit_transform(df[feature_list])
 
-    # Report results
-    b = df['exercised_stock_options'].mean()
-    print("Mean changed from {0} to {1}".format(a, b))
+def _fit_streaming(datadict, feature_list, batch_size):
+    """fit, one batch of rows at a time."""
 
-    # Tranpose back before convertin back to a
-    # dictionary
-    df = df.transpose()
-    data_dict = df.to_dict(orient='dict')
+    batches = (_matrix(datadict, feature_list,
+                       slice(start, start + batch_size))
+               for start in range(0, len(datadict), batch_size))
 
-    return data_dict
+    return StreamingRobustScaler().fit(batches).to_transform(feature_list)
+
+
+def iter_batches(matrix, batch_size=100000):
+    """
+    Row batches of a matrix, e.g. a memory
+    mapped .npy file, without loading it whole.
+    """
+
+    for start in range(0, len(matrix), batch_size):
+        yield matrix[start:start + batch_size]
+
+
+class StreamingRobustScaler(object):
+    """
+    Out of core RobustScaler.
+
+    Median and interquartile range of each column
+    are estimated with one KLL sketch per column
+    in a single pass over row batches, then batches
+    are scaled one at a time. Scalers fitted on
+    different parts of the data, e.g. in separate
+    processes, are combined with merge.
+
+    While every value fits in the sketches (about
+    k rows) the result equals RobustScaler. Beyond
+    that, the center and quartiles used are within
+    error_bound in rank of the exact ones, i.e. the
+    estimated median lies between the exact
+    (0.5 - error_bound) and (0.5 + error_bound)
+    quantiles.
+
+    Example
+    -------
+    scl = StreamingRobustScaler()
+    for batch in iter_batches(np.load(path, mmap_mode="r")):
+        scl.partial_fit(batch)
+    scaled = [scl.transform(b) for b in iter_batches(matrix)]
+
+    Parameters
+    ----------
+    k = int
+        Sketch size, see quantile_sketch.KLLSketch.
+    quantile_range = tuple
+        Percentiles used for the scale, as in RobustScaler.
+    seed = int
+        Seed for the sketches.
+    """
+
+    def __init__(self, k=None, quantile_range=(25.0, 75.0), seed=None):
+        from .quantile_sketch import DEFAULT_K
+
+        self.k = k or DEFAULT_K
+        self.quantile_range = quantile_range
+        self.seed = seed
+        self.sketches = None
+        self.center_ = None
+        self.scale_ = None
+
+    def partial_fit(self, batch):
+        """Add a (rows x features) batch to the sketches."""
+
+        from .quantile_sketch import KLLSketch
+
+        batch = np.asarray(batch, dtype=np.float64)
+        if self.sketches is None:
+            self.sketches = [KLLSketch(self.k, self.seed)
+                             for _ in range(batch.shape[1])]
+        for j, sketch in enumerate(self.sketches):
+            sketch.update(batch[:, j])
+        self.center_ = self.scale_ = None
+
+        return self
+
+    def fit(self, batches):
+        """Fit on an iterable of row batches in one pass."""
+
+        for batch in batches:
+            self.partial_fit(batch)
+        self._finalize()
+
+        return self
+
+    def merge(self, other):
+        """Combine with a scaler fitted on other rows."""
+
+        if other.sketches is None:
+            return self
+        if self.sketches is None:
+            self.sketches = other.sketches
+        else:
+            for mine, theirs in zip(self.sketches, other.sketches):
+                mine.merge(theirs)
+        self.center_ = self.scale_ = None
+
+        return self
+
+    def _finalize(self):
+        low, high = self.quantile_range
+        self.center_ = np.array([s.quantile(0.5) for s in self.sketches])
+        scale = np.array([s.quantile(high / 100.0) - s.quantile(low / 100.0)
+                          for s in self.sketches])
+        # Constant columns are left unscaled, as in RobustScaler.
+        scale[scale == 0] = 1.0
+        self.scale_ = scale
+
+    @property
+    def error_bound(self):
+        """Largest normalized rank error of the fitted quantiles."""
+
+        return max(s.error for s in self.sketches) if self.sketches else 0.0
+
+    def to_transform(self, features):
+        """The fitted center and scale as a ScalingTransform."""
+
+        if self.center_ is None:
+            self._finalize()
+
+        return ScalingTransform(features, self.center_, self.scale_)
+
+    def transform(self, batch):
+        from .feature_format import as_float
+
+        if self.center_ is None:
+            self._finalize()
+
+        batch = as_float(batch)
+
+        return ((batch - self.center_.astype(batch.dtype)) /
+                self.scale_.astype(batch.dtype))
+
+    def transform_batches(self, batches):
+        """Scale batches one at a time, as a generator."""
+
+        for batch in batches:
+            yield self.transform(batch)
+
+
+def _fit_rows(args):
+    path, start, stop, k, batch_size, seed = args
+    matrix = np.load(path, mmap_mode="r")
+    scaler = StreamingRobustScaler(k, seed=seed)
+    for batch in iter_batches(matrix[start:stop], batch_size):
+        scaler.partial_fit(batch)
+
+    return scaler
+
+
+def fit_npy(path, k=None, batch_size=100000, processes=1, seed=None):
+    """
+    Fit a StreamingRobustScaler on a .npy matrix
+    larger than memory.
+
+    The rows are split between worker processes,
+    each memory maps the file and sketches its
+    share, and the sketches are merged.
+
+    Parameters
+    ----------
+    path = string
+        .npy file of shape (rows, features).
+    processes = int
+        Worker processes.
+
+    Returns
+    -------
+    scaler = StreamingRobustScaler
+    """
+
+    rows = np.load(path, mmap_mode="r").shape[0]
+    bounds = np.linspace(0, rows, processes + 1).astype(int)
+    tasks = [(path, bounds[i], bounds[i + 1], k, batch_size,
+              None if seed is None else seed + i)
+             for i in range(processes)]
+
+    if processes > 1:
+        from multiprocessing import Pool
+        pool = Pool(processes)
+        try:
+            parts = pool.map(_fit_rows, tasks)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        parts = [_fit_rows(task) for task in tasks]
+
+    scaler = parts[0]
+    for part in parts[1:]:
+        scaler.merge(part)
+    scaler._finalize()
+
+    return scaler
@@ -7,9 +7,8 @@
     This module allows for automated feature
     selection during a machine learning pipeline.
 """
-import pandas as pd
-from sklearn.ensemble import AdaBoostClassifier
 from . import feature_format
+from .parallel import map_shared, shared
 
 
 def get_fs_clf():
@@ -17,12 +16,15 @@ def get_fs_clf():
     Get a classifier to be used
     for feature selection.
     """
+    from sklearn.ensemble import AdaBoostClassifier
+
     clf_fs = AdaBoostClassifier()
 
     return clf_fs
 
 
-def selection(dataset, feature_list, clf, cut_off=0.01):
+def selection(dataset, feature_list, clf, cut_off=0.01, importance="auto",
+              dtype=None, **permutation_args):
     """
     Creates a new list of features after
     removing the lowest important features.
@@ -44,10 +46,20 @@ def selection(dataset, feature_list, clf, cut_off=0.01):
     feature_list = list
         List of features to be used in featureFormat.
     clf = sklearn clf object
-        Pre-specified classifer from sklearn that
-        is compatible with feature importance methods.
+        Pre-specified classifer from sklearn. Classifiers
+        without feature_importances_, such as the logistic
+        regression pipeline, use permutation importance.
     cut_off = float
         0.01 set as default. Controls the cut off.
+    importance = string
+        "model" for feature_importances_, "permutation"
+        for permutation.permutation_importance, "auto"
+        for the first one available.
+    dtype = numpy dtype
+        Of the feature matrix, see featureFormat.
+    **permutation_args
+        Passed to permutation_importance, e.g. n_repeats,
+        folds or processes.
 
     Returns
     -------
@@ -55,12 +67,24 @@ def selection(dataset, feature_list, clf, cut_off=0.01):
         A new list of features after feature selection.
     """
 
+    import pandas as pd
+
     # Extract features and labels from dataset for local testing
-    data = feature_format.featureFormat(dataset, feature_list, sort_keys=True)
+    data = feature_format.featureFormat(dataset, feature_list, sort_keys=True,
+                                        dtype=dtype)
     labels, features = feature_format.targetFeatureSplit(data)
 
-    clf.fit(features, labels)
-    f_weight = clf.feature_importances_
+    # Fitted estimators with importances define feature_importances_
+    # on their class. The permutation engine fits its own clones,
+    # so clf itself is only fitted on the model path.
+    if importance == "model" or (importance == "auto" and
+                                 hasattr(type(clf), "feature_importances_")):
+        clf.fit(features, labels)
+        f_weight = clf.feature_importances_
+    else:
+        from .permutation import permutation_importance
+        f_weight = permutation_importance(clf, features, labels,
+                                          **permutation_args)["mean"]
 
     # poi removed as this has been seperated into the label.
     del feature_list[0]
@@ -78,3 +102,336 @@ def selection(dataset, feature_list, clf, cut_off=0.01):
     fs_list = ["poi"] + fs_list
 
     return fs_list
+
+
+def _draw_indices(labels, n_draws, sample_fraction, bootstrap, seed):
+    """
+    Row indices of every draw, stratified by class so
+    each draw keeps some POIs.
+    """
+
+    import numpy as np
+
+    rng = np.random.RandomState(seed)
+    classes = [np.flatnonzero(labels == c) for c in np.unique(labels)]
+
+    draws = []
+    for _ in range(n_draws):
+        rows = []
+        for members in classes:
+            if bootstrap:
+                rows.append(rng.choice(members, len(members), replace=True))
+            else:
+                size = max(1, int(round(sample_fraction * len(members))))
+                rows.append(rng.choice(members, size, replace=False))
+        draws.append(np.concatenate(rows))
+
+    return draws
+
+
+def _fit_draw(task):
+    """Feature importances of the estimator fitted on one draw."""
+
+    from sklearn.base import clone
+
+    rows, random_state = task
+    state = shared()
+    clf = clone(state["clf"])
+    if "random_state" in clf.get_params():
+        clf.set_params(random_state=random_state)
+    clf.fit(state["features"][rows], state["labels"][rows])
+
+    return clf.feature_importances_
+
+
+def stability_selection(dataset, feature_list, clf=None, n_draws=100,
+                        sample_fraction=0.5, bootstrap=False, cut_off=0.01,
+                        threshold=0.6, processes=None, seed=42, dtype=None):
+    """
+    Select the features that are important in
+    most of many resampled fits.
+
+    The estimator is fitted on n_draws subsamples
+    (or bootstrap samples) in a process pool. A
+    feature is counted as selected in a draw when
+    its importance is above cut_off, and kept when
+    it is selected in at least threshold of the
+    draws. Draws and estimator seeds come from seed,
+    so the result does not depend on processes.
+
+    Parameters
+    ----------
+    dataset = dict
+        Data is stored in a dict in this case.
+    feature_list = list
+        List of features to be used in featureFormat,
+        "poi" first.
+    clf = sklearn clf object
+        Estimator with feature_importances_,
+        get_fs_clf() by default.
+    n_draws = int
+        Number of resampled fits.
+    sample_fraction = float
+        Share of each class in a subsample.
+    bootstrap = Boolean
+        Draw with replacement instead, each class
+        keeping its size.
+    cut_off = float
+        Importance above which a feature counts
+        as selected in a draw.
+    threshold = float
+        Selection frequency needed to keep a feature.
+    processes = int
+        Worker processes, all CPUs by default.
+        1 runs in this process.
+    seed = int
+        Random seed.
+    dtype = numpy dtype
+        Of the feature matrix, see featureFormat.
+
+    Returns
+    -------
+    fs_list = list
+        Kept features, "poi" first.
+    report = dict
+        features, frequency (per feature),
+        importances (n_draws x features), and
+        the mean, std and 5/50/95th percentiles
+        of the importances.
+    """
+
+    import numpy as np
+
+    if clf is None:
+        clf = get_fs_clf()
+
+    data = feature_format.featureFormat(dataset, feature_list, sort_keys=True,
+                                        dtype=dtype)
+    labels = data[:, 0]
+    features = data[:, 1:]
+    names = list(feature_list[1:])
+
+    draws = _draw_indices(labels, n_draws, sample_fraction, bootstrap, seed)
+    tasks = [(rows, seed + i) for i, rows in enumerate(draws)]
+
+    # The data matrix goes to each worker once, not with each draw.
+    state = {"features": features, "labels": labels, "clf": clf}
+    importances = np.array(map_shared(_fit_draw, tasks, state, processes))
+    frequency = (importances > cut_off).mean(axis=0)
+
+    fs_list = ["poi"] + [f for f, freq in zip(names, frequency)
+                         if freq >= threshold]
+    report = {
+              "features": names,
+              "frequency": frequency,
+              "importances": importances,
+              "mean": importances.mean(axis=0),
+              "std": importances.std(axis=0),
+              "percentiles": np.percentile(importances, [5, 50, 95], axis=0)
+              }
+
+    return fs_list, report
+
+
+def _importances(clf):
+    """Feature importances, or absolute coefficients of linear models."""
+
+    import numpy as np
+
+    if hasattr(clf, "feature_importances_"):
+        return np.asarray(clf.feature_importances_)
+    if hasattr(clf, "coef_"):
+        return np.abs(np.atleast_2d(clf.coef_)).sum(axis=0)
+
+    raise ValueError("recursive elimination needs an estimator with "
+                     "feature_importances_ or coef_")
+
+
+def _warm_start(clf, previous, kept):
+    """
+    Start clf from the previous step's coefficients
+    of the kept features, if the estimator allows it.
+    """
+
+    if previous is None or not hasattr(previous, "coef_"):
+        return clf
+    if "warm_start" not in clf.get_params():
+        return clf
+
+    clf.set_params(warm_start=True)
+    clf.coef_ = previous.coef_[:, kept].copy()
+    if hasattr(previous, "intercept_"):
+        clf.intercept_ = previous.intercept_.copy()
+    if hasattr(previous, "classes_"):
+        clf.classes_ = previous.classes_
+
+    return clf
+
+
+def _eliminate(task):
+    """
+    Run the elimination on one fold of the plan,
+    or on every row when the fold is None.
+
+    Returns
+    -------
+    steps = list
+        (active feature indices, test score or None,
+        eliminated indices) for each step.
+    """
+
+    import numpy as np
+    from sklearn.base import clone
+    from .permutation import _default_scoring
+
+    fold, step, warm = task
+    state = shared()
+    features = state["features"]
+    labels = state["labels"]
+    scoring = state["scoring"] or _default_scoring
+    if fold is None:
+        train = test = None
+    else:
+        train, test = state["plan"][fold]
+
+    active = np.arange(features.shape[1])
+    previous = kept = None
+    steps = []
+    while len(active):
+        clf = clone(state["clf"])
+        if warm:
+            clf = _warm_start(clf, previous, kept)
+        if train is None:
+            clf.fit(features[:, active], labels)
+            score = None
+        else:
+            clf.fit(features[train][:, active], labels[train])
+            score = scoring(labels[test], clf.predict(features[test][:, active]))
+
+        # Lowest importances go first, ties by position.
+        order = np.argsort(_importances(clf), kind="mergesort")
+        n_drop = min(step, len(active) - 1) or 1
+        kept = np.sort(order[n_drop:])
+        steps.append((active.tolist(), score, active[order[:n_drop]].tolist()))
+
+        previous = clf
+        active = active[kept]
+
+    return steps
+
+
+def rfe_cv(dataset, feature_list, clf=None, folds=5, step=1, scoring=None,
+           warm_start=True, processes=None, seed=42, dtype=None):
+    """
+    Cross validated recursive feature elimination.
+
+    At each step the estimator is fitted on the
+    remaining features and the least important
+    ones are dropped. Every fold of one stratified
+    fold plan runs the whole elimination in its own
+    process, scoring each feature count on its test
+    rows; an elimination on all rows, run alongside,
+    gives the ranking. Linear estimators with a
+    warm_start parameter start each step from the
+    previous step's coefficients.
+
+    Parameters
+    ----------
+    dataset = dict
+        Data is stored in a dict in this case.
+    feature_list = list
+        List of features to be used in featureFormat,
+        "poi" first.
+    clf = sklearn clf object
+        Estimator with feature_importances_ or coef_,
+        get_fs_clf() by default.
+    folds = int
+        Stratified folds of the plan.
+    step = int
+        Features dropped per step.
+    scoring = function
+        score(y_true, y_pred), F1 by default.
+        Must be picklable with processes > 1.
+    warm_start = Boolean
+        Reuse coefficients between steps where possible.
+    processes = int
+        Worker processes, all CPUs by default.
+        1 runs in this process.
+    seed = int
+        Seed of the fold plan.
+    dtype = numpy dtype
+        Of the feature matrix, see featureFormat.
+
+    Returns
+    -------
+    fs_list = list
+        "poi" and the features of the best scoring
+        step of the path.
+    report = dict
+        path: one entry per step with its features,
+        mean and std of the fold scores and the
+        features eliminated after it. ranking: feature
+        mapped to 1 for the last survivors, higher
+        for features eliminated earlier. Use
+        path_features(report, n) for any other cut.
+    """
+
+    import numpy as np
+    from sklearn.model_selection import StratifiedKFold
+
+    if clf is None:
+        clf = get_fs_clf()
+
+    data = feature_format.featureFormat(dataset, feature_list, sort_keys=True,
+                                        dtype=dtype)
+    labels = data[:, 0]
+    features = data[:, 1:]
+    names = list(feature_list[1:])
+
+    cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+    plan = list(cv.split(features, labels))
+    tasks = [(fold, step, warm_start) for fold in range(folds)]
+    tasks.append((None, step, warm_start))
+
+    state = {"features": features, "labels": labels, "clf": clf,
+             "plan": plan, "scoring": scoring}
+    results = map_shared(_eliminate, tasks, state, processes)
+
+    # Fold paths are aligned by the number of features left.
+    fold_scores = {}
+    for steps in results[:-1]:
+        for active, score, _ in steps:
+            fold_scores.setdefault(len(active), []).append(score)
+
+    path = []
+    ranking = {}
+    full = results[-1]
+    for rank, (active, _, eliminated) in enumerate(reversed(full)):
+        for j in eliminated:
+            ranking[names[j]] = rank + 1
+    for active, _, eliminated in full:
+        scores = fold_scores.get(len(active), [])
+        path.append({
+                     "features": [names[j] for j in active],
+                     "score": float(np.mean(scores)) if scores else np.nan,
+                     "score_std": float(np.std(scores)) if scores else np.nan,
+                     "eliminated": [names[j] for j in eliminated]
+                     })
+
+    best = max(path, key=lambda entry: (entry["score"], -len(entry["features"])))
+    report = {"path": path, "ranking": ranking}
+
+    return ["poi"] + best["features"], report
+
+
+def path_features(report, n_features):
+    """
+    Features kept at the step of an rfe_cv path
+    with at most n_features left, "poi" first.
+    """
+
+    for entry in report["path"]:
+        if len(entry["features"]) <= n_features:
+            return ["poi"] + entry["features"]
+
+    return ["poi"]
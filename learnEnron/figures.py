@@ -8,10 +8,7 @@
     settings are designed to effectively communicate the data.
 """
 from __future__ import print_function
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
-from scipy import stats
 from .transformation import (
                             log_10, sq_rt
                             )
@@ -30,6 +27,8 @@ def common_set_up(ax_size):
         width, second value is height.
     """
 
+    import seaborn as sns
+
     sns.set_style("whitegrid")
     sns.set_style("ticks",
                   {'axes.grid': True,
@@ -213,6 +212,8 @@ def univariate(
         more than one subplot.
     """
 
+    import seaborn as sns
+
     common_set_up(ax_size)  # Apply basic plot style
 
     # Calulate the range of values
@@ -357,6 +358,8 @@ def boolean_bar(
         more than one subplot.
     """
 
+    import seaborn as sns
+
     common_set_up(ax_size)  # Apply basic plot style
 
     fig = sns.countplot(
@@ -422,6 +425,10 @@ def qq_plot(data, name, distribution="norm", ax_size=(7, 7)):
         width, second value is height.
     """
 
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from scipy import stats
+
     common_set_up(ax_size)
 
     fig = plt.figure(figsize=ax_size)
@@ -499,6 +506,9 @@ def qq_plot_var(data_a, data_b, name_a, name_b, ax_size=(7, 7), fit_zero=True):
         False will automatically fit the plot scales to the data.
     """
 
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     common_set_up(ax_size)
 
     fig = plt.figure(figsize=ax_size)
@@ -567,6 +577,8 @@ def count_bar(data, name, color_set=custom_bw, ax_size=(20, 6), highlight=None,
     Returns an object to be plotted.
     """
 
+    import seaborn as sns
+
     common_set_up(ax_size)  # Apply basic plot style
 
     fig = sns.countplot(data, saturation=1, ax=ax,
@@ -600,6 +612,8 @@ def bar(variable, name, data=None, x_v=None, color_set=custom_bw, ax_size=(20, 6
     Returns an object to be plotted.
     """
 
+    import seaborn as sns
+
     common_set_up(ax_size)  # Apply basic plot style
 
     fig = sns.barplot(x=x_v, y=variable, data=data, saturation=1, ax=ax,
@@ -657,6 +671,9 @@ def dist_transform_plot(x, univariate_name, fig_size=(18, 16), color_set=custom_
     transforms.
     """
 
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     common_set_up(fig_size)
 
     fig_plot, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(fig_size), facecolor='white')
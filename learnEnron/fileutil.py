@@ -0,0 +1,46 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    fileutil
+    ~~~~~~~~
+
+    Small file helpers shared by the caches,
+    stores and bundles of this package.
+"""
+from __future__ import print_function
+import hashlib
+import os
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def replace(src, dst):
+    """Atomic rename, falling back for Python 2."""
+
+    try:
+        os.replace(src, dst)
+    except AttributeError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+
+def file_digest(path, algorithm="sha256", chunk_size=CHUNK_SIZE):
+    """
+    Hex digest of a file's content, read in chunks.
+
+    Parameters
+    ----------
+    path = string
+    algorithm = string
+        Any hashlib algorithm name.
+    chunk_size = int
+        Bytes read at a time.
+    """
+
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
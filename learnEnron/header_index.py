@@ -0,0 +1,468 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    header index
+    ~~~~~~~~~~~~
+
+    Stream the From/To/Cc/Bcc headers from the
+    maildir once and keep an inverted index from
+    each address to the messages it sent or received.
+
+    The email count features found in the dataset
+    (from_messages, to_messages, from_poi_to_this_person,
+    from_this_person_to_poi and shared_receipt_with_poi)
+    can then be recomputed for any mailbox with a
+    few sparse matrix products.
+"""
+from __future__ import print_function
+import io
+import os
+import pickle
+from email.parser import Parser
+from email.utils import getaddresses
+import numpy as np
+from .poi_matcher import POIMatcher
+
+RECIPIENT_HEADERS = ("To", "Cc", "Bcc")
+
+try:
+    _STRING_TYPES = (str, unicode)
+except NameError:
+    # Python 3
+    _STRING_TYPES = (str,)
+
+EMAIL_COUNT_FEATURES = [
+                        "from_messages",
+                        "to_messages",
+                        "from_poi_to_this_person",
+                        "from_this_person_to_poi",
+                        "shared_receipt_with_poi"
+                        ]
+
+
+def read_header_block(path):
+    """
+    Read the lines of an email up to the first
+    blank line, without reading the body.
+    """
+
+    lines = []
+    # Not every Enron email is valid UTF-8.
+    with io.open(path, encoding="latin-1") as email_file:
+        for line in email_file:
+            if not line.strip():
+                break
+            lines.append(line)
+
+    return "".join(lines)
+
+
+def parse_addresses(path):
+    """
+    Return the sender and the recipients of
+    an email file, see parse_header_text.
+    """
+
+    return parse_header_text(read_header_block(path))
+
+
+def parse_header_text(text):
+    """
+    Return the sender and the recipients of an email.
+
+    Parameters
+    ----------
+    text = string
+        Header block of the email.
+
+    Returns
+    -------
+    sender = list
+        Lower case addresses in the From header.
+    recipients = list
+        Lower case addresses in the To, Cc and Bcc
+        headers, without duplicates.
+    """
+
+    headers = Parser().parsestr(text, headersonly=True)
+
+    sender = [a.strip().lower() for _, a in
+              getaddresses(headers.get_all("From", [])) if a.strip()]
+
+    recipients = []
+    for field in RECIPIENT_HEADERS:
+        for _, address in getaddresses(headers.get_all(field, [])):
+            address = address.strip().lower()
+            if address and address not in recipients:
+                recipients.append(address)
+
+    return sender, recipients
+
+
+def walk_maildir(maildir):
+    """Yield the path of every email file below maildir."""
+
+    for root, dirs, files in os.walk(maildir):
+        dirs.sort()
+        for name in sorted(files):
+            yield os.path.join(root, name)
+
+
+class HeaderIndex(object):
+    """
+    Inverted index over email headers.
+
+    Every message gets an integer id and every
+    address gets an integer id. sent[a] and
+    received[a] list the ids of the messages
+    address a appears in.
+
+    Paths are remembered with their mtime and size
+    so that update() only parses new or changed files.
+
+    Example
+    -------
+    index = HeaderIndex()
+    index.update("maildir")
+    counts = index.email_counts(person_addresses(data_dict), POIMatcher())
+    """
+
+    def __init__(self):
+        self.addresses = {}
+        self.sent = []
+        self.received = []
+        self.paths = []
+        self.stats = {}
+        self.live = []
+
+    def __len__(self):
+        return sum(self.live)
+
+    def _address_id(self, address):
+        idx = self.addresses.get(address)
+        if idx is None:
+            idx = len(self.addresses)
+            self.addresses[address] = idx
+            self.sent.append([])
+            self.received.append([])
+        return idx
+
+    def add_message(self, path, sender, recipients):
+        """
+        Add one message to the index and return its id.
+
+        A message already indexed under the same path
+        is dropped first, so re-adding replaces it.
+        """
+
+        self._retire(path)
+
+        msg_id = len(self.paths)
+        self.paths.append(path)
+        self.live.append(True)
+
+        for address in sender:
+            self.sent[self._address_id(address)].append(msg_id)
+        for address in recipients:
+            self.received[self._address_id(address)].append(msg_id)
+
+        return msg_id
+
+    def _retire(self, path):
+        """Drop the message indexed under path, if any."""
+
+        old = self.stats.get(path)
+        if old is not None and old[0] is not None:
+            self.live[old[0]] = False
+
+    def update(self, maildir, dedup=None, verbose=False):
+        """
+        Index every new or changed email below maildir.
+
+        Parameters
+        ----------
+        maildir = string
+            Root of the maildir tree.
+        dedup = dedup.Deduplicator
+            When given, copies of a message already seen
+            are registered with it but not indexed, so
+            the email counts are not inflated. Messages
+            are registered under their mail_store key.
+        verbose = Boolean
+            Print the number of parsed emails.
+
+        Returns
+        -------
+        n = int
+            Number of emails parsed in this call.
+        """
+
+        from .mail_store import normalize_key
+
+        base = os.path.dirname(os.path.abspath(maildir))
+        n = 0
+        for path in walk_maildir(maildir):
+            st = os.stat(path)
+            stat = (st.st_mtime, st.st_size)
+            old = self.stats.get(path)
+            if old is not None and old[1] == stat:
+                continue
+
+            if dedup is not None:
+                key = normalize_key(os.path.relpath(path, base))
+                with open(path, "rb") as email_file:
+                    if dedup.add(key, email_file.read())[1]:
+                        # Remembered without a message id, so
+                        # it is not read again until it changes.
+                        self._retire(path)
+                        self.stats[path] = (None, stat)
+                        continue
+
+            sender, recipients = parse_addresses(path)
+            msg_id = self.add_message(path, sender, recipients)
+            self.stats[path] = (msg_id, stat)
+            n += 1
+
+        if verbose:
+            print("Indexed {0} new emails, {1} in total".format(n, len(self)))
+
+        return n
+
+    def update_from_store(self, store, unique=True, verbose=False):
+        """
+        Index every message of a mail_store.MailStore
+        not indexed yet, reading only the header bytes.
+
+        Messages are keyed by their store key in
+        place of a path. With unique, only canonical
+        copies of a deduplicated store are indexed.
+
+        Returns
+        -------
+        n = int
+            Number of emails parsed in this call.
+        """
+
+        n = 0
+        keys = store.unique_keys() if unique else store.keys()
+        for key in keys:
+            location = store.index["entries"][key]
+            old = self.stats.get(key)
+            if old is not None and old[1] == location:
+                continue
+
+            text = store.header(key).decode("latin-1")
+            sender, recipients = parse_header_text(text)
+            msg_id = self.add_message(key, sender, recipients)
+            self.stats[key] = (msg_id, location)
+            n += 1
+
+        if verbose:
+            print("Indexed {0} new emails, {1} in total".format(n, len(self)))
+
+        return n
+
+    def messages_for(self, address, sent=True):
+        """
+        Ids of the live messages sent (or received)
+        by an address.
+        """
+
+        idx = self.addresses.get(address.lower())
+        if idx is None:
+            return []
+        postings = self.sent[idx] if sent else self.received[idx]
+
+        return [m for m in postings if self.live[m]]
+
+    def _incidence(self, postings):
+        """
+        Sparse (messages x addresses) 0/1 matrix
+        built from a list of postings.
+        """
+
+        from scipy import sparse
+
+        lengths = [len(p) for p in postings]
+        rows = np.fromiter((m for p in postings for m in p),
+                           dtype=np.int64, count=sum(lengths))
+        cols = np.repeat(np.arange(len(postings)), lengths)
+        data = np.ones(len(rows), dtype=np.float64)
+
+        matrix = sparse.csr_matrix((data, (rows, cols)),
+                                   shape=(len(self.paths), len(postings)))
+        live = sparse.diags(np.asarray(self.live, dtype=np.float64))
+
+        return live.dot(matrix).tocsr()
+
+    def matrices(self):
+        """
+        Sender and recipient incidence matrices,
+        messages as rows and addresses as columns.
+        """
+
+        return self._incidence(self.sent), self._incidence(self.received)
+
+    def address_vector(self, matcher):
+        """
+        0/1 vector over the index's addresses,
+        set where the address is in the matcher.
+        """
+
+        vector = np.zeros(len(self.addresses))
+        for address, idx in self.addresses.items():
+            if address in matcher:
+                vector[idx] = 1
+
+        return vector
+
+    def email_counts(self, people, poi_addresses):
+        """
+        Compute the five email count features
+        for every person in one pass.
+
+        Parameters
+        ----------
+        people = dict
+            Person name mapped to a list of addresses.
+        poi_addresses = POIMatcher or list
+            Addresses belonging to persons of interest.
+            A list is normalized through POIMatcher.
+
+        Returns
+        -------
+        counts = dict
+            Person name mapped to a dict of the
+            features in EMAIL_COUNT_FEATURES.
+        """
+
+        from scipy import sparse
+
+        if not isinstance(poi_addresses, POIMatcher):
+            poi_addresses = POIMatcher(poi_addresses)
+
+        names = sorted(people)
+        sent, received = self.matrices()
+
+        # Person x address membership, so a person with
+        # several addresses is counted once per message.
+        rows, cols = [], []
+        for i, name in enumerate(names):
+            for address in people[name]:
+                idx = self.addresses.get(address.lower())
+                if idx is not None:
+                    rows.append(i)
+                    cols.append(idx)
+        member = sparse.csr_matrix(
+                                   (np.ones(len(rows)), (rows, cols)),
+                                   shape=(len(names), len(self.addresses))
+                                   )
+
+        person_sent = (sent.dot(member.T) > 0).astype(np.float64)
+        person_received = (received.dot(member.T) > 0).astype(np.float64)
+
+        poi = self.address_vector(poi_addresses)
+        msg_from_poi = (sent.dot(poi) > 0).astype(np.float64)
+        msg_to_poi = (received.dot(poi) > 0).astype(np.float64)
+
+        columns = [
+                   np.asarray(person_sent.sum(axis=0)).ravel(),
+                   np.asarray(person_received.sum(axis=0)).ravel(),
+                   person_received.T.dot(msg_from_poi),
+                   person_sent.T.dot(msg_to_poi),
+                   person_received.T.dot(msg_to_poi)
+                   ]
+
+        counts = {}
+        for i, name in enumerate(names):
+            counts[name] = dict(
+                                (feature, int(column[i])) for feature, column
+                                in zip(EMAIL_COUNT_FEATURES, columns)
+                                )
+
+        return counts
+
+    def save(self, path):
+        """Pickle the index to disk."""
+
+        with open(path, "wb") as index_file:
+            pickle.dump(self.__dict__, index_file, protocol=2)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index written by save()."""
+
+        index = cls()
+        with open(path, "rb") as index_file:
+            index.__dict__.update(pickle.load(index_file))
+
+        return index
+
+
+def _is_address(value):
+    """
+    True for a usable email_address value. Missing
+    ones are "NaN", None, or 0 once email_ratios has
+    filled the missing values.
+    """
+
+    return (isinstance(value, _STRING_TYPES) and value != "NaN" and
+            bool(value.strip()))
+
+
+def person_addresses(datadict):
+    """
+    Map each person in the data dictionary
+    to the addresses in its email_address field.
+
+    Persons with a missing address are left out.
+    """
+
+    if hasattr(datadict, "text"):
+        # columnar.TypedDataset
+        column = datadict.text.get("email_address",
+                                   [None] * len(datadict.names))
+        pairs = zip(datadict.names, column)
+    else:
+        pairs = ((name, features.get("email_address", "NaN"))
+                 for name, features in datadict.items())
+
+    return dict((name, [address]) for name, address in pairs
+                if _is_address(address))
+
+
+def update_email_counts(datadict, counts):
+    """
+    Overwrite the email count features of the
+    data dictionary with recomputed counts.
+
+    Parameters
+    ----------
+    datadict = dictionary
+        Dataset keyed by person.
+    counts = dictionary
+        Output of HeaderIndex.email_counts.
+
+    Returns
+    -------
+    datadict = dictionary
+        The same dictionary, updated in place, or a
+        new TypedDataset.
+    """
+
+    if hasattr(datadict, "with_columns"):
+        rows = dict((name, i) for i, name in enumerate(datadict.names))
+        columns = dict((f, datadict.column(f).copy()) for f in EMAIL_COUNT_FEATURES)
+        masks = dict((f, datadict.missing(f).copy()) for f in EMAIL_COUNT_FEATURES)
+        for name, features in counts.items():
+            if name in rows:
+                for feature, value in features.items():
+                    columns[feature][rows[name]] = value
+                    masks[feature][rows[name]] = False
+        return datadict.with_columns(columns, masks)
+
+    for name, features in counts.items():
+        if name in datadict:
+            datadict[name].update(features)
+
+    return datadict
@@ -0,0 +1,391 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    mail store
+    ~~~~~~~~~~
+
+    Indexed store for the raw Enron emails.
+
+    Messages are appended to a few large shard
+    files and located through an offset table,
+    instead of one file per message on disk.
+    Keys are the member paths from the archive,
+    e.g. "maildir/bailey-s/deleted_items/101.",
+    so lines of from_sara.txt and from_chris.txt
+    can be used directly as keys. Every message
+    also has an integer id in insertion order.
+
+    Shards are memory-mapped when read, and
+    messages are returned as memoryview slices
+    of the map without copying.
+
+    usage: python -m learnEnron.mail_store path/to/maildir enron_store
+"""
+from __future__ import print_function
+import io
+import mmap
+import numbers
+import os
+import pickle
+import sys
+from collections import Counter
+from .dedup import Deduplicator, folder_of
+from .fileutil import replace
+
+INDEX_FILENAME = "index.pkl"
+SHARD_FORMAT = "shard_{0:05d}.dat"
+
+# Roll over to a new shard after 256 MB.
+DEFAULT_SHARD_SIZE = 256 * 1024 * 1024
+
+
+
+def normalize_key(key):
+    """
+    Turn a path as written in from_chris.txt,
+    from_sara.txt or by os.path.join into a key.
+
+    Surrounding white space, a leading "./" and
+    Windows separators are removed.
+    """
+
+    key = key.strip().replace("\\", "/")
+    while key.startswith("./"):
+        key = key[2:]
+
+    return key
+
+
+class MailStoreWriter(object):
+    """
+    Append messages to a mail store.
+
+    The offset table maps each key to
+    (shard, offset, length). It is written
+    when the writer is closed.
+
+    Example
+    -------
+    with MailStoreWriter("enron_store") as store:
+        store.add("maildir/bailey-s/deleted_items/101.", data)
+
+    With dedup, a message already stored under another
+    key is not written again: its key shares the offset
+    table entry of the canonical copy.
+
+    Parameters
+    ----------
+    store_dir = string
+        Directory holding the shards and index.
+    shard_size = int
+        Size in bytes after which a new shard is started.
+    dedup = Boolean
+        Eliminate duplicate messages, see dedup.Deduplicator.
+    """
+
+    def __init__(self, store_dir, shard_size=DEFAULT_SHARD_SIZE,
+                 dedup=False):
+        self.store_dir = store_dir
+        self.shard_size = shard_size
+
+        if not os.path.isdir(store_dir):
+            os.makedirs(store_dir)
+
+        index_path = os.path.join(store_dir, INDEX_FILENAME)
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as index_file:
+                self.index = _upgrade(pickle.load(index_file))
+        else:
+            self.index = {"shard": 0, "entries": {}, "ids": []}
+
+        self.dedup = None
+        if dedup:
+            state = self.index.get("dedup")
+            self.dedup = (Deduplicator.from_state(state) if state
+                          else Deduplicator())
+
+        self._shard = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _shard_path(self, shard):
+        return os.path.join(self.store_dir, SHARD_FORMAT.format(shard))
+
+    def add(self, key, data):
+        """
+        Append the bytes of one message under key.
+
+        Adding an existing key replaces its entry and
+        keeps its id, the old bytes stay in the shard
+        unreferenced.
+        """
+
+        key = normalize_key(key)
+
+        if self.dedup is not None:
+            canonical, duplicate = self.dedup.add(key, data)
+            if duplicate:
+                if key not in self.index["entries"]:
+                    self.index["ids"].append(key)
+                self.index["entries"][key] = self.index["entries"][canonical]
+                return
+
+        if self._shard is None:
+            self._shard = open(self._shard_path(self.index["shard"]), "ab")
+            self._shard.seek(0, os.SEEK_END)
+        elif self._shard.tell() + len(data) > self.shard_size:
+            self._shard.close()
+            self.index["shard"] += 1
+            self._shard = open(self._shard_path(self.index["shard"]), "ab")
+
+        if key not in self.index["entries"]:
+            self.index["ids"].append(key)
+
+        offset = self._shard.tell()
+        self._shard.write(data)
+        self.index["entries"][key] = (self.index["shard"], offset, len(data))
+
+    def close(self):
+        """Close the current shard and write the offset table."""
+
+        if self._shard is not None:
+            self._shard.close()
+            self._shard = None
+
+        if self.dedup is not None:
+            self.index["dedup"] = self.dedup.state()
+
+        index_path = os.path.join(self.store_dir, INDEX_FILENAME)
+        with open(index_path + ".tmp", "wb") as index_file:
+            pickle.dump(self.index, index_file, protocol=2)
+        replace(index_path + ".tmp", index_path)
+
+
+def _upgrade(index):
+    """Add message ids to an index written without them."""
+
+    if "ids" not in index:
+        index["ids"] = sorted(index["entries"])
+
+    return index
+
+
+class MailStore(object):
+    """
+    Read messages from a mail store.
+
+    Example
+    -------
+    store = MailStore("enron_store")
+    for line in open("from_chris.txt"):
+        text = parseOutText(store.open_text(line))
+
+    Parameters
+    ----------
+    store_dir = string
+        Directory written by MailStoreWriter.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, INDEX_FILENAME), "rb") as index_file:
+            self.index = _upgrade(pickle.load(index_file))
+        self._maps = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.index["ids"])
+
+    def __contains__(self, key):
+        return normalize_key(key) in self.index["entries"]
+
+    def keys(self):
+        """All message keys in id order."""
+
+        return list(self.index["ids"])
+
+    def unique_keys(self):
+        """
+        Keys of canonical copies only, in id order.
+        Equal to keys() for a store written without dedup.
+        """
+
+        canonical = self.index.get("dedup", {}).get("canonical", {})
+
+        return [key for key in self.index["ids"] if key not in canonical]
+
+    def canonical(self, key):
+        """Key of the canonical copy of a message."""
+
+        key = self.resolve(key)
+
+        return self.index.get("dedup", {}).get("canonical", {}).get(key, key)
+
+    def folder_counts(self, unique=False):
+        """
+        Messages per top level folder, counting every
+        original copy or only canonical copies.
+        """
+
+        state = self.index.get("dedup")
+        if state is None:
+            return dict(Counter(folder_of(key) for key in self.index["ids"]))
+
+        return dict(state["unique_folders"] if unique else state["folders"])
+
+    def key(self, message_id):
+        """Key of the message with the given id."""
+
+        return self.index["ids"][message_id]
+
+    def _map(self, shard):
+        mapped = self._maps.get(shard)
+        if mapped is None:
+            shard_path = os.path.join(self.store_dir,
+                                      SHARD_FORMAT.format(shard))
+            with open(shard_path, "rb") as shard_file:
+                mapped = mmap.mmap(shard_file.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+            self._maps[shard] = mapped
+
+        return mapped
+
+    def view(self, key):
+        """
+        Zero-copy memoryview of one message.
+
+        Parameters
+        ----------
+        key = string or int
+            Message key (a path as in from_chris.txt)
+            or integer message id.
+
+        Returns
+        -------
+        data = memoryview
+            Slice of the memory-mapped shard, valid
+            until the store is closed.
+        """
+
+        shard, offset, length = self._locate(key)
+
+        return memoryview(self._map(shard))[offset:offset + length]
+
+    def resolve(self, key):
+        """Normalized key for a key or message id."""
+
+        if isinstance(key, numbers.Integral):
+            return self.index["ids"][key]
+
+        return normalize_key(key)
+
+    def _locate(self, key):
+        return self.index["entries"][self.resolve(key)]
+
+    def header(self, key):
+        """
+        Bytes of the header block of one message,
+        up to the first blank line. The body is
+        never touched.
+        """
+
+        shard, offset, length = self._locate(key)
+        mapped = self._map(shard)
+        end = offset + length
+
+        stops = [i for i in (mapped.find(b"\n\n", offset, end),
+                             mapped.find(b"\r\n\r\n", offset, end)) if i >= 0]
+        stop = min(stops) if stops else end
+
+        return mapped[offset:stop]
+
+    def read(self, key):
+        """Return a copy of the message bytes."""
+
+        return self.view(key).tobytes()
+
+    def open_text(self, key, encoding="latin-1"):
+        """
+        Message as an open text file, so it can be
+        passed straight to parseOutText.
+        """
+
+        return io.StringIO(self.read(key).decode(encoding))
+
+    def close(self):
+        """Release the memory maps."""
+
+        for mapped in self._maps.values():
+            try:
+                mapped.close()
+            except BufferError:
+                # A memoryview is still held by the caller,
+                # the map is released when it is collected.
+                pass
+        self._maps = {}
+
+
+def pack_maildir(maildir, store_dir, shard_size=DEFAULT_SHARD_SIZE,
+                 dedup=True, verbose=True):
+    """
+    Pack a maildir tree into a mail store.
+
+    Keys are paths relative to the parent of
+    maildir, so they start with "maildir/" just
+    like the lines of from_chris.txt.
+
+    Parameters
+    ----------
+    maildir = string
+        Path to the maildir folder.
+    store_dir = string
+        Mail store directory to write.
+    shard_size = int
+        Size in bytes after which a new shard is started.
+    dedup = Boolean
+        Store duplicate messages only once.
+
+    Returns
+    -------
+    n = int
+        Number of messages packed.
+    """
+
+    maildir = os.path.abspath(maildir)
+    base = os.path.dirname(maildir)
+
+    n = 0
+    with MailStoreWriter(store_dir, shard_size, dedup) as store:
+        for root, dirs, files in os.walk(maildir):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                with open(path, "rb") as email_file:
+                    store.add(os.path.relpath(path, base), email_file.read())
+                n += 1
+                if verbose and n % 10000 == 0:
+                    print("packed", n, "emails")
+
+        if verbose:
+            print("packed", n, "emails into", store_dir)
+            if store.dedup is not None:
+                print(store.dedup.n_duplicates, "duplicates eliminated")
+
+    return n
+
+
+def main():
+    pack_maildir(sys.argv[1], sys.argv[2])
+
+
+if __name__ == '__main__':
+    main()
@@ -6,11 +6,7 @@
 """
 
 import sys
-import matplotlib.pyplot as plt
-import seaborn as sns
 from learnEnron.feature_format import featureFormat, targetFeatureSplit
-from sklearn.cross_validation import train_test_split
-from sklearn.linear_model import LinearRegression
 
 sys.path.append("../tools/")
 
@@ -41,6 +37,11 @@ def regression_plot(data_dict, target, variable,
         plotted. False sets only the first split to be plotted.
     """
 
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from sklearn.model_selection import train_test_split
+    from sklearn.linear_model import LinearRegression
+
     sns.set_style("whitegrid")
     sns.set_style("ticks",
                   {'axes.grid': True,
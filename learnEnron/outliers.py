@@ -0,0 +1,260 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    outliers
+    ~~~~~~~~
+
+    Data driven outlier screening, in place of
+    removing known bad rows by name.
+
+    Checks run on whole columns at once:
+
+        all_missing   every numeric feature is missing
+        aggregate     most values equal the sum of the
+                      other rows, e.g. a "TOTAL" row
+        non_person    the name is a single word or very
+                      long, or has an organisation word
+                      and the row has no email address
+                      or email counts
+        extreme       robust z-score above a threshold,
+                      per feature
+        isolation     optional IsolationForest, fitted
+                      in parallel
+
+    all_missing, aggregate and non_person rows are
+    removed. Extreme and isolated rows are only
+    reported by default: in this dataset the POIs
+    themselves are often the financial extremes.
+"""
+from __future__ import print_function
+import numpy as np
+from . import columnar
+from .header_index import EMAIL_COUNT_FEATURES
+
+# Words typical of organisation names. Some (PARK,
+# BANK, CO, TRUST) are also surnames, so a match is
+# only trusted together with a missing email contact.
+ORGANISATION_WORDS = frozenset([
+                                "AGENCY", "ASSOCIATES", "BANK", "CO",
+                                "COMPANY", "CORP", "CORPORATION", "FUND",
+                                "GROUP", "INC", "LLC", "LP", "LTD", "PARK",
+                                "PARTNERS", "THE", "TOTAL", "TRUST"
+                                ])
+_PUNCTUATION = dict((ord(c), None) for c in ".,")
+
+REMOVED_CHECKS = ("all_missing", "aggregate", "non_person")
+
+
+def non_person(names, max_tokens=5, no_contact=None):
+    """
+    Boolean array, True for names of a single word,
+    more than max_tokens words, or with an
+    organisation word.
+
+    Parameters
+    ----------
+    names = list
+    max_tokens = int
+    no_contact = numpy array
+        True for rows without an email address or
+        email counts, see no_contact. When given, an
+        organisation word only flags those rows.
+    """
+
+    words = ORGANISATION_WORDS
+    text = "\n".join(names).upper().translate(_PUNCTUATION)
+    tokens = [name.split() for name in text.split("\n")]
+
+    shape = np.fromiter((len(t) < 2 or len(t) > max_tokens for t in tokens),
+                        dtype=bool, count=len(names))
+    organisation = np.fromiter((not words.isdisjoint(t) for t in tokens),
+                               dtype=bool, count=len(names))
+    if no_contact is not None:
+        organisation &= no_contact
+
+    return shape | organisation
+
+
+def no_contact(typed):
+    """
+    Boolean array, True for rows of a TypedDataset
+    with no email address and every email count
+    feature missing.
+    """
+
+    missing = np.ones(len(typed.names), dtype=bool)
+    for feature in ["email_address"] + EMAIL_COUNT_FEATURES:
+        if feature in typed.text or feature in typed.arrays:
+            missing &= typed.missing(feature)
+
+    return missing
+
+
+def robust_z(matrix, missing):
+    """
+    Robust z-scores, 0.6745 (x - median) / MAD
+    per column, over the present values. Missing
+    entries and columns with a MAD of 0 get 0.
+    """
+
+    z = np.zeros(matrix.shape)
+    for j in range(matrix.shape[1]):
+        present = ~missing[:, j]
+        values = matrix[present, j]
+        if not len(values):
+            continue
+        median = np.median(values)
+        deviation = values - median
+        mad = np.median(np.abs(deviation))
+        if mad > 0:
+            z[present, j] = 0.6745 * deviation / mad
+
+    return z
+
+
+def isolation_scores(matrix, processes=None, seed=42, contamination=0.01):
+    """
+    IsolationForest outlier flags, the trees
+    are built in parallel.
+
+    Returns
+    -------
+    flags = numpy array
+        True for rows predicted as outliers.
+    """
+
+    from sklearn.ensemble import IsolationForest
+
+    forest = IsolationForest(n_jobs=processes or -1, random_state=seed,
+                             contamination=contamination)
+    forest.fit(matrix)
+
+    return forest.predict(matrix) == -1
+
+
+def screen(dataset, features=None, z_threshold=10.0, min_aggregate=3,
+           remove_extremes=False, isolation=False, remove_isolated=False,
+           processes=None, seed=42):
+    """
+    Screen a dataset for outliers and remove them.
+
+    Parameters
+    ----------
+    dataset = dict or columnar.TypedDataset
+        Raw dataset, "poi" is never screened.
+    features = list
+        Numeric features to check, all by default.
+    z_threshold = float
+        Absolute robust z-score reported as extreme.
+    min_aggregate = int
+        Values a row needs equal to the sum of the
+        other rows to count as an aggregate.
+    remove_extremes = Boolean
+        Also remove rows with an extreme value.
+    isolation = Boolean
+        Run the IsolationForest check.
+    remove_isolated = Boolean
+        Also remove the IsolationForest outliers.
+    processes = int
+        Jobs for the IsolationForest, all CPUs
+        by default.
+    seed = int
+        Seed for the IsolationForest.
+
+    Returns
+    -------
+    dataset = dict or columnar.TypedDataset
+        Same type as the input, without the
+        removed rows.
+    report = dict
+        rows, removed (name mapped to its reasons),
+        and the names flagged by each check; extreme
+        maps each feature to its flagged names, most
+        extreme first.
+    """
+
+    typed = dataset if columnar.is_typed(dataset) else \
+        columnar.from_datadict(dataset)
+    names = typed.names
+    if features is None:
+        features = [f for f in sorted(typed.arrays) if f != "poi"]
+
+    matrix = typed.matrix(features).astype(np.float64)
+    missing = np.column_stack([typed.missing(f) for f in features])
+
+    flags = {}
+    flags["all_missing"] = missing.all(axis=1)
+
+    # A row equal to the sum of every other row is
+    # half of the column total.
+    totals = matrix.sum(axis=0)
+    equal = (np.isclose(2 * matrix, totals, rtol=1e-9, atol=0) &
+             ~missing & (matrix != 0))
+    flags["aggregate"] = equal.sum(axis=1) >= min_aggregate
+
+    flags["non_person"] = non_person(names, no_contact=no_contact(typed))
+
+    # Medians and extremes among the remaining rows only.
+    structural = np.zeros(len(names), dtype=bool)
+    for check in REMOVED_CHECKS:
+        structural |= flags[check]
+    z = robust_z(matrix, missing | structural[:, None])
+    extreme = np.abs(z) > z_threshold
+    flags["extreme"] = extreme.any(axis=1)
+
+    if isolation:
+        flags["isolation"] = isolation_scores(matrix, processes, seed)
+
+    removed_checks = list(REMOVED_CHECKS)
+    if remove_extremes:
+        removed_checks.append("extreme")
+    if isolation and remove_isolated:
+        removed_checks.append("isolation")
+
+    remove = np.zeros(len(names), dtype=bool)
+    for check in removed_checks:
+        remove |= flags[check]
+
+    report = {
+              "rows": len(names),
+              "removed": dict((names[i], [c for c in removed_checks
+                                          if flags[c][i]])
+                              for i in np.flatnonzero(remove)),
+              "extreme": {}
+              }
+    for check, flagged in flags.items():
+        if check != "extreme":
+            report[check] = [names[i] for i in np.flatnonzero(flagged)]
+    for j, feature in enumerate(features):
+        rows = np.flatnonzero(extreme[:, j])
+        if len(rows):
+            rows = rows[np.argsort(-np.abs(z[rows, j]))]
+            report["extreme"][feature] = [names[i] for i in rows]
+
+    dropped = report["removed"]
+    if columnar.is_typed(dataset):
+        return dataset.drop(dropped), report
+
+    return dict((k, v) for k, v in dataset.items() if k not in dropped), report
+
+
+def format_report(report, top=3):
+    """Short text summary of a screen report."""
+
+    lines = ["Outlier screening: removed {0} of {1} rows"
+             .format(len(report["removed"]), report["rows"])]
+    for name, reasons in sorted(report["removed"].items()):
+        lines.append("    {0}: {1}".format(name, ", ".join(reasons)))
+
+    extreme = report["extreme"]
+    if extreme:
+        lines.append("Extreme values (kept):")
+        for feature in sorted(extreme):
+            flagged = extreme[feature]
+            lines.append("    {0}: {1} rows, e.g. {2}".format(
+                         feature, len(flagged), ", ".join(flagged[:top])))
+    if "isolation" in report:
+        lines.append("IsolationForest outliers: {0}"
+                     .format(", ".join(report["isolation"]) or "none"))
+
+    return "\n".join(lines)
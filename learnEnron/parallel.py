@@ -0,0 +1,69 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    parallel
+    ~~~~~~~~
+
+    Process pool helper for the resampling jobs of
+    feature_selection and permutation.
+
+    The data matrix is sent to each worker process
+    once, by the pool initializer, and read back
+    with shared() by the task function, instead of
+    being pickled with every task.
+"""
+from __future__ import print_function
+
+# State of this process, set by _init_worker.
+_shared = {}
+
+
+def _init_worker(state):
+    _shared.clear()
+    _shared.update(state)
+
+
+def shared():
+    """State dict passed to map_shared, in a task function."""
+
+    return _shared
+
+
+def map_shared(func, tasks, state, processes=None):
+    """
+    [func(task) for task in tasks], over a process pool.
+
+    Parameters
+    ----------
+    func = function
+        Module level task function, it reads state
+        with shared().
+    tasks = list
+        Small picklable arguments of func.
+    state = dict
+        Data shared by every task, e.g. the features,
+        labels and estimator.
+    processes = int
+        Worker processes, all CPUs by default.
+        1 runs in this process.
+
+    Returns
+    -------
+    results = list
+        In task order.
+    """
+
+    if processes == 1:
+        _init_worker(state)
+        try:
+            return [func(task) for task in tasks]
+        finally:
+            _shared.clear()
+
+    from multiprocessing import Pool
+    pool = Pool(processes, _init_worker, (state,))
+    try:
+        return pool.map(func, tasks)
+    finally:
+        pool.close()
+        pool.join()
@@ -8,7 +8,6 @@
     to group similar words together.
 """
 from __future__ import print_function
-from nltk.stem.snowball import SnowballStemmer
 import string
 import re
 
@@ -18,6 +17,15 @@ except AttributeError:
     # fallback for Python 2
     from string import maketrans
 
+
+def _remove_punctuation(text):
+    try:
+        return text.translate(maketrans("", "", string.punctuation))
+    except TypeError:
+        # Python 2, str.translate(table, deletechars)
+        return text.translate(maketrans("", ""), string.punctuation)
+
+
 def parseOutText(f, stem=True):
     """ given an opened email file f, parse out all text below the
         metadata block at the top
@@ -39,17 +47,18 @@ def parseOutText(f, stem=True):
     words = ""
     if len(content) > 1:
         # remove punctuation
-        text_string = (content[1].translate(string.maketrans("", ""),
-                       string.punctuation))
+        text_string = _remove_punctuation(content[1])
         if stem:
             # Split the text string into individual words, stem each word,
             # and append the stemmed word to words (make sure there's a single
             # space between each stemmed word).
+            from nltk.stem.snowball import SnowballStemmer
+
             words = []
             stemmer = SnowballStemmer("english")
 
             # REGEX to seperate out all words from a string into a list
-            wordList = re.sub("[^\w]", " ",  text_string).split()
+            wordList = re.sub(r"[^\w]", " ",  text_string).split()
 
             for word in wordList:
                 stem_word = stemmer.stem(word)
@@ -0,0 +1,146 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    permutation
+    ~~~~~~~~~~~
+
+    Permutation feature importance for any
+    fitted classifier.
+
+    For each cross validation fold the classifier
+    is fitted on the training rows, then every
+    feature of the test rows is shuffled in turn,
+    several times, and the drop in score is its
+    importance.
+
+    Features are permuted in batches: the test rows
+    are tiled once into a preallocated scratch
+    matrix with one block per feature of the batch,
+    each block gets its own column shuffled, and the
+    whole batch is scored with one predict call. The
+    shuffled columns are then restored from the
+    original, so the data is never copied per
+    permutation. Folds run in parallel processes.
+"""
+from __future__ import print_function
+import numpy as np
+from .feature_format import as_float
+from .parallel import map_shared, shared
+
+
+def _default_scoring(y_true, y_pred):
+    from sklearn.metrics import f1_score
+
+    return f1_score(y_true, y_pred)
+
+
+def _fold_importances(task):
+    """
+    Importances of every feature for every
+    repeat of one fold.
+
+    Returns
+    -------
+    importances = numpy array
+        (n_repeats x n_features) drops in score.
+    """
+
+    from sklearn.base import clone
+
+    train, test, n_repeats, batch_size, seed = task
+    state = shared()
+    features = state["features"]
+    labels = state["labels"]
+    scoring = state["scoring"] or _default_scoring
+
+    clf = clone(state["clf"])
+    clf.fit(features[train], labels[train])
+
+    x_test = features[test]
+    y_test = labels[test]
+    n_test, n_features = x_test.shape
+    baseline = scoring(y_test, clf.predict(x_test))
+
+    batch_size = min(batch_size, n_features)
+    scratch = np.tile(x_test, (batch_size, 1))
+    rng = np.random.RandomState(seed)
+
+    importances = np.empty((n_repeats, n_features))
+    for repeat in range(n_repeats):
+        for start in range(0, n_features, batch_size):
+            batch = list(range(start, min(start + batch_size, n_features)))
+            for b, j in enumerate(batch):
+                block = slice(b * n_test, (b + 1) * n_test)
+                scratch[block, j] = x_test[rng.permutation(n_test), j]
+
+            rows = len(batch) * n_test
+            predictions = clf.predict(scratch[:rows])
+
+            for b, j in enumerate(batch):
+                block = slice(b * n_test, (b + 1) * n_test)
+                importances[repeat, j] = (
+                    baseline - scoring(y_test, predictions[block])
+                    )
+                scratch[block, j] = x_test[:, j]
+
+    return importances
+
+
+def permutation_importance(clf, features, labels, n_repeats=5, folds=3,
+                           scoring=None, batch_size=8, processes=None,
+                           seed=42):
+    """
+    Cross validated permutation importance.
+
+    Parameters
+    ----------
+    clf = sklearn clf object
+        Any classifier, it is cloned and fitted
+        on the training rows of each fold.
+    features = array
+        (rows x features) matrix, float32
+        matrices are permuted in float32.
+    labels = array
+    n_repeats = int
+        Shuffles of each feature per fold.
+    folds = int
+        Stratified folds.
+    scoring = function
+        score(y_true, y_pred), higher is better.
+        F1 of the POI class by default.
+    batch_size = int
+        Features permuted and scored together.
+    processes = int
+        Worker processes, all CPUs by default.
+        1 runs in this process.
+    seed = int
+        Random seed, results do not depend on
+        processes or batch_size.
+
+    Returns
+    -------
+    result = dict
+        mean and var of each feature's importance,
+        and importances, the
+        (folds * n_repeats x features) matrix.
+    """
+
+    from sklearn.model_selection import StratifiedKFold
+
+    features = as_float(features)
+    labels = np.asarray(labels)
+
+    cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+    tasks = [(train, test, n_repeats, batch_size, seed + fold)
+             for fold, (train, test) in enumerate(cv.split(features, labels))]
+
+    state = {"features": features, "labels": labels, "clf": clf,
+             "scoring": scoring}
+    importances = np.vstack(map_shared(_fold_importances, tasks, state,
+                                       processes))
+
+    return {
+            "mean": importances.mean(axis=0),
+            "var": importances.var(axis=0),
+            "importances": importances
+            }
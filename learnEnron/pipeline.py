@@ -0,0 +1,295 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    pipeline
+    ~~~~~~~~
+
+    Run a machine learning pipeline as a graph of
+    stages with content addressed caching.
+
+    Each stage's key is a hash of its name, its code
+    (the function and every module of this package it
+    uses), its parameters and the keys of the stages
+    it depends on. Outputs are pickled into a local
+    artifact cache under that key, so after changing
+    one parameter only the stages downstream of it
+    are recomputed.
+"""
+from __future__ import print_function
+import ast
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import pickle
+import sys
+from time import time
+from . import trace
+from .fileutil import file_digest, replace
+
+PACKAGE = __name__.split(".")[0]
+
+
+def _in_package(name):
+    return name == PACKAGE or name.startswith(PACKAGE + ".")
+
+
+def _code_names(code):
+    """Global names used by a code object and the code nested in it."""
+
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _code_names(const)
+
+    return names
+
+
+def _used_modules(func):
+    """
+    Package modules a function refers to: its own
+    module, and the modules of the globals it uses.
+    """
+
+    modules = set()
+    for value in [func] + [func.__globals__.get(n) for n in
+                           _code_names(func.__code__)]:
+        if inspect.ismodule(value):
+            name = value.__name__
+        else:
+            name = getattr(value, "__module__", None)
+        if isinstance(name, str) and _in_package(name):
+            modules.add(name)
+
+    return modules
+
+
+def _imported_modules(name, path):
+    """Package modules imported anywhere in a module's source."""
+
+    with open(path, "rb") as f:
+        tree = ast.parse(f.read(), path)
+    package = name if path.endswith("__init__.py") else name.rpartition(".")[0]
+
+    imported = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imported.update(a.name for a in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base = package.rsplit(".", node.level - 1)[0]
+                base = base + "." + node.module if node.module else base
+            else:
+                base = node.module
+            imported.add(base)
+            # "from . import a" names submodules.
+            imported.update(base + "." + a.name for a in node.names)
+
+    return set(m for m in imported if _in_package(m))
+
+
+def _module_path(name):
+    module = sys.modules.get(name)
+    if module is None:
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            # An imported name, not a submodule.
+            return None
+
+    path = getattr(module, "__file__", None)
+    if path and path.endswith((".pyc", ".pyo")):
+        path = path[:-1]
+
+    return path if path and os.path.exists(path) else None
+
+
+def module_dependencies(func):
+    """
+    Source files of the package modules a stage
+    function uses, directly or through imports.
+
+    Returns
+    -------
+    files = dict
+        Module name mapped to its source path.
+    """
+
+    # Look through trace.traced and other functools.wraps wrappers.
+    while hasattr(func, "__wrapped__"):
+        func = func.__wrapped__
+    if getattr(func, "__code__", None) is None:
+        return {}
+
+    files = {}
+    pending = list(_used_modules(func))
+    while pending:
+        name = pending.pop()
+        if name in files:
+            continue
+        path = _module_path(name)
+        files[name] = path
+        if path is not None:
+            pending.extend(_imported_modules(name, path))
+
+    return dict((name, path) for name, path in files.items()
+                if path is not None)
+
+
+def _code_digest(func):
+    """
+    Hash of a function's source and of the source
+    files of the package modules it depends on, see
+    module_dependencies. The function's name is used
+    when its source is unavailable.
+    """
+
+    try:
+        code = inspect.getsource(func)
+    except (IOError, TypeError):
+        code = getattr(func, "__module__", "") + getattr(func, "__name__", "")
+
+    digest = hashlib.sha1(code.encode("utf-8"))
+    for name, path in sorted(module_dependencies(func).items()):
+        digest.update(name.encode("utf-8"))
+        digest.update(file_digest(path).encode("utf-8"))
+
+    return digest.hexdigest()
+
+
+class Stage(object):
+    """
+    One node of the pipeline.
+
+    Parameters
+    ----------
+    name = string
+        Unique stage name.
+    func = function
+        Called as func(*upstream outputs, **params).
+    inputs = list
+        Names of the stages whose outputs are passed
+        to func, in order.
+    params = dict
+        Keyword arguments for func. Must be JSON
+        serializable (other values are hashed by repr).
+    cache = Boolean
+        False always recomputes the stage.
+    """
+
+    def __init__(self, name, func, inputs=None, params=None, cache=True):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs or [])
+        self.params = dict(params or {})
+        self.cache = cache
+
+
+class Pipeline(object):
+    """
+    Graph of stages with an artifact cache.
+
+    Example
+    -------
+    pipe = Pipeline("cache")
+    pipe.add("load", load_data, params={"path": f})
+    pipe.add("ratios", feature_engineering.email_ratios, ["load"])
+    data = pipe.run("ratios")
+
+    Parameters
+    ----------
+    cache_dir = string
+        Directory for cached outputs. None disables caching.
+    verbose = Boolean
+        Report each stage as computed or cached.
+    """
+
+    def __init__(self, cache_dir=None, verbose=True):
+        self.cache_dir = cache_dir
+        self.verbose = verbose
+        self.stages = {}
+        self.keys = {}
+        self.outputs = {}
+
+        if cache_dir is not None and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+    def add(self, name, func, inputs=None, params=None, cache=True):
+        """Add a stage, see Stage for the parameters."""
+
+        if name in self.stages:
+            raise ValueError("stage {0} already defined".format(name))
+        for dependency in inputs or []:
+            if dependency not in self.stages:
+                raise ValueError("stage {0} depends on unknown stage {1}"
+                                 .format(name, dependency))
+
+        self.stages[name] = Stage(name, func, inputs, params, cache)
+
+        return self
+
+    def key(self, name):
+        """
+        Content address of a stage's output.
+
+        Stages can only depend on stages added before
+        them, so the recursion always terminates.
+        """
+
+        if name not in self.keys:
+            stage = self.stages[name]
+            description = json.dumps(
+                                     {
+                                      "name": stage.name,
+                                      "code": _code_digest(stage.func),
+                                      "params": stage.params,
+                                      "inputs": [self.key(i) for i in stage.inputs]
+                                      },
+                                     sort_keys=True,
+                                     default=repr
+                                     )
+            self.keys[name] = hashlib.sha256(
+                                             description.encode("utf-8")
+                                             ).hexdigest()
+
+        return self.keys[name]
+
+    def _cache_path(self, name):
+        return os.path.join(self.cache_dir,
+                            "{0}-{1}.pkl".format(name, self.key(name)[:16]))
+
+    def run(self, name):
+        """
+        Return the output of a stage, computing
+        it and any stale upstream stages first.
+        """
+
+        if name in self.outputs:
+            return self.outputs[name]
+
+        stage = self.stages[name]
+        use_cache = self.cache_dir is not None and stage.cache
+        path = self._cache_path(name) if use_cache else None
+
+        if use_cache and os.path.exists(path):
+            with open(path, "rb") as cached:
+                output = pickle.load(cached)
+            if self.verbose:
+                print("[{0}] cached".format(name))
+        else:
+            args = [self.run(dependency) for dependency in stage.inputs]
+            t0 = time()
+            with trace.span("stage:" + name):
+                output = stage.func(*args, **stage.params)
+            if self.verbose:
+                print("[{0}] computed in {1} s"
+                      .format(name, round(time()-t0, 3)))
+            if use_cache:
+                with open(path + ".tmp", "wb") as out:
+                    pickle.dump(output, out, protocol=2)
+                replace(path + ".tmp", path)
+
+        self.outputs[name] = output
+
+        return output
@@ -0,0 +1,205 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    poi matcher
+    ~~~~~~~~~~~
+
+    Fast lookup of POI email addresses.
+
+    The addresses from poi_email_addresses.poiEmails
+    are normalized once into a hash set, and an
+    Aho-Corasick automaton is built over them so a
+    whole recipient header can be scanned for POI
+    addresses in a single pass.
+"""
+from __future__ import print_function
+import os
+import re
+import sys
+from collections import deque
+
+# Characters that may appear inside an address. A match
+# must not be preceded or followed by one of these, so
+# "skilling@enron.com" is not found inside "jskilling@enron.com".
+ADDRESS_CHARS = frozenset("abcdefghijklmnopqrstuvwxyz0123456789._%+-@")
+
+# Quote characters found in the Enron headers,
+# e.g. "joe'.'hirko@enron.com" or "'bowen@enron.com".
+QUOTE_CHARS = "'\""
+
+SPLIT_ADDRESSES = re.compile(
+    r"[a-z0-9._%+\-]+@[a-z0-9\-]+(?:\.[a-z0-9\-]+)*?\.(?:com|net|org|edu|gov|nt)"
+    )
+
+
+def load_poi_emails():
+    """
+    Return the raw list of POI addresses from
+    resources/other/poi_email_addresses.py
+    """
+
+    file_dir = os.path.dirname(os.path.realpath(__file__))
+    other_dir = os.path.join(file_dir, "..", "resources", "other")
+    if other_dir not in sys.path:
+        sys.path.append(other_dir)
+    from poi_email_addresses import poiEmails
+
+    return poiEmails()
+
+
+def normalize_text(text):
+    """Lower case text and drop quote characters."""
+
+    text = text.lower()
+    for quote in QUOTE_CHARS:
+        text = text.replace(quote, "")
+
+    return text
+
+
+def normalize_address(address):
+    """
+    Normalize one entry of the POI address list.
+
+    Entries are lower cased and stripped of quotes.
+    Entries holding more than one address, caused by
+    a missing comma in the source list, are split.
+
+    Parameters
+    ----------
+    address = string
+        Raw address entry.
+
+    Returns
+    -------
+    addresses = list
+        One or more normalized addresses.
+    """
+
+    address = normalize_text(address.strip())
+    if address.count("@") > 1:
+        return SPLIT_ADDRESSES.findall(address)
+
+    return [address] if address else []
+
+
+class POIMatcher(object):
+    """
+    Hash set and multi-pattern automaton
+    over normalized POI addresses.
+
+    Example
+    -------
+    matcher = POIMatcher()
+    "Kenneth.Lay@enron.com" in matcher
+    matcher.match("To: jeff.skilling@enron.com, someone@enron.com")
+
+    Parameters
+    ----------
+    addresses = list
+        Raw POI addresses, defaults to poiEmails().
+    """
+
+    def __init__(self, addresses=None):
+        if addresses is None:
+            addresses = load_poi_emails()
+
+        normalized = []
+        for entry in addresses:
+            for address in normalize_address(entry):
+                if address not in normalized:
+                    normalized.append(address)
+
+        self.addresses = normalized
+        self.address_set = frozenset(normalized)
+        self._build()
+
+    def __contains__(self, address):
+        return normalize_text(address.strip()) in self.address_set
+
+    def __len__(self):
+        return len(self.address_set)
+
+    def _build(self):
+        """
+        Build the goto, failure and output
+        tables of the Aho-Corasick automaton.
+        """
+
+        goto = [{}]
+        output = [[]]
+
+        for address in self.addresses:
+            state = 0
+            for char in address:
+                nxt = goto[state].get(char)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][char] = nxt
+                    goto.append({})
+                    output.append([])
+                state = nxt
+            output[state].append(address)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and char not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(char, 0)
+                output[nxt] = output[nxt] + output[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+
+    def match(self, header):
+        """
+        Find every POI address in a header line.
+
+        Runs in time proportional to the length of
+        the header plus the number of matches.
+
+        Parameters
+        ----------
+        header = string
+            Raw header value, e.g. a To or Cc line.
+
+        Returns
+        -------
+        hits = list
+            Normalized POI addresses found, in order
+            of first appearance and without duplicates.
+        """
+
+        text = normalize_text(header)
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+
+        hits = []
+        state = 0
+        for end, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            for address in output[state]:
+                start = end - len(address) + 1
+                if start > 0 and text[start - 1] in ADDRESS_CHARS:
+                    continue
+                if end + 1 < len(text) and text[end + 1] in ADDRESS_CHARS:
+                    continue
+                if address not in hits:
+                    hits.append(address)
+
+        return hits
+
+    def count(self, header):
+        """Number of distinct POI addresses in a header."""
+
+        return len(self.match(header))
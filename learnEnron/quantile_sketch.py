@@ -0,0 +1,160 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    quantile sketch
+    ~~~~~~~~~~~~~~~
+
+    KLL quantile sketch (Karnin, Lang and Liberty,
+    2016) for streaming medians and quartiles.
+
+    Values are kept in a stack of compactors; an
+    item at level h stands for 2**h input values.
+    When the sketch is full, the lowest full level
+    is sorted and every other item, from a random
+    offset, is promoted one level up. Memory stays
+    around 3k items whatever the stream length,
+    and two sketches merge by concatenating their
+    levels and compacting, so sketches built in
+    separate processes can be combined.
+
+    Until the first compaction the sketch holds
+    every value and quantiles are exact, with the
+    same linear interpolation as numpy.percentile.
+"""
+from __future__ import print_function
+import math
+import numpy as np
+
+DEFAULT_K = 400
+
+
+def rank_error(k):
+    """
+    Normalized rank error of a sketch of size k,
+    at 99% confidence, from the empirical fit
+    used by Apache DataSketches.
+    """
+
+    return 2.296 / k ** 0.9723
+
+
+class KLLSketch(object):
+    """
+    Mergeable quantile sketch for one feature.
+
+    Example
+    -------
+    sketch = KLLSketch()
+    for batch in batches:
+        sketch.update(batch)
+    median = sketch.quantile(0.5)
+
+    Parameters
+    ----------
+    k = int
+        Size of the top compactor. The rank error
+        is about rank_error(k), 0.7% for k = 400.
+    seed = int
+        Seed for the compaction offsets.
+    """
+
+    def __init__(self, k=DEFAULT_K, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self.rng = np.random.RandomState(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2.0 / 3) ** depth)))
+
+    def _size(self):
+        return sum(len(items) for items in self.levels)
+
+    def _max_size(self):
+        return sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def _compress(self):
+        while self._size() > self._max_size():
+            for h, items in enumerate(self.levels):
+                if len(items) >= self._capacity(h):
+                    break
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+
+            items = np.sort(self.levels[h])
+            # An odd item out stays at its level.
+            keep = items[:len(items) % 2]
+            items = items[len(items) % 2:]
+            promoted = items[self.rng.randint(2)::2]
+
+            self.levels[h] = keep
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+
+    def update(self, values):
+        """Add a batch of values, NaNs are ignored."""
+
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+        return self
+
+    def merge(self, other):
+        """Add another sketch's values to this one."""
+
+        if other.k != self.k:
+            raise ValueError("cannot merge sketches with different k")
+
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self._compress()
+
+        return self
+
+    @property
+    def exact(self):
+        """True while no value has been discarded."""
+
+        return all(len(items) == 0 for items in self.levels[1:])
+
+    @property
+    def error(self):
+        """Normalized rank error, 0 while exact."""
+
+        return 0.0 if self.exact else rank_error(self.k)
+
+    def quantile(self, q):
+        """
+        Estimated q quantile, q in [0, 1].
+
+        Returns NaN for an empty sketch.
+        """
+
+        if self.n == 0:
+            return np.nan
+        if self.exact:
+            return float(np.percentile(self.levels[0], 100.0 * q))
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h)
+                                  for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind="mergesort")
+        items = items[order]
+        # Midpoint ranks of each item's weight,
+        # interpolated like numpy.percentile.
+        cumulative = np.cumsum(weights[order])
+        ranks = (cumulative - weights[order] / 2.0) / cumulative[-1]
+
+        return float(np.interp(q, ranks, items))
+
+    def quantiles(self, qs):
+        return [self.quantile(q) for q in qs]
@@ -0,0 +1,491 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    serve
+    ~~~~~
+
+    Long running scoring service for the fitted
+    POI classifier.
+
+    The classifier and feature list are loaded once,
+    from a my_artifact bundle or the my_*.pkl files.
+    Requests are queued and scored in micro-batches:
+    the batcher waits at most max_wait_ms for up to
+    max_batch records, vectorizes them with the
+    featureFormat rules ("NaN" is 0, values are
+    floats) and calls predict_proba once per batch.
+    Records are raw, as in final_project_dataset.pkl:
+    the derived features of feature_engineering are
+    computed for each record, and a bundle's fitted
+    scaling is applied as one vectorized operation
+    per batch.
+
+    Requests are JSON, either over localhost HTTP:
+
+        POST /score   {"records": {"NAME": {feature: value, ...}}}
+        GET  /stats   latency percentiles in ms
+        GET  /health
+
+    or over a UNIX socket, one JSON request per line,
+    {"records": ...} to score or {"stats": true}.
+
+    Responses map each name to
+    {"probability": p, "prediction": 0 or 1}, or to
+    {"error": message} for a malformed record.
+
+    A model without a fitted scaling, such as the
+    my_*.pkl files, is only served with --unscaled.
+
+    usage: python -m learnEnron.serve [--artifact my_artifact]
+                                      [--port 8765 | --unix poi.sock]
+                                      [--unscaled]
+"""
+from __future__ import print_function
+import argparse
+import json
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import deque
+import numpy as np
+from . import artifact, feature_engineering
+
+try:
+    import queue
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import (ThreadingMixIn, StreamRequestHandler,
+                              UnixStreamServer)
+except ImportError:
+    # Python 2
+    import Queue as queue
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import (ThreadingMixIn, StreamRequestHandler,
+                              UnixStreamServer)
+
+CLF_PICKLE_FILENAME = "my_classifier.pkl"
+FEATURE_LIST_FILENAME = "my_feature_list.pkl"
+
+
+def load_model(path=".", unscaled=False):
+    """
+    Load the classifier, feature list and
+    fitted scaling.
+
+    Parameters
+    ----------
+    path = string
+        An artifact bundle, or a directory holding
+        my_classifier.pkl and my_feature_list.pkl.
+    unscaled = Boolean
+        Accept a model without a fitted scaling, the
+        records are then scored as they are. Without
+        it such a model is refused, since a classifier
+        trained on scaled features gives meaningless
+        scores for raw values.
+
+    Returns
+    -------
+    clf = classifier
+    feature_list = list
+    scaling = feature_scaling.ScalingTransform
+        None only when unscaled is True.
+    """
+
+    if artifact.is_bundle(path):
+        bundle = artifact.ArtifactBundle(path)
+        clf, feature_list, scaling = (bundle.classifier, bundle.feature_list,
+                                      bundle.scaling)
+    else:
+        with open(os.path.join(path, CLF_PICKLE_FILENAME), "rb") as f:
+            clf = pickle.load(f)
+        with open(os.path.join(path, FEATURE_LIST_FILENAME), "rb") as f:
+            feature_list = pickle.load(f)
+        # The pickle files do not hold the scaling.
+        scaling = None
+
+    if scaling is None and not unscaled:
+        raise ValueError("{0} holds no fitted scaling; rewrite it as an "
+                         "artifact bundle with poi_id.py, or pass "
+                         "--unscaled if the model was trained on raw "
+                         "values".format(path))
+
+    return clf, feature_list, scaling
+
+
+def vectorize(records, features, registry=None):
+    """
+    Turn person records into a feature matrix
+    with the featureFormat conversion rules.
+
+    Derived features in features that a record
+    does not hold are computed from its raw
+    values with feature_engineering.derive_row.
+
+    Parameters
+    ----------
+    records = list
+        Dicts of feature values.
+    features = list
+        Features to extract, without "poi".
+    registry = expressions.FeatureRegistry
+        Derived features, see
+        feature_engineering.email_registry.
+
+    Returns
+    -------
+    matrix = numpy array
+        One row per valid record.
+    valid = list
+        Index of the record of each row.
+    errors = dict
+        Record index mapped to an error message.
+    """
+
+    if registry is None:
+        registry = feature_engineering.email_registry()
+    derived = [name for name in registry.features if name in features]
+
+    matrix = np.zeros((len(records), len(features)))
+    valid = []
+    errors = {}
+    for i, record in enumerate(records):
+        try:
+            names = [name for name in derived if name not in record]
+            if names:
+                record = dict(record)
+                record.update(feature_engineering.derive_row(record, registry,
+                                                             names))
+            for j, feature in enumerate(features):
+                value = record[feature]
+                matrix[i, j] = 0 if value == "NaN" else float(value)
+        except KeyError as e:
+            errors[i] = "key {0} not present".format(e.args[0])
+        except (TypeError, ValueError) as e:
+            errors[i] = str(e)
+        else:
+            valid.append(i)
+
+    return matrix[valid], valid, errors
+
+
+def positive_probability(clf, matrix):
+    """Probability of the POI class for every row."""
+
+    if hasattr(clf, "predict_proba"):
+        classes = list(clf.classes_)
+        return clf.predict_proba(matrix)[:, classes.index(1)]
+    if hasattr(clf, "decision_function"):
+        return 1 / (1 + np.exp(-clf.decision_function(matrix)))
+
+    return np.asarray(clf.predict(matrix), dtype=float)
+
+
+class LatencyTracker(object):
+    """Rolling window of request latencies."""
+
+    def __init__(self, window=10000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def add(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+            self.count += 1
+
+    def percentiles(self, points=(50, 90, 99)):
+        with self.lock:
+            samples = np.array(self.samples)
+        stats = {"count": self.count, "window": len(samples)}
+        for p in points:
+            stats["p{0}_ms".format(p)] = (
+                round(float(np.percentile(samples, p)) * 1000, 3)
+                if len(samples) else None
+                )
+
+        return stats
+
+
+class _Request(object):
+    def __init__(self, records):
+        self.records = records
+        self.result = None
+        self.start = time.time()
+        self.done = threading.Event()
+
+
+class Scorer(object):
+    """
+    Micro-batching scorer around a fitted classifier.
+
+    Example
+    -------
+    scorer = Scorer(clf, feature_list)
+    scorer.start()
+    scorer.score({"NAME": {"salary": 1000, ...}})
+
+    Parameters
+    ----------
+    clf = classifier
+        Fitted classifier.
+    feature_list = list
+        Feature list, "poi" first as in poi_id.py.
+    max_batch = int
+        Most records scored in one call.
+    max_wait_ms = float
+        How long the first request of a batch
+        waits for others to join it.
+    scaling = feature_scaling.ScalingTransform
+        Applied to raw records before scoring.
+    """
+
+    def __init__(self, clf, feature_list, max_batch=256, max_wait_ms=5.0,
+                 scaling=None):
+        self.clf = clf
+        self.scaling = scaling
+        self.features = [f for f in feature_list if f != "poi"]
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.latency = LatencyTracker()
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _collect(self):
+        """Block for one request, then gather more until full or timed out."""
+
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        size = len(first.records)
+        deadline = time.time() + self.max_wait
+
+        while size < self.max_batch:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)
+                break
+            batch.append(request)
+            size += len(request.records)
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            try:
+                self._score_batch(batch)
+            except Exception as e:
+                for request in batch:
+                    request.result = dict((name, {"error": str(e)})
+                                          for name, _ in request.records)
+            for request in batch:
+                self.latency.add(time.time() - request.start)
+                request.done.set()
+
+    def _score_batch(self, batch):
+        records = [record for request in batch for _, record in request.records]
+        matrix, valid, errors = vectorize(records, self.features)
+
+        results = [None] * len(records)
+        for i, message in errors.items():
+            results[i] = {"error": message}
+        if valid:
+            if self.scaling is not None:
+                matrix = self.scaling.transform_matrix(matrix, self.features)
+            probabilities = positive_probability(self.clf, matrix)
+            predictions = self.clf.predict(matrix)
+            for i, p, label in zip(valid, probabilities, predictions):
+                results[i] = {"probability": float(p), "prediction": int(label)}
+        self.batches += 1
+
+        position = 0
+        for request in batch:
+            names = [name for name, _ in request.records]
+            request.result = dict(zip(names, results[position:position + len(names)]))
+            position += len(names)
+
+    def score(self, records, timeout=None):
+        """
+        Score records, blocking until their batch is done.
+
+        Parameters
+        ----------
+        records = dict
+            Name mapped to a dict of feature values.
+
+        Returns
+        -------
+        results = dict
+            Name mapped to probability and prediction,
+            or to an error.
+        """
+
+        request = _Request(list(records.items()))
+        if not request.records:
+            return {}
+        self._queue.put(request)
+        if not request.done.wait(timeout):
+            raise RuntimeError("scoring timed out")
+
+        return request.result
+
+    def stats(self):
+        stats = self.latency.percentiles()
+        stats["batches"] = self.batches
+        return stats
+
+
+def _handle(scorer, request):
+    """Answer one decoded JSON request."""
+
+    if not isinstance(request, dict):
+        return {"error": "request must be a JSON object"}
+    if request.get("stats"):
+        return scorer.stats()
+    records = request.get("records")
+    if not isinstance(records, dict):
+        return {"error": "records must map names to feature dicts"}
+
+    return {"results": scorer.score(records)}
+
+
+class _HTTPHandler(BaseHTTPRequestHandler):
+    scorer = None
+
+    def _send(self, code, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send(200, self.scorer.stats())
+        elif self.path == "/health":
+            self._send(200, {"status": "ok"})
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/score":
+            self._send(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length).decode("utf-8"))
+        except ValueError:
+            self._send(400, {"error": "invalid JSON"})
+            return
+        response = _handle(self.scorer, request)
+        self._send(400 if "error" in response else 200, response)
+
+    def log_message(self, *args):
+        pass
+
+
+class _UnixHandler(StreamRequestHandler):
+    scorer = None
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                response = _handle(self.scorer, json.loads(line.decode("utf-8")))
+            except ValueError:
+                response = {"error": "invalid JSON"}
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class ThreadingUnixServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(scorer, port=8765, unix=None):
+    """
+    HTTP server on localhost:port, or a UNIX
+    socket server if unix is a path.
+    """
+
+    if unix is not None:
+        if os.path.exists(unix):
+            os.remove(unix)
+        handler = type("Handler", (_UnixHandler,), {"scorer": scorer})
+        return ThreadingUnixServer(unix, handler)
+
+    handler = type("Handler", (_HTTPHandler,), {"scorer": scorer})
+    return ThreadingHTTPServer(("127.0.0.1", port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="POI scoring service")
+    parser.add_argument("--artifact", default=".",
+                        help="artifact bundle or directory with my_*.pkl")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="UNIX socket path")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--unscaled", action="store_true",
+                        help="serve a model without a fitted scaling")
+    args = parser.parse_args(argv)
+
+    path = args.artifact
+    if path == "." and artifact.is_bundle("my_artifact"):
+        path = "my_artifact"
+    try:
+        clf, feature_list, scaling = load_model(path, args.unscaled)
+    except ValueError as e:
+        parser.error(str(e))
+
+    scorer = Scorer(clf, feature_list, args.max_batch, args.max_wait_ms,
+                    scaling).start()
+    server = make_server(scorer, args.port, args.unix)
+    print("scoring", len(scorer.features), "features on",
+          args.unix or "http://127.0.0.1:{0}".format(args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        scorer.stop()
+        if args.unix and os.path.exists(args.unix):
+            os.remove(args.unix)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,286 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    synthetic
+    ~~~~~~~~~
+
+    Generate Enron shaped datasets of any size.
+
+    A profile is fitted on final_project_dataset.pkl:
+    the POI rate, and per class the missing rate and
+    the observed values of every financial feature.
+    New people are drawn by resampling observed values
+    with a small multiplicative jitter, which keeps the
+    heavy tails and signs of the financials. The five
+    email counts are resampled as one block, so they
+    stay consistent with each other and are missing
+    together as in the real data.
+
+    Datasets come out with the same schema as
+    final_project_dataset.pkl: a dict keyed by name,
+    values stored as ints, missing values as "NaN".
+"""
+from __future__ import print_function
+import os
+import pickle
+import numpy as np
+
+FINANCIAL_FEATURES = [
+                      "bonus",
+                      "deferral_payments",
+                      "deferred_income",
+                      "director_fees",
+                      "exercised_stock_options",
+                      "expenses",
+                      "loan_advances",
+                      "long_term_incentive",
+                      "other",
+                      "restricted_stock",
+                      "restricted_stock_deferred",
+                      "salary",
+                      "total_payments",
+                      "total_stock_value"
+                      ]
+
+EMAIL_FEATURES = [
+                  "from_messages",
+                  "from_poi_to_this_person",
+                  "from_this_person_to_poi",
+                  "shared_receipt_with_poi",
+                  "to_messages"
+                  ]
+
+# Rows of the real data that are not people.
+NOT_PEOPLE = ["TOTAL", "THE TRAVEL AGENCY IN THE PARK"]
+
+file_dir = os.path.dirname(os.path.realpath(__file__))
+DATASET = os.path.join(file_dir, "..", "resources", "data",
+                       "final_project_dataset.pkl")
+
+
+def load_dataset(path=DATASET):
+    """Load final_project_dataset.pkl."""
+
+    with open(path, "rb") as data_file:
+        return pickle.load(data_file)
+
+
+def fit_profile(datadict=None):
+    """
+    Fit the generation profile on a dataset.
+
+    Parameters
+    ----------
+    datadict = dict
+        Dataset keyed by person, defaults to
+        final_project_dataset.pkl without the
+        rows that are not people.
+
+    Returns
+    -------
+    profile = dict
+        POI rate, and for each class (0, 1) the
+        missing rates and observed values.
+    """
+
+    if datadict is None:
+        datadict = load_dataset()
+        for name in NOT_PEOPLE:
+            datadict.pop(name, None)
+
+    people = list(datadict.values())
+    profile = {"poi_rate": np.mean([bool(p["poi"]) for p in people])}
+
+    for label in (0, 1):
+        group = [p for p in people if int(bool(p["poi"])) == label]
+        classes = {"financial": {}}
+
+        for feature in FINANCIAL_FEATURES:
+            values = np.array([p[feature] for p in group
+                               if p[feature] != "NaN"], dtype=np.float64)
+            classes["financial"][feature] = {
+                                             "missing": 1 - 1.0*len(values)/len(group),
+                                             "values": values
+                                             }
+
+        with_email = [p for p in group if p["to_messages"] != "NaN"]
+        without_email = [p for p in group if p["to_messages"] == "NaN"]
+        classes["email_missing"] = 1 - 1.0*len(with_email)/len(group)
+        classes["email_values"] = np.array(
+                                           [[p[f] for f in EMAIL_FEATURES]
+                                            for p in with_email],
+                                           dtype=np.float64
+                                           )
+        classes["address_without_email"] = (
+            np.mean([p["email_address"] != "NaN" for p in without_email])
+            if without_email else 0.0
+            )
+
+        profile[label] = classes
+
+    return profile
+
+
+def _resample(rng, values, n, jitter):
+    """Draw n values from the observed ones with a multiplicative jitter."""
+
+    if len(values) == 0:
+        return np.zeros(n)
+    draws = values[rng.randint(0, len(values), n)]
+
+    return np.round(draws * np.exp(rng.normal(0, jitter, n)))
+
+
+def generate_columns(n, profile=None, seed=42, jitter=0.1):
+    """
+    Generate a columnar synthetic dataset.
+
+    Parameters
+    ----------
+    n = int
+        Number of people.
+    profile = dict
+        Output of fit_profile, fitted on the
+        real dataset by default.
+    seed = int
+        Random seed, the output is reproducible.
+    jitter = float
+        Standard deviation of the log-normal
+        noise applied to resampled values.
+
+    Returns
+    -------
+    columns = dict
+        Feature name mapped to a float64 array with
+        NaN for missing values, plus "poi" (bool) and
+        "has_address" (bool) arrays.
+    """
+
+    if profile is None:
+        profile = fit_profile()
+    rng = np.random.RandomState(seed)
+
+    poi = rng.random_sample(n) < profile["poi_rate"]
+    columns = {"poi": poi, "has_address": np.zeros(n, dtype=bool)}
+    for feature in FINANCIAL_FEATURES + EMAIL_FEATURES:
+        columns[feature] = np.full(n, np.nan)
+
+    for label in (0, 1):
+        rows = np.flatnonzero(poi == bool(label))
+        classes = profile[label]
+
+        for feature in FINANCIAL_FEATURES:
+            stats = classes["financial"][feature]
+            present = rows[rng.random_sample(len(rows)) >= stats["missing"]]
+            columns[feature][present] = _resample(rng, stats["values"],
+                                                  len(present), jitter)
+
+        has_email = rng.random_sample(len(rows)) >= classes["email_missing"]
+        present = rows[has_email]
+        block = classes["email_values"]
+        if len(block):
+            picks = block[rng.randint(0, len(block), len(present))]
+            # One factor per row keeps the counts consistent,
+            # e.g. from_poi_to_this_person <= to_messages.
+            factor = np.exp(rng.normal(0, jitter, len(present)))[:, None]
+            picks = np.round(picks * factor)
+            for j, feature in enumerate(EMAIL_FEATURES):
+                columns[feature][present] = picks[:, j]
+
+        missing = rows[~has_email]
+        columns["has_address"][present] = True
+        columns["has_address"][missing] = (
+            rng.random_sample(len(missing)) < classes["address_without_email"]
+            )
+
+    return columns
+
+
+def person_names(n):
+    """Unique, sortable names such as "PERSON 0000001"."""
+
+    width = max(7, len(str(n)))
+
+    return ["PERSON {0:0{1}d}".format(i, width) for i in range(n)]
+
+
+def to_datadict(columns, names=None):
+    """
+    Convert generated columns to the dict of dicts
+    format of final_project_dataset.pkl.
+    """
+
+    n = len(columns["poi"])
+    if names is None:
+        names = person_names(n)
+
+    features = FINANCIAL_FEATURES + EMAIL_FEATURES
+    values = dict((f, columns[f].tolist()) for f in features)
+
+    datadict = {}
+    for i, name in enumerate(names):
+        person = {}
+        for feature in features:
+            value = values[feature][i]
+            person[feature] = "NaN" if value != value else int(value)
+        person["poi"] = bool(columns["poi"][i])
+        person["email_address"] = (
+            "{0}@enron.com".format(name.lower().replace(" ", "."))
+            if columns["has_address"][i] else "NaN"
+            )
+        datadict[name] = person
+
+    return datadict
+
+
+def to_typed(columns, names=None):
+    """
+    Convert generated columns to a columnar.TypedDataset
+    without going through the dict of dicts format.
+    """
+
+    from .columnar import TypedDataset
+
+    n = len(columns["poi"])
+    if names is None:
+        names = person_names(n)
+
+    arrays = {"poi": columns["poi"].astype(np.float64)}
+    masks = {}
+    for feature in FINANCIAL_FEATURES + EMAIL_FEATURES:
+        missing = np.isnan(columns[feature])
+        arrays[feature] = np.where(missing, 0, columns[feature])
+        if missing.any():
+            masks[feature] = np.packbits(missing)
+    addresses = [
+                 "{0}@enron.com".format(name.lower().replace(" ", "."))
+                 if has else None
+                 for name, has in zip(names, columns["has_address"])
+                 ]
+
+    return TypedDataset(names, arrays, masks, {"email_address": addresses},
+                        ["poi"])
+
+
+def generate(n, profile=None, seed=42, jitter=0.1):
+    """
+    Generate a synthetic dataset with the schema
+    of final_project_dataset.pkl.
+
+    Parameters
+    ----------
+    n = int
+        Number of people.
+    profile = dict
+        Output of fit_profile.
+    seed = int
+        Random seed.
+    jitter = float
+        See generate_columns.
+
+    Returns
+    -------
+    datadict = dict
+    """
+
+    return to_datadict(generate_columns(n, profile, seed, jitter))
@@ -0,0 +1,230 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    tar index
+    ~~~~~~~~~
+
+    Random access to single emails in the
+    enron_mail_20150507.tgz archive.
+
+    A plain gzip stream can only be read from the
+    start, so the archive is scanned once and
+    recompressed into independent gzip blocks
+    (block-gzip, as used by BGZF). While scanning,
+    every tar member's offset and size in the
+    uncompressed stream is recorded, together with
+    the compressed offset of every block.
+
+    Reading any email is then one seek and the
+    decompression of one or two small blocks.
+
+    usage: python -m learnEnron.tar_index enron_mail_20150507.tgz enron.bgz
+"""
+from __future__ import print_function
+import bisect
+import gzip
+import io
+import pickle
+import sys
+import tarfile
+import zlib
+
+# Uncompressed bytes per gzip block.
+BLOCK_SIZE = 64 * 1024
+
+INDEX_SUFFIX = ".idx"
+
+
+class BlockGzipWriter(object):
+    """
+    File-like object that compresses everything
+    written to it into independent gzip members
+    of BLOCK_SIZE uncompressed bytes.
+
+    blocks holds (uncompressed offset,
+    compressed offset) for every block.
+    """
+
+    def __init__(self, fileobj, block_size=BLOCK_SIZE, level=6):
+        self.fileobj = fileobj
+        self.block_size = block_size
+        self.level = level
+        self.blocks = []
+        self._buffer = []
+        self._buffered = 0
+        self._uncompressed = 0
+
+    def write(self, data):
+        self._buffer.append(data)
+        self._buffered += len(data)
+        while self._buffered >= self.block_size:
+            joined = b"".join(self._buffer)
+            self._write_block(joined[:self.block_size])
+            rest = joined[self.block_size:]
+            self._buffer = [rest]
+            self._buffered = len(rest)
+
+    def _write_block(self, data):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        block = compressor.compress(data) + compressor.flush()
+        self.blocks.append((self._uncompressed, self.fileobj.tell()))
+        self.fileobj.write(block)
+        self._uncompressed += len(data)
+
+    def close(self):
+        """Write the last partial block."""
+
+        if self._buffered:
+            self._write_block(b"".join(self._buffer))
+            self._buffer = []
+            self._buffered = 0
+
+        # Sentinel so every block knows where it ends.
+        self.blocks.append((self._uncompressed, self.fileobj.tell()))
+
+
+class _TeeReader(object):
+    """Pass reads through while copying them to a writer."""
+
+    def __init__(self, source, sink):
+        self.source = source
+        self.sink = sink
+
+    def read(self, size=-1):
+        data = self.source.read(size)
+        self.sink.write(data)
+        return data
+
+
+def build_index(tgz_path, bgz_path, block_size=BLOCK_SIZE, verbose=True):
+    """
+    Scan the gzip tar once, recompress it into
+    block-gzip and record each member's location.
+
+    Parameters
+    ----------
+    tgz_path = string
+        Original .tgz archive.
+    bgz_path = string
+        Block-gzip copy to write. The index is
+        written next to it with an .idx suffix.
+    block_size = int
+        Uncompressed bytes per block.
+
+    Returns
+    -------
+    index = TarIndex
+    """
+
+    members = {}
+    with open(bgz_path, "wb") as out:
+        writer = BlockGzipWriter(out, block_size)
+        with gzip.open(tgz_path, "rb") as source:
+            tee = _TeeReader(source, writer)
+            tfile = tarfile.open(fileobj=tee, mode="r|")
+            for member in tfile:
+                if member.isfile():
+                    members[member.name] = (member.offset_data, member.size)
+                    if verbose and len(members) % 10000 == 0:
+                        print("indexed", len(members), "members")
+            # Copy the tar padding that tarfile does not read.
+            while tee.read(block_size):
+                pass
+        writer.close()
+
+    index = {"members": members, "blocks": writer.blocks}
+    with open(bgz_path + INDEX_SUFFIX, "wb") as index_file:
+        pickle.dump(index, index_file, protocol=2)
+
+    if verbose:
+        print("indexed", len(members), "members in",
+              len(writer.blocks) - 1, "blocks")
+
+    return TarIndex(bgz_path)
+
+
+class TarIndex(object):
+    """
+    Read members of a block-gzip tar by name.
+
+    Example
+    -------
+    index = TarIndex("enron.bgz")
+    text = parseOutText(index.open_text("maildir/bailey-s/deleted_items/101."))
+
+    Parameters
+    ----------
+    bgz_path = string
+        Block-gzip copy written by build_index.
+    """
+
+    def __init__(self, bgz_path):
+        self.bgz_path = bgz_path
+        with open(bgz_path + INDEX_SUFFIX, "rb") as index_file:
+            index = pickle.load(index_file)
+        self.members = index["members"]
+        self.blocks = index["blocks"]
+        self._starts = [start for start, _ in self.blocks]
+        self._file = open(bgz_path, "rb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.members)
+
+    def __contains__(self, name):
+        return name in self.members
+
+    def close(self):
+        self._file.close()
+
+    def read(self, name):
+        """
+        Return the bytes of one member.
+
+        Parameters
+        ----------
+        name = string
+            Member path, e.g. "maildir/bailey-s/deleted_items/101."
+        """
+
+        offset, size = self.members[name]
+        first = bisect.bisect_right(self._starts, offset) - 1
+        last = bisect.bisect_right(self._starts, offset + size - 1) - 1 \
+            if size else first
+
+        start = self.blocks[first][1]
+        end = self.blocks[last + 1][1]
+        self._file.seek(start)
+        raw = self._file.read(end - start)
+
+        chunks = []
+        while raw:
+            decompressor = zlib.decompressobj(31)
+            chunks.append(decompressor.decompress(raw))
+            raw = decompressor.unused_data
+        data = b"".join(chunks)
+
+        skip = offset - self.blocks[first][0]
+
+        return data[skip:skip + size]
+
+    def open_text(self, name, encoding="latin-1"):
+        """
+        Member as an open text file, so it can be
+        passed straight to parseOutText.
+        """
+
+        return io.StringIO(self.read(name).decode(encoding))
+
+
+def main():
+    build_index(sys.argv[1], sys.argv[2])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Shared fixtures of the learnEnron tests."""
+from __future__ import print_function
+import io
+import os
+import tarfile
+import pytest
+
+EMAIL = """Message-ID: <{id}.JavaMail.evans@thyme>
+Date: Mon, 14 May 2001 16:39:00 -0700 (PDT)
+From: {sender}
+To: {to}
+Subject: {subject}
+X-From: Sender
+X-To: Recipient
+X-Folder: \\Sent
+X-Origin: Sender
+X-FileName: sender.nsf
+
+{body}
+"""
+
+
+def make_email(sender="phillip.allen@enron.com", to="tim.belden@enron.com",
+               subject="Forecast", body="Here is our forecast", id=1):
+    return EMAIL.format(id=id, sender=sender, to=to, subject=subject,
+                        body=body)
+
+
+@pytest.fixture
+def write_email(tmp_path):
+    """Write an email below tmp_path, returns its path."""
+
+    def write(relative, **fields):
+        path = tmp_path.joinpath(*relative.split("/"))
+        if not path.parent.exists():
+            os.makedirs(str(path.parent))
+        path.write_text(make_email(**fields))
+        return str(path)
+
+    return write
+
+
+# Members of the tarball fixture; sent/1. and
+# _sent_mail/1. are copies of one message.
+TARBALL_EMAILS = {
+                  "maildir/allen-p/sent/1.": make_email(id=1),
+                  "maildir/allen-p/_sent_mail/1.": make_email(id=1),
+                  "maildir/allen-p/sent/2.": make_email(
+                      id=2, body="Second message " * 40),
+                  "maildir/lay-k/inbox/1.": make_email(
+                      sender="kenneth.lay@enron.com", id=3)
+                  }
+
+
+@pytest.fixture
+def tarball(tmp_path):
+    """Small gzip tar laid out like enron_mail_20150507.tgz."""
+
+    path = str(tmp_path / "enron.tgz")
+    with tarfile.open(path, "w:gz") as tfile:
+        for name in sorted(TARBALL_EMAILS):
+            data = TARBALL_EMAILS[name].encode("latin-1")
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tfile.addfile(info, io.BytesIO(data))
+
+    return path
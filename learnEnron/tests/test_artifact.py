@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import json
+import numpy as np
+import pytest
+from learnEnron import artifact, feature_format, feature_scaling
+
+FEATURES = ["poi", "salary", "bonus"]
+
+
+def _dataset():
+    return {
+            "B PERSON": {"poi": True, "salary": 100.0, "bonus": "NaN",
+                         "email_address": "b@enron.com"},
+            "A PERSON": {"poi": False, "salary": 50.0, "bonus": 7.0,
+                         "email_address": "a@enron.com"},
+            "C PERSON": {"poi": False, "salary": "NaN", "bonus": "NaN",
+                         "email_address": "NaN"}
+            }
+
+
+@pytest.fixture
+def bundle(tmp_path):
+    from sklearn.tree import DecisionTreeClassifier
+
+    path = str(tmp_path / "my_artifact")
+    scaling = feature_scaling.fit(_dataset(), FEATURES[1:])
+    artifact.write_bundle(path, DecisionTreeClassifier(max_depth=2), _dataset(),
+                          FEATURES, scaling)
+    return path
+
+
+def test_columnar_dataset_reads_like_the_dict(bundle):
+    loaded = artifact.ArtifactBundle(bundle)
+    dataset = loaded.dataset
+
+    assert loaded.feature_list == FEATURES
+    assert dataset.keys() == ["A PERSON", "B PERSON", "C PERSON"]
+    assert dataset["B PERSON"] == {"poi": True, "salary": 100.0,
+                                   "bonus": "NaN"}
+    assert isinstance(loaded.columns, np.memmap)
+    assert loaded.classifier.max_depth == 2
+    assert list(loaded.scaling.features) == FEATURES[1:]
+
+    expected = feature_format.featureFormat(_dataset(), FEATURES,
+                                            sort_keys=True)
+    assert np.array_equal(feature_format.featureFormat(dataset, FEATURES),
+                          expected)
+
+
+def test_tampered_file_fails_verification(bundle):
+    with open(bundle + "/names.json", "w") as f:
+        f.write('["X"]')
+
+    with pytest.raises(ValueError):
+        artifact.ArtifactBundle(bundle).names
+    assert artifact.ArtifactBundle(bundle, verify=False).names == ["X"]
+
+
+def test_newer_version_is_refused(bundle):
+    with open(bundle + "/manifest.json") as f:
+        manifest = json.load(f)
+    manifest["version"] = artifact.VERSION + 1
+    with open(bundle + "/manifest.json", "w") as f:
+        json.dump(manifest, f)
+
+    with pytest.raises(ValueError):
+        artifact.ArtifactBundle(bundle)
+
+
+def test_dump_writes_plain_pickles_next_to_the_bundle(tmp_path, monkeypatch):
+    import pickle
+    import tester
+    from learnEnron import columnar
+
+    monkeypatch.chdir(tmp_path)
+    tester.dump_classifier_and_data("clf", columnar.from_datadict(_dataset()),
+                                    FEATURES)
+
+    assert artifact.is_bundle(tester.ARTIFACT_DIRNAME)
+    with open(tester.DATASET_PICKLE_FILENAME, "rb") as f:
+        dataset = pickle.load(f)
+    assert type(dataset) is dict
+    assert dataset == _dataset()
+    with open(tester.CLF_PICKLE_FILENAME, "rb") as f:
+        assert pickle.load(f) == "clf"
+    with open(tester.FEATURE_LIST_FILENAME, "rb") as f:
+        assert pickle.load(f) == FEATURES
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import pytest
+
+pytest.importorskip("nltk")
+
+from learnEnron import author_id  # noqa: E402
+
+SARA = "gas pipeline capacity nomination schedule volumes"
+CHRIS = "power trading desk book curve positions"
+
+
+@pytest.fixture
+def corpus(tmp_path, write_email):
+    """40 emails of each author with disjoint vocabularies."""
+
+    listings = []
+    for author, words in (("sara", SARA), ("chris", CHRIS)):
+        paths = []
+        for i in range(40):
+            relative = "maildir/{0}/sent/{1}.".format(author, i)
+            write_email(relative, body="{0} {1}".format(words, i))
+            paths.append(relative)
+        listing = tmp_path / "from_{0}.txt".format(author)
+        listing.write_text("\n".join(paths) + "\n")
+        listings.append(str(listing))
+
+    return str(tmp_path), listings, [0] * 40 + [1] * 40
+
+
+def test_labelled_emails_interleaves_authors(corpus):
+    _, listings, labels = corpus
+    pairs = list(author_id.labelled_emails(listings, labels))
+    assert len(pairs) == 80
+    assert [label for _, label in pairs[:4]] == [0, 1, 0, 1]
+    assert pairs[1][0] == "maildir/chris/sent/0."
+
+    with pytest.raises(ValueError):
+        list(author_id.labelled_emails(listings, labels[:-1]))
+
+
+def test_train_streams_and_scores_held_out(corpus):
+    corpus_dir, listings, labels = corpus
+    held_out = [p for p, _ in author_id.labelled_emails(listings, labels)
+                if author_id.is_test(p, 0.3)]
+    assert held_out
+
+    clfs, results = author_id.train(corpus_dir, test_size=0.3, batch_size=16,
+                                    n_features=2 ** 10,
+                                    author_files=listings, labels=labels)
+    assert set(results) == {"sgd", "perceptron", "naive_bayes"}
+    assert results["naive_bayes"]["accuracy"] == 1.0
+
+
+def test_read_email_accepts_non_utf8_bytes(tmp_path, write_email):
+    path = write_email("maildir/sara/sent/1.", body="pipeline")
+    with open(path, "ab") as f:
+        f.write(b"capacit\xe9\n")
+
+    assert author_id.read_email(str(tmp_path), "maildir/sara/sent/1.",
+                                stem=False).split()[-2:] == [
+        "pipeline", u"capacit\xe9"]
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import importlib.util
+import json
+import os
+import pytest
+
+BENCH_SUITE = os.path.join(os.path.dirname(__file__), "..", "..",
+                           "benchmarks", "bench_suite.py")
+
+
+@pytest.fixture
+def bench_suite():
+    spec = importlib.util.spec_from_file_location("bench_suite", BENCH_SUITE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _fail(data):
+    raise ValueError("broken\nsecond line")
+
+
+def test_failed_benchmark_sets_exit_code(bench_suite, tmp_path, capsys,
+                                         monkeypatch):
+    monkeypatch.setattr(bench_suite, "BENCHMARKS", [
+                        ("featureFormat", bench_suite.bench_feature_format),
+                        ("broken", _fail)])
+    baseline = str(tmp_path / "baselines.json")
+
+    assert bench_suite.main(["--sizes", "50", "--baseline", baseline,
+                             "--save"]) == 1
+    out = capsys.readouterr().out
+    assert "broken@50" in out and "failed: ValueError: broken" in out
+
+    # Only successful results become baselines.
+    with open(baseline) as f:
+        assert list(json.load(f)) == ["featureFormat@50"]
+
+
+def test_passing_run_exits_zero(bench_suite, tmp_path, monkeypatch):
+    monkeypatch.setattr(bench_suite, "BENCHMARKS", [
+                        ("featureFormat", bench_suite.bench_feature_format)])
+    assert bench_suite.main(["--sizes", "50", "--baseline",
+                             str(tmp_path / "none.json")]) == 0
+
+
+def test_committed_baselines_cover_every_benchmark(bench_suite):
+    with open(bench_suite.BASELINE_FILE) as f:
+        baselines = json.load(f)
+    for name, _ in bench_suite.BENCHMARKS:
+        assert "{0}@1000".format(name) in baselines
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import os
+import pickle
+import numpy as np
+from learnEnron import columnar, feature_format, feature_scaling
+
+DATASET = os.path.join(os.path.dirname(__file__), "..", "..", "resources",
+                       "data", "final_project_dataset.pkl")
+
+
+def _records():
+    return {
+            "B": {"poi": True, "salary": 100, "bonus": "NaN",
+                  "email_address": "b@enron.com"},
+            "A": {"poi": False, "salary": "NaN", "bonus": 2.5,
+                  "email_address": "NaN"}
+            }
+
+
+def test_round_trip_keeps_missing_values_and_types():
+    typed = columnar.from_datadict(_records())
+
+    assert typed.names == ["A", "B"]
+    assert typed.features == ["bonus", "email_address", "poi", "salary"]
+    assert typed.missing("salary").tolist() == [True, False]
+    assert typed.missing("email_address").tolist() == [True, False]
+    assert typed.column("salary").tolist() == [0, 100]
+    assert np.isnan(typed.column("salary", np.nan)[0])
+    assert typed.to_datadict() == _records()
+    assert typed["B"]["poi"] is True
+
+
+def test_with_columns_drop_and_astype():
+    typed = columnar.from_datadict(_records())
+    changed = typed.with_columns({"salary": [1, 2]},
+                                 {"salary": np.array([False, True])})
+
+    assert changed["B"]["salary"] == "NaN"
+    assert changed["A"]["salary"] == 1.0
+    assert typed["A"]["salary"] == "NaN"
+
+    dropped = changed.drop(["A", "NOBODY"])
+    assert dropped.names == ["B"]
+    assert dropped.text["email_address"] == ["b@enron.com"]
+
+    low = typed.astype(np.float32)
+    assert low.column("bonus").dtype == np.float32
+    assert low.to_datadict() == _records()
+
+
+def test_typed_pipeline_matches_dicts_on_the_dataset():
+    with open(DATASET, "rb") as f:
+        data = pickle.load(f)
+    features = ["poi", "salary", "bonus", "from_messages", "to_messages"]
+    typed = columnar.from_datadict(data)
+
+    expected = feature_format.featureFormat(data, features, sort_keys=True)
+    assert np.array_equal(feature_format.featureFormat(typed, features),
+                          expected)
+
+    scaled = feature_scaling.fit(data, features[1:]).transform(data)
+    typed_scaled = feature_scaling.fit(typed, features[1:]).transform(typed)
+    assert np.allclose(feature_format.featureFormat(typed_scaled, features),
+                       feature_format.featureFormat(scaled, features,
+                                                    sort_keys=True))
+
+
+def test_with_record_adds_and_changes_people():
+    typed = columnar.from_datadict({
+        "B": {"poi": True, "salary": 5.0, "email_address": "b@enron.com"},
+        "D": {"poi": False, "salary": "NaN", "email_address": "NaN"}})
+
+    changed = typed.with_record("D", {"salary": 7.0, "bonus": 1.0})
+    assert changed["D"] == {"poi": False, "salary": 7.0, "bonus": 1.0,
+                            "email_address": "NaN"}
+    assert changed["B"]["bonus"] == "NaN"
+    assert changed.arrays["poi"] is typed.arrays["poi"]
+    assert typed["D"]["salary"] == "NaN"
+
+    added = changed.with_record("C", {"poi": True,
+                                      "email_address": "c@enron.com"})
+    assert added.names == ["B", "C", "D"]
+    assert added["C"] == {"poi": True, "salary": "NaN", "bonus": "NaN",
+                          "email_address": "c@enron.com"}
+    assert added["D"] == changed["D"]
+    assert list(added.missing("salary")) == [False, True, False]
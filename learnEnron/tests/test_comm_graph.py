@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import numpy as np
+import pytest
+from scipy import sparse
+from learnEnron import columnar, feature_engineering
+from learnEnron.comm_graph import CommunicationGraph
+from learnEnron.header_index import HeaderIndex
+from learnEnron.poi_matcher import POIMatcher
+
+POI = POIMatcher(["kenneth.lay@enron.com"])
+
+
+def _record(address, **values):
+    record = dict((f, 1) for f in ["from_messages", "to_messages",
+                                   "from_poi_to_this_person",
+                                   "from_this_person_to_poi"])
+    record.update(values)
+    record["email_address"] = address
+    record["poi"] = False
+    return record
+
+
+@pytest.fixture
+def graph(write_email):
+    root = write_email("maildir/lay-k/sent/1.", sender="kenneth.lay@enron.com",
+                       to="phillip.allen@enron.com")
+    write_email("maildir/allen-p/sent/1.", sender="phillip.allen@enron.com",
+                to="kenneth.lay@enron.com, tim.belden@enron.com")
+    write_email("maildir/allen-p/sent/2.", sender="phillip.allen@enron.com",
+                to="tim.belden@enron.com")
+    index = HeaderIndex()
+    index.update(root.rsplit("/maildir/", 1)[0] + "/maildir")
+    return CommunicationGraph.from_index(index)
+
+
+def test_graph_from_index(graph):
+    allen = graph.addresses["phillip.allen@enron.com"]
+    belden = graph.addresses["tim.belden@enron.com"]
+    assert graph.matrix[allen, belden] == 2
+    assert graph.weighted_degree()[allen] == 4
+    assert graph.pagerank().sum() == pytest.approx(1.0)
+
+
+def test_poi_proximity_leaves_out_walks_back_to_the_poi():
+    # kenneth.lay -- phillip.allen, a single edge.
+    graph = CommunicationGraph(sparse.csr_matrix([[0, 1], [0, 0]]),
+                               {"kenneth.lay@enron.com": 0,
+                                "phillip.allen@enron.com": 1})
+    proximity = graph.poi_proximity(POI)
+    assert proximity[0] == 0
+    assert proximity[1] == pytest.approx(0.5)
+
+
+@pytest.mark.parametrize("typed", [False, True])
+def test_graph_features_after_email_ratios(graph, typed):
+    data = {
+            "ALLEN PHILLIP K": _record("phillip.allen@enron.com"),
+            "LAY KENNETH L": _record("kenneth.lay@enron.com"),
+            "NO ADDRESS": _record("NaN")
+            }
+    if typed:
+        data = columnar.from_datadict(data)
+
+    data = feature_engineering.graph_features(
+        feature_engineering.email_ratios(data), graph, POI)
+
+    assert data["ALLEN PHILLIP K"]["weighted_degree"] == 4
+    assert data["LAY KENNETH L"]["poi_proximity"] == 0
+    assert data["NO ADDRESS"]["pagerank"] == 0
+    assert data["ALLEN PHILLIP K"]["ratio_to_poi"] == 1
+
+
+def test_fill_missing_keeps_text():
+    data = columnar.from_datadict({"A": _record("NaN"),
+                                   "B": _record("b@enron.com",
+                                                from_messages="NaN")})
+    filled = data.fill_missing()
+    assert filled["A"]["email_address"] == "NaN"
+    assert filled["B"]["from_messages"] == 0
+    assert np.all(~filled.missing("from_messages"))
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import os
+from learnEnron.dedup import Deduplicator, folder_of, message_digest
+from learnEnron.header_index import HeaderIndex
+from learnEnron.mail_store import MailStore, MailStoreWriter, pack_maildir
+from .conftest import make_email
+
+
+def test_digest_ignores_trailing_space_and_line_endings():
+    a = make_email(body="Forecast attached").encode("latin-1")
+    b = a.replace(b"\n", b"\r\n").replace(b"attached", b"attached   ")
+    assert message_digest(a) == message_digest(b)
+    assert message_digest(a) != message_digest(make_email(
+        id=2, body="Forecast attached").encode("latin-1"))
+    assert folder_of("maildir/allen-p/_sent_mail/1.") == "_sent_mail"
+
+
+def _copies(write_email):
+    write_email("maildir/allen-p/_sent_mail/1.", id=1)
+    write_email("maildir/allen-p/sent/1.", id=1)
+    write_email("maildir/allen-p/sent/2.", id=2)
+
+
+def test_header_index_counts_each_message_once(write_email, tmp_path):
+    _copies(write_email)
+    maildir = str(tmp_path / "maildir")
+    dedup = Deduplicator()
+    index = HeaderIndex()
+
+    assert index.update(maildir, dedup) == 2
+    assert len(index) == 2
+    # Nothing changed: the duplicate is neither re-read
+    # nor counted again.
+    assert index.update(maildir, dedup) == 0
+    assert dedup.folder_counts() == {"_sent_mail": 1, "sent": 2}
+    assert index.email_counts({"ALLEN": ["phillip.allen@enron.com"]},
+                              [])["ALLEN"]["from_messages"] == 2
+
+
+def test_header_index_keys_match_mail_store(write_email, tmp_path):
+    _copies(write_email)
+    maildir = str(tmp_path / "maildir")
+    dedup = Deduplicator()
+    HeaderIndex().update(maildir + "/", dedup)
+
+    pack_maildir(maildir, str(tmp_path / "store"), verbose=False)
+    with MailStore(str(tmp_path / "store")) as store:
+        assert dedup.canonical == store.index["dedup"]["canonical"]
+        assert dedup.canonical == {"maildir/allen-p/sent/1.":
+                                   "maildir/allen-p/_sent_mail/1."}
+
+
+def test_readding_the_canonical_copy_is_not_a_duplicate(tmp_path):
+    data = make_email().encode("latin-1")
+    dedup = Deduplicator()
+    assert dedup.add("maildir/a/inbox/1.", data) == ("maildir/a/inbox/1.",
+                                                     False)
+    assert dedup.add("maildir/a/inbox/1.", data) == ("maildir/a/inbox/1.",
+                                                     False)
+    assert dedup.add("maildir/a/sent/1.", data) == ("maildir/a/inbox/1.",
+                                                    True)
+    assert dedup.add("maildir/a/sent/1.", data) == ("maildir/a/inbox/1.",
+                                                    True)
+    assert dedup.folder_counts() == {"inbox": 1, "sent": 1}
+    assert dedup.n_duplicates == 1
+
+    store_dir = str(tmp_path / "store")
+    with MailStoreWriter(store_dir, dedup=True) as writer:
+        writer.add("maildir/a/inbox/1.", data)
+        writer.add("maildir/a/inbox/1.", data)
+    with MailStore(store_dir) as store:
+        assert store.unique_keys() == ["maildir/a/inbox/1."]
+        assert store.folder_counts() == {"inbox": 1}
+
+
+def test_touched_message_stays_indexed(write_email, tmp_path):
+    path = write_email("maildir/allen-p/sent/1.", id=1)
+    maildir = str(tmp_path / "maildir")
+    dedup = Deduplicator()
+    index = HeaderIndex()
+    assert index.update(maildir, dedup) == 1
+
+    st = os.stat(path)
+    os.utime(path, (st.st_atime, st.st_mtime + 10))
+    assert index.update(maildir, dedup) == 1
+    assert len(index) == 1
+    assert index.messages_for("phillip.allen@enron.com")
+    assert dedup.folder_counts() == {"sent": 1}
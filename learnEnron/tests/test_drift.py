@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import numpy as np
+import pytest
+from learnEnron import drift, feature_engineering, synthetic
+
+
+def test_float32_drift_report():
+    data = feature_engineering.email_ratios(synthetic.generate(300, seed=1))
+    features = ["poi", "bonus", "salary", "total_stock_value",
+                "exercised_stock_options", "ratio_to_poi", "ratio_from_poi",
+                "expenses", "other", "shared_receipt_with_poi",
+                "from_messages", "to_messages"]
+
+    report = drift.compare(data, features, folds=3)
+
+    assert report["dtype"] == "float32"
+    assert report["nbytes"]["float32"] * 2 == report["nbytes"]["float64"]
+    assert report["max_center_drift"] < 1e-6
+    assert report["max_probability_drift"] < 0.05
+    assert "changed predictions" in drift.format_report(report)
+
+
+def test_upcast_is_reported():
+    with pytest.raises(TypeError):
+        drift._check_dtype(np.zeros(2), np.float32, "matrix")
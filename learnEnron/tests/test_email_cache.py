@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import os
+import pytest
+
+pytest.importorskip("nltk")
+
+from learnEnron.email_cache import ParsedTextCache  # noqa: E402
+from learnEnron.parse_out_email_txt import parseOutText  # noqa: E402
+
+
+def test_parse_out_text_removes_header_and_punctuation(write_email):
+    # The rest of the X-FileName line is kept, as in the course code.
+    path = write_email("a/1.", body="Hi, the forecasts: ready!")
+    with open(path) as f:
+        assert parseOutText(f, stem=False).split() == [
+            "sendernsf", "Hi", "the", "forecasts", "ready"]
+        assert parseOutText(f).split() == [
+            "sendernsf", "hi", "the", "forecast", "readi"]
+
+
+def test_cache_hit_matches_parse(tmp_path, write_email):
+    path = write_email("a/1.", body="Responding to the forecasts")
+    with open(path) as f:
+        expected = parseOutText(f)
+
+    with ParsedTextCache(str(tmp_path / "cache")) as cache:
+        assert cache.parse(path) == expected
+        assert cache.parse(path) == expected
+        assert (cache.misses, cache.hits) == (1, 1)
+
+    # The index is persisted on close.
+    with ParsedTextCache(str(tmp_path / "cache")) as cache:
+        assert cache.parse(path) == expected
+        assert cache.hits == 1
+
+
+def test_changed_file_is_parsed_again(tmp_path, write_email):
+    path = write_email("a/1.", body="first version")
+    with ParsedTextCache(str(tmp_path / "cache"), validate="hash") as cache:
+        cache.parse(path, stem=False)
+        write_email("a/1.", body="second version")
+        assert cache.parse(path, stem=False).split()[1:] == ["second",
+                                                             "version"]
+        assert cache.misses == 2
+
+        cache.compact()
+        assert cache.parse(path, stem=False).split()[1:] == ["second",
+                                                             "version"]
+        assert len(os.listdir(str(tmp_path / "cache"))) == 2
+
+
+def test_parse_reads_non_utf8_emails(tmp_path, write_email):
+    path = write_email("a/1.")
+    with open(path, "ab") as f:
+        f.write(b"caf\xe9 forecasts\n")
+
+    with ParsedTextCache(str(tmp_path / "cache")) as cache:
+        assert cache.parse(path, stem=False).split()[-2:] == [
+            u"caf\xe9", "forecasts"]
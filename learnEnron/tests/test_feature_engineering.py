@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from learnEnron import feature_engineering
+from learnEnron.feature_engineering import DerivedFeatures
+
+
+def _person(from_messages=10, to_poi=2, to_messages=20, from_poi=5):
+    return {
+            "poi": False,
+            "salary": "NaN",
+            "from_messages": from_messages,
+            "from_this_person_to_poi": to_poi,
+            "to_messages": to_messages,
+            "from_poi_to_this_person": from_poi
+            }
+
+
+def test_dependents_inverts_derived_features():
+    depends = feature_engineering.dependents()
+    assert depends["from_messages"] == ["ratio_to_poi"]
+    assert depends["to_messages"] == ["ratio_from_poi"]
+
+
+def test_update_recomputes_only_stale_features():
+    derived = DerivedFeatures({"A": _person(), "B": _person(to_poi="NaN")})
+    assert derived.data["A"]["ratio_to_poi"] == 0.2
+    assert derived.data["B"]["ratio_to_poi"] == 0
+    assert derived.data["A"]["salary"] == 0
+    start = derived.recomputed
+
+    assert derived.update("A", {"from_messages": 4}) == ["ratio_to_poi"]
+    assert derived.data["A"]["ratio_to_poi"] == 0.5
+    assert derived.data["A"]["ratio_from_poi"] == 0.25
+    # Setting a value to what it already was changes nothing.
+    assert derived.update("A", {"to_messages": 20, "salary": 3}) == []
+    assert derived.data["A"]["salary"] == 3
+    # A missing input is "NaN" in the raw record, 0 in the data.
+    assert derived.update("B", {"from_this_person_to_poi": 3}) == \
+        ["ratio_to_poi"]
+    assert derived.recomputed == start + 2
+
+
+def test_updates_agree_with_the_bulk_path():
+    records = {"A": _person(), "B": _person(from_messages="NaN")}
+    derived = DerivedFeatures(records)
+    derived.update_many({"A": {"from_poi_to_this_person": 10},
+                         "C": _person(to_messages=40)})
+    derived.remove("B")
+
+    final = {"A": dict(records["A"], from_poi_to_this_person=10),
+             "C": _person(to_messages=40)}
+    assert derived.data == feature_engineering.email_ratios(final)
+
+
+def test_every_path_shares_the_registry_semantics():
+    from learnEnron import columnar
+
+    # x / 0, 0 / 0, a missing input and a plain ratio.
+    records = {"A": _person(from_messages=0, to_messages=0, from_poi=0),
+               "B": _person(to_poi="NaN"),
+               "C": _person()}
+    expected = {"A": (0, 0), "B": (0, 0.25), "C": (0.2, 0.25)}
+
+    bulk = feature_engineering.email_ratios(dict(
+        (k, dict(v)) for k, v in records.items()))
+    typed = feature_engineering.email_ratios(columnar.from_datadict(records))
+    registry = feature_engineering.expression_features(dict(
+        (k, dict(v)) for k, v in records.items()))
+    derived = DerivedFeatures(records)
+
+    for i, name in enumerate(sorted(records)):
+        row = feature_engineering.derive_row(records[name])
+        for path in (bulk[name], registry[name], derived.data[name], row):
+            assert (path["ratio_to_poi"], path["ratio_from_poi"]) == \
+                expected[name]
+        assert (typed.column("ratio_to_poi")[i],
+                typed.column("ratio_from_poi")[i]) == expected[name]
+
+
+def test_typed_updates_agree_with_the_bulk_path():
+    from learnEnron import columnar
+
+    records = {"A": _person(), "B": _person(from_messages="NaN")}
+    derived = DerivedFeatures(columnar.from_datadict(records))
+    typed = derived.data
+
+    assert derived.update("A", {"from_messages": 4}) == ["ratio_to_poi"]
+    assert derived.data["A"]["ratio_to_poi"] == 0.5
+    derived.update("C", _person(to_messages=40))
+    assert derived.remove("B")["from_messages"] == 0
+    # The dataset it started from is left as it was.
+    assert typed["A"]["ratio_to_poi"] == 0.2
+
+    final = {"A": dict(records["A"], from_messages=4),
+             "C": _person(to_messages=40)}
+    assert columnar.is_typed(derived.data)
+    assert derived.data.to_datadict() == \
+        feature_engineering.email_ratios(final)
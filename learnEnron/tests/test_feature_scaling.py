@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import numpy as np
+from learnEnron import feature_scaling
+from learnEnron.feature_scaling import StreamingRobustScaler
+
+
+def test_streaming_equals_robust_scaler_while_exact():
+    from sklearn.preprocessing import RobustScaler
+
+    matrix = np.random.RandomState(0).lognormal(size=(150, 4))
+    matrix[:, 3] = 7.0
+    scaler = StreamingRobustScaler().fit(feature_scaling.iter_batches(
+        matrix, 40))
+
+    assert scaler.error_bound == 0
+    expected = RobustScaler().fit_transform(matrix)
+    assert np.allclose(np.vstack(list(scaler.transform_batches(
+        feature_scaling.iter_batches(matrix, 40)))), expected)
+    assert scaler.transform(matrix.astype(np.float32)).dtype == np.float32
+
+
+def test_scale_streaming_matches_in_memory(capsys):
+    rng = np.random.RandomState(1)
+    data = dict(("P{0}".format(i), {"exercised_stock_options": rng.rand(),
+                                    "bonus": "NaN" if i % 3 else rng.rand()})
+                for i in range(50))
+    features = ["bonus", "exercised_stock_options"]
+
+    exact = feature_scaling.scale(data, features)
+    streamed = feature_scaling.scale(data, features, streaming=True,
+                                     batch_size=7)
+    # Quiet unless verbose, like the other stage functions.
+    assert capsys.readouterr().out == ""
+    for name in data:
+        for feature in features:
+            assert np.isclose(exact[name][feature], streamed[name][feature])
+
+
+def test_fit_npy_merges_worker_sketches(tmp_path):
+    matrix = np.random.RandomState(2).normal(size=(60000, 2))
+    path = str(tmp_path / "rows.npy")
+    np.save(path, matrix)
+
+    scaler = feature_scaling.fit_npy(path, k=200, batch_size=5000,
+                                     processes=2, seed=0)
+    for j in range(2):
+        column = np.sort(matrix[:, j])
+        rank = np.searchsorted(column, scaler.center_[j]) / float(len(column))
+        assert abs(rank - 0.5) <= scaler.error_bound
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import numpy as np
+from learnEnron import feature_selection
+
+FEATURES = ["poi", "signal", "noise_a", "noise_b"]
+
+
+def _dataset(n=80):
+    rng = np.random.RandomState(0)
+    data = {}
+    for i in range(n):
+        poi = i % 5 == 0
+        data["P{0:03d}".format(i)] = {
+                                      "poi": poi,
+                                      "signal": 5.0 * poi + rng.rand(),
+                                      "noise_a": rng.rand(),
+                                      "noise_b": rng.rand()
+                                      }
+    return data
+
+
+def test_stability_selection_keeps_the_signal():
+    from sklearn.tree import DecisionTreeClassifier
+
+    clf = DecisionTreeClassifier(max_depth=1)
+    fs_list, report = feature_selection.stability_selection(
+        _dataset(), FEATURES, clf, n_draws=20, threshold=0.9, processes=1)
+
+    assert fs_list == ["poi", "signal"]
+    assert report["features"] == FEATURES[1:]
+    assert report["importances"].shape == (20, 3)
+    assert report["frequency"][0] == 1.0
+    assert report["percentiles"].shape == (3, 3)
+
+
+def test_stability_selection_does_not_depend_on_processes():
+    from sklearn.ensemble import RandomForestClassifier
+
+    clf = RandomForestClassifier(n_estimators=5)
+    args = dict(n_draws=6, bootstrap=True, seed=3)
+    _, serial = feature_selection.stability_selection(
+        _dataset(), FEATURES, clf, processes=1, **args)
+    _, pooled = feature_selection.stability_selection(
+        _dataset(), FEATURES, clf, processes=2, **args)
+
+    assert np.array_equal(serial["importances"], pooled["importances"])
+
+
+def test_draws_are_stratified():
+    labels = np.array([1] * 10 + [0] * 30)
+    draws = feature_selection._draw_indices(labels, 5, 0.5, False, 0)
+    for rows in draws:
+        assert labels[rows].sum() == 5 and len(rows) == 20
+        assert len(set(rows)) == len(rows)
+
+
+def test_rfe_cv_path_and_ranking():
+    from sklearn.linear_model import LogisticRegression
+
+    fs_list, report = feature_selection.rfe_cv(
+        _dataset(), FEATURES, LogisticRegression(), folds=3, processes=1)
+
+    path = report["path"]
+    assert [len(entry["features"]) for entry in path] == [3, 2, 1]
+    assert path[-1]["features"] == ["signal"]
+    assert report["ranking"]["signal"] == 1
+    assert sorted(report["ranking"].values()) == [1, 2, 3]
+    assert "signal" in fs_list
+    assert feature_selection.path_features(report, 1) == ["poi", "signal"]
+
+
+def test_rfe_cv_warm_start_and_processes_agree():
+    from sklearn.linear_model import SGDClassifier
+
+    clf = SGDClassifier(random_state=0, max_iter=50, tol=None)
+    cold = feature_selection.rfe_cv(_dataset(), FEATURES, clf, folds=3,
+                                    warm_start=False, processes=1)[1]
+    warm = feature_selection.rfe_cv(_dataset(), FEATURES, clf, folds=3,
+                                    processes=1)[1]
+    pooled = feature_selection.rfe_cv(_dataset(), FEATURES, clf, folds=3,
+                                      processes=2)[1]
+
+    assert cold["path"][-1]["features"] == warm["path"][-1]["features"] == \
+        ["signal"]
+    assert [e["score"] for e in warm["path"]] == \
+        [e["score"] for e in pooled["path"]]
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import hashlib
+from learnEnron import fileutil
+
+
+def test_file_digest_reads_in_chunks(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"enron" * 1000)
+
+    assert fileutil.file_digest(str(path), chunk_size=7) == \
+        hashlib.sha256(b"enron" * 1000).hexdigest()
+    assert fileutil.file_digest(str(path), "sha1") == \
+        hashlib.sha1(b"enron" * 1000).hexdigest()
+
+
+def test_replace_overwrites(tmp_path):
+    (tmp_path / "new").write_text("new")
+    (tmp_path / "old").write_text("old")
+
+    fileutil.replace(str(tmp_path / "new"), str(tmp_path / "old"))
+    assert (tmp_path / "old").read_text() == "new"
+    assert not (tmp_path / "new").exists()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from learnEnron.header_index import (HeaderIndex, parse_header_text,
+                                     person_addresses, read_header_block,
+                                     update_email_counts)
+
+POI = ["kenneth.lay@enron.com"]
+
+
+def _maildir(write_email):
+    write_email("maildir/allen-p/sent/1.", sender="phillip.allen@enron.com",
+                to="kenneth.lay@enron.com, tim.belden@enron.com")
+    write_email("maildir/allen-p/sent/2.", sender="phillip.allen@enron.com",
+                to="tim.belden@enron.com")
+    write_email("maildir/lay-k/sent/1.", sender="kenneth.lay@enron.com",
+                to="phillip.allen@enron.com, tim.belden@enron.com")
+    return write_email("maildir/lay-k/sent/2.",
+                       sender="kenneth.lay@enron.com",
+                       to="tim.belden@enron.com").rsplit("/maildir/", 1)[0]
+
+
+def test_parse_header_text():
+    sender, recipients = parse_header_text(
+        "From: A <A@Enron.com>\nTo: b@enron.com, c@enron.com\n"
+        "Cc: b@enron.com\nBcc: d@enron.com\n")
+    assert sender == ["a@enron.com"]
+    assert recipients == ["b@enron.com", "c@enron.com", "d@enron.com"]
+
+
+def test_email_counts(write_email):
+    root = _maildir(write_email)
+    index = HeaderIndex()
+    assert index.update(root + "/maildir") == 4
+    assert index.update(root + "/maildir") == 0
+
+    people = {"ALLEN PHILLIP K": ["phillip.allen@enron.com"],
+              "BELDEN TIMOTHY N": ["tim.belden@enron.com"]}
+    counts = index.email_counts(people, POI)
+
+    assert counts["ALLEN PHILLIP K"] == {
+                                         "from_messages": 2,
+                                         "to_messages": 1,
+                                         "from_poi_to_this_person": 1,
+                                         "from_this_person_to_poi": 1,
+                                         "shared_receipt_with_poi": 0
+                                         }
+    assert counts["BELDEN TIMOTHY N"]["to_messages"] == 4
+    assert counts["BELDEN TIMOTHY N"]["from_poi_to_this_person"] == 2
+    assert counts["BELDEN TIMOTHY N"]["shared_receipt_with_poi"] == 1
+
+
+def test_changed_file_replaces_message(tmp_path, write_email):
+    root = _maildir(write_email)
+    index = HeaderIndex()
+    index.update(root + "/maildir")
+    path = write_email("maildir/allen-p/sent/2.",
+                       sender="phillip.allen@enron.com",
+                       to="kenneth.lay@enron.com", subject="A longer subject")
+    assert index.update(root + "/maildir") == 1
+    assert len(index) == 4
+    assert index.messages_for("kenneth.lay@enron.com", sent=False) == [0, 4]
+
+    index.save(str(tmp_path / "index.pkl"))
+    loaded = HeaderIndex.load(str(tmp_path / "index.pkl"))
+    assert loaded.paths[4] == path
+    assert len(loaded) == 4
+
+
+def test_update_email_counts_dict_and_typed():
+    from learnEnron import columnar
+
+    data = {
+            "ALLEN PHILLIP K": {"email_address": "phillip.allen@enron.com",
+                                "from_messages": "NaN", "to_messages": 5,
+                                "from_poi_to_this_person": 0,
+                                "from_this_person_to_poi": 0,
+                                "shared_receipt_with_poi": 0},
+            "NO ADDRESS": {"email_address": "NaN", "from_messages": 1,
+                           "to_messages": 1, "from_poi_to_this_person": 0,
+                           "from_this_person_to_poi": 0,
+                           "shared_receipt_with_poi": 0}
+            }
+    assert person_addresses(data) == {
+        "ALLEN PHILLIP K": ["phillip.allen@enron.com"]}
+    counts = {"ALLEN PHILLIP K": {"from_messages": 2}}
+
+    typed = update_email_counts(columnar.from_datadict(data), counts)
+    assert typed["ALLEN PHILLIP K"]["from_messages"] == 2
+    assert update_email_counts(data, counts)["ALLEN PHILLIP K"][
+        "from_messages"] == 2
+
+
+def test_non_utf8_header_is_read(tmp_path, write_email):
+    path = write_email("maildir/lay-k/sent/1.", sender="kenneth.lay@enron.com")
+    with open(path, "rb") as f:
+        data = f.read().replace(b"Subject: Forecast", b"Subject: Caf\xe9")
+    with open(path, "wb") as f:
+        f.write(data)
+
+    assert read_header_block(path).count(u"Caf\xe9") == 1
+    index = HeaderIndex()
+    assert index.update(str(tmp_path / "maildir")) == 1
+    assert index.messages_for("kenneth.lay@enron.com") == [0]
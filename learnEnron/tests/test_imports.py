@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import os
+import subprocess
+import sys
+import numpy as np
+import tester
+
+project_dir = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+HEAVY = ("sklearn", "pandas", "nltk", "matplotlib", "seaborn")
+
+
+def test_package_imports_stay_light():
+    code = ("import sys, tester\n"
+            "from learnEnron import (feature_engineering, feature_scaling,\n"
+            "    feature_selection, ml_plots, tune, author_id)\n"
+            "print(' '.join(m for m in {0!r} if m in sys.modules))"
+            .format(HEAVY))
+    out = subprocess.check_output([sys.executable, "-c", code],
+                                  cwd=project_dir, universal_newlines=True)
+    assert out.split() == []
+
+
+def _dataset(n=60):
+    rng = np.random.RandomState(0)
+    data = {}
+    for i in range(n):
+        poi = i % 4 == 0
+        data["PERSON {0}".format(i)] = {
+                                        "poi": poi,
+                                        "bonus": 10.0 * poi + rng.rand(),
+                                        "salary": rng.rand()
+                                        }
+    return data
+
+
+def test_classifier_uses_stratified_shuffle_split(capsys):
+    from sklearn.tree import DecisionTreeClassifier
+
+    tester.test_classifier(DecisionTreeClassifier(random_state=0),
+                           _dataset(), ["poi", "bonus", "salary"], folds=5)
+    out = capsys.readouterr().out
+
+    # 5 splits of 10% of 60 rows, every POI found.
+    assert "Total predictions:   30" in out
+    assert "Recall: 1.00000" in out
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import os
+from learnEnron import mail_store
+from learnEnron.mail_store import MailStore, MailStoreWriter, pack_maildir
+
+
+def test_pack_maildir_round_trip(write_email, tmp_path):
+    paths = [
+             write_email("maildir/allen-p/sent/1.", id=1),
+             write_email("maildir/allen-p/_sent_mail/1.", id=1),
+             write_email("maildir/allen-p/sent/2.", id=2, body="Other")
+             ]
+    store_dir = str(tmp_path / "store")
+
+    # A tiny shard size forces one shard per message.
+    assert pack_maildir(str(tmp_path / "maildir"), store_dir,
+                        shard_size=10, verbose=False) == 3
+    assert len([f for f in os.listdir(store_dir) if f.endswith(".dat")]) == 2
+
+    with MailStore(store_dir) as store:
+        assert store.keys() == ["maildir/allen-p/_sent_mail/1.",
+                                "maildir/allen-p/sent/1.",
+                                "maildir/allen-p/sent/2."]
+        assert store.unique_keys() == ["maildir/allen-p/_sent_mail/1.",
+                                       "maildir/allen-p/sent/2."]
+        assert store.canonical("maildir/allen-p/sent/1.") == \
+            "maildir/allen-p/_sent_mail/1."
+        assert store.folder_counts() == {"_sent_mail": 1, "sent": 2}
+        assert store.folder_counts(unique=True) == {"_sent_mail": 1,
+                                                    "sent": 1}
+        for path in paths:
+            with open(path, "rb") as f:
+                data = f.read()
+            key = os.path.relpath(path, str(tmp_path))
+            assert store.read(key) == data
+            assert store.header(key) == data.split(b"\n\n")[0]
+
+
+def test_view_is_zero_copy_and_keys_normalized(tmp_path):
+    store_dir = str(tmp_path / "store")
+    with MailStoreWriter(store_dir) as writer:
+        writer.add("./maildir\\lay-k\\inbox\\1.", b"Subject: a\n\nbody")
+
+    with MailStore(store_dir) as store:
+        view = store.view(0)
+        assert isinstance(view, memoryview)
+        assert view.readonly
+        assert view.tobytes() == b"Subject: a\n\nbody"
+        assert " maildir/lay-k/inbox/1.\n" in store
+        assert store.open_text("maildir/lay-k/inbox/1.").read() == \
+            "Subject: a\n\nbody"
+        del view
+
+
+def test_writer_appends_to_existing_store(tmp_path):
+    store_dir = str(tmp_path / "store")
+    with MailStoreWriter(store_dir) as writer:
+        writer.add("maildir/a/inbox/1.", b"one")
+    with MailStoreWriter(store_dir) as writer:
+        writer.add("maildir/a/inbox/2.", b"two")
+        writer.add("maildir/a/inbox/1.", b"replaced")
+
+    with MailStore(store_dir) as store:
+        assert store.keys() == ["maildir/a/inbox/1.", "maildir/a/inbox/2."]
+        assert store.read(0) == b"replaced"
+        assert store.key(1) == "maildir/a/inbox/2."
+    assert mail_store.normalize_key("./maildir/a/inbox/1.\n") == \
+        "maildir/a/inbox/1."
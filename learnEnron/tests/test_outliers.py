@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import os
+import pickle
+import numpy as np
+from learnEnron import columnar, outliers
+
+DATASET = os.path.join(os.path.dirname(__file__), "..", "..", "resources",
+                       "data", "final_project_dataset.pkl")
+
+
+def _person(salary, email="x@enron.com", from_messages=10):
+    return {"poi": False, "salary": salary, "bonus": 2 * salary,
+            "total_payments": 3 * salary, "email_address": email,
+            "from_messages": from_messages}
+
+
+def test_organisation_word_needs_a_missing_contact():
+    names = ["PARK JOHN A", "BANK MARY", "THE TRAVEL AGENCY IN THE PARK",
+             "TOTAL", "ALLEN PHILLIP K"]
+    assert outliers.non_person(names).tolist() == [True, True, True, True,
+                                                   False]
+
+    no_contact = np.array([False, False, True, False, False])
+    assert outliers.non_person(names, no_contact=no_contact).tolist() == \
+        [False, False, True, True, False]
+
+
+def test_screen_keeps_people_with_organisation_surnames():
+    data = dict(("PERSON{0} A".format(i), _person(100.0 + i))
+                for i in range(20))
+    data["PARK JOHN A"] = _person(110.0)
+    data["ACME TRUST CO"] = _person(120.0, email="NaN", from_messages="NaN")
+
+    screened, report = outliers.screen(data)
+
+    assert report["removed"] == {"ACME TRUST CO": ["non_person"]}
+    assert "PARK JOHN A" in screened
+    assert outliers.no_contact(columnar.from_datadict(data)).sum() == 1
+
+
+def test_enron_screen():
+    with open(DATASET, "rb") as f:
+        data = pickle.load(f)
+
+    screened, report = outliers.screen(data)
+
+    assert report["removed"] == {
+                                 "LOCKHART EUGENE E": ["all_missing"],
+                                 "THE TRAVEL AGENCY IN THE PARK":
+                                     ["non_person"],
+                                 "TOTAL": ["aggregate", "non_person"]
+                                 }
+    assert len(screened) == len(data) - 3
+    # POIs are among the financial extremes, kept.
+    assert "LAY KENNETH L" in screened
+    assert "LAY KENNETH L" in report["extreme"]["total_payments"]
+    assert "removed 3 of 146 rows" in outliers.format_report(report)
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from learnEnron import parallel
+
+
+def _scaled(task):
+    return parallel.shared()["factor"] * task
+
+
+def test_map_shared_in_process_and_in_a_pool():
+    state = {"factor": 3}
+    assert parallel.map_shared(_scaled, [1, 2, 3], state, processes=1) == \
+        [3, 6, 9]
+    # The in-process run does not keep the data alive.
+    assert parallel.shared() == {}
+    assert parallel.map_shared(_scaled, [1, 2, 3], state, processes=2) == \
+        [3, 6, 9]
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import numpy as np
+from learnEnron import feature_selection
+from learnEnron.permutation import permutation_importance
+
+
+def _data(n=90):
+    rng = np.random.RandomState(0)
+    labels = (np.arange(n) % 3 == 0).astype(int)
+    features = rng.rand(n, 5)
+    features[:, 2] += 2 * labels
+    return features, labels
+
+
+def test_only_the_informative_feature_matters():
+    from sklearn.linear_model import LogisticRegression
+
+    features, labels = _data()
+    result = permutation_importance(LogisticRegression(), features, labels,
+                                    n_repeats=4, folds=3, processes=1)
+
+    assert result["importances"].shape == (12, 5)
+    assert np.argmax(result["mean"]) == 2
+    assert result["mean"][2] > 0.5
+    assert np.allclose(result["mean"], result["importances"].mean(axis=0))
+
+
+def test_batch_size_and_processes_do_not_change_results():
+    from sklearn.tree import DecisionTreeClassifier
+
+    features, labels = _data()
+    clf = DecisionTreeClassifier(random_state=0)
+    one = permutation_importance(clf, features, labels, batch_size=1,
+                                 processes=1)
+    batched = permutation_importance(clf, features, labels, batch_size=8,
+                                     processes=2)
+
+    assert np.array_equal(one["importances"], batched["importances"])
+    # float32 input is permuted in float32.
+    low = permutation_importance(clf, features.astype(np.float32), labels,
+                                 processes=1)
+    assert np.argmax(low["mean"]) == np.argmax(one["mean"]) == 2
+
+
+def test_selection_falls_back_to_permutation():
+    from sklearn.linear_model import LogisticRegression
+
+    features, labels = _data()
+    names = ["f{0}".format(j) for j in range(5)]
+    data = dict(("P{0}".format(i), dict(zip(["poi"] + names,
+                                            [bool(labels[i])] +
+                                            list(features[i]))))
+                for i in range(len(labels)))
+
+    clf = LogisticRegression()
+    fs_list = feature_selection.selection(data, ["poi"] + names, clf,
+                                          cut_off=0.1, processes=1)
+    assert fs_list == ["poi", "f2"]
+    # Only the clones of the permutation engine were fitted.
+    assert not hasattr(clf, "coef_")
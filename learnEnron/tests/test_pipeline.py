@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from learnEnron import feature_selection, pipeline, tune
+
+
+def format_features(dataset, features_list):
+    """Stage calling into the package through a module global."""
+
+    return feature_selection.feature_format.featureFormat(dataset,
+                                                          features_list)
+
+
+def _pipeline(cache_dir, calls):
+    def load(n):
+        calls.append(n)
+        return {"A": {"poi": True, "bonus": n}, "B": {"poi": False,
+                                                      "bonus": 1}}
+
+    pipe = pipeline.Pipeline(str(cache_dir), verbose=False)
+    pipe.add("load", load, params={"n": 5})
+    pipe.add("format", format_features, ["load"],
+             {"features_list": ["poi", "bonus"]})
+    return pipe
+
+
+def test_dependencies_follow_package_imports():
+    modules = pipeline.module_dependencies(format_features)
+    assert "learnEnron.feature_selection" in modules
+    # Imported by feature_selection, not by the stage.
+    assert "learnEnron.feature_format" in modules
+    assert not any(m.startswith("numpy") for m in modules)
+    assert pipeline.module_dependencies(len) == {}
+    assert "learnEnron.tune" in pipeline.module_dependencies(
+        tune.param_optimize_lr)
+
+
+def test_key_changes_with_a_dependency_source(tmp_path, monkeypatch):
+    calls = []
+    key = _pipeline(tmp_path, calls).key("format")
+    assert _pipeline(tmp_path, calls).key("format") == key
+
+    path = pipeline.module_dependencies(format_features)[
+        "learnEnron.feature_format"]
+    file_digest = pipeline.file_digest
+    monkeypatch.setattr(pipeline, "file_digest", lambda p: (
+        "edited" if p == path else file_digest(p)))
+
+    changed = _pipeline(tmp_path, calls)
+    assert changed.key("format") != key
+    # The load stage does not use feature_format.
+    assert changed.key("load") == _pipeline(tmp_path, calls).key("load")
+
+
+def test_outputs_are_cached_by_key(tmp_path):
+    calls = []
+    first = _pipeline(tmp_path, calls).run("format")
+    second = _pipeline(tmp_path, calls).run("format")
+    assert calls == [5]
+    assert (first == second).all()
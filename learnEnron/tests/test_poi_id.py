@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import numpy as np
+import poi_id
+import tester
+from learnEnron import artifact, feature_selection, tune
+
+
+def test_float32_run_screens_outliers_in_float64(capsys):
+    data = poi_id.load_data(poi_id.f, None)
+    assert data.dtype == np.float64
+
+    screened = poi_id.remove_outliers(data, True, "float32")
+    out = capsys.readouterr().out
+
+    assert "TOTAL: aggregate, non_person" in out
+    assert "TOTAL" not in screened
+    assert screened.dtype == np.float32
+    assert screened.column("salary").dtype == np.float32
+    assert poi_id.remove_outliers(data, False, "float32").names == data.names
+
+
+class _DtypeRecorder(object):
+    """Classifier that records the dtype it is fitted on."""
+
+    def __init__(self):
+        self.dtypes = set()
+
+    def fit(self, features, labels):
+        features = np.asarray(features)
+        self.dtypes.add(features.dtype)
+        self.n_features = features.shape[1]
+        return self
+
+    @property
+    def feature_importances_(self):
+        return np.ones(self.n_features)
+
+    def predict(self, features):
+        # Large bonuses as POIs, so every metric is defined.
+        return (np.asarray(features)[:, 1] > 1e6).astype(int)
+
+
+def test_tester_passes_the_dtype_through(capsys):
+    data = poi_id.remove_outliers(poi_id.load_data(poi_id.f, None), True,
+                                  "float64")
+    clf = _DtypeRecorder()
+
+    tester.test_classifier(clf, data, ["poi", "salary", "bonus"], folds=3,
+                           dtype=np.float32)
+    assert clf.dtypes == set([np.dtype(np.float32)])
+    assert "Total predictions" in capsys.readouterr().out
+
+
+def test_float32_run_stays_float32_through_to_the_tester(monkeypatch,
+                                                         tmp_path):
+    monkeypatch.setattr(poi_id, "f32", True)
+    monkeypatch.setattr(poi_id, "cache", False)
+    selector = _DtypeRecorder()
+    monkeypatch.setattr(feature_selection, "get_fs_clf", lambda: selector)
+    tuned = []
+
+    def param_optimize_lr_pipe(features, labels, **kwargs):
+        tuned.append(np.asarray(features).dtype)
+        return _DtypeRecorder()
+
+    monkeypatch.setattr(tune, "param_optimize_lr_pipe", param_optimize_lr_pipe)
+
+    stages = poi_id.build_pipeline()
+    clf = stages.run("tune")
+    my_dataset = stages.run("scale")
+    assert selector.dtypes == set([np.dtype(np.float32)])
+    assert tuned == [np.dtype(np.float32)]
+    assert my_dataset.dtype == np.float32
+
+    monkeypatch.chdir(tmp_path)
+    tester.dump_classifier_and_data(clf, my_dataset, stages.run("selection"),
+                                    scaling=stages.run("scaling"))
+    bundle = artifact.ArtifactBundle(tester.ARTIFACT_DIRNAME)
+    assert bundle.manifest["dtype"] == "float32"
+    assert bundle.columns.dtype == np.float32
+
+    # Three folds instead of 1000, recording the loaded classifier.
+    tested = []
+    test_classifier = tester.test_classifier
+
+    def three_folds(clf, dataset, feature_list, dtype=None):
+        tested.append(clf)
+        test_classifier(clf, dataset, feature_list, 3, dtype)
+
+    monkeypatch.setattr(tester, "test_classifier", three_folds)
+
+    tester.main()
+    assert tested[0].dtypes == set([np.dtype(np.float32)])
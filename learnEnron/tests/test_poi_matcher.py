@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from learnEnron.poi_matcher import POIMatcher, normalize_address
+
+
+def test_normalize_address_splits_and_unquotes():
+    assert normalize_address(" 'Joe'.'Hirko@Enron.com ") == [
+        "joe.hirko@enron.com"]
+    assert normalize_address("a@enron.comb@enron.com") == [
+        "a@enron.com", "b@enron.com"]
+
+
+def test_membership_is_normalized():
+    matcher = POIMatcher(["Kenneth_Lay@Enron.net", "'skilling@enron.com"])
+    assert len(matcher) == 2
+    assert "kenneth_lay@enron.net" in matcher
+    assert " Skilling@enron.com" in matcher
+    assert "jskilling@enron.com" not in matcher
+
+
+def test_match_respects_address_boundaries():
+    matcher = POIMatcher(["skilling@enron.com", "kenneth.lay@enron.com"])
+    header = ("jskilling@enron.com, Kenneth.Lay@enron.com, "
+              "'skilling@enron.com', kenneth.lay@enron.com")
+    assert matcher.match(header) == ["kenneth.lay@enron.com",
+                                     "skilling@enron.com"]
+    assert matcher.count("skilling@enron.com.au") == 0
+
+
+def test_default_addresses_load():
+    matcher = POIMatcher()
+    assert "kenneth_lay@enron.net" in matcher
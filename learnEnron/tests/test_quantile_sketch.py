@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import numpy as np
+from learnEnron.quantile_sketch import KLLSketch, rank_error
+
+
+def _rank(values, x):
+    return np.searchsorted(np.sort(values), x) / float(len(values))
+
+
+def test_exact_until_first_compaction():
+    values = np.random.RandomState(0).lognormal(size=300)
+    sketch = KLLSketch(k=400).update(values).update([np.nan])
+
+    assert sketch.exact and sketch.error == 0
+    assert sketch.n == 300
+    for q in (0.25, 0.5, 0.75):
+        assert sketch.quantile(q) == np.percentile(values, 100 * q)
+    assert np.isnan(KLLSketch().quantile(0.5))
+
+
+def test_large_stream_within_rank_error():
+    values = np.random.RandomState(1).lognormal(size=200000)
+    sketch = KLLSketch(k=200, seed=0)
+    for start in range(0, len(values), 10000):
+        sketch.update(values[start:start + 10000])
+
+    assert not sketch.exact
+    assert sketch.error == rank_error(200)
+    assert sketch._size() < 3 * 200
+    for q in (0.25, 0.5, 0.75):
+        assert abs(_rank(values, sketch.quantile(q)) - q) <= sketch.error
+
+
+def test_merged_sketches_match_one_sketch():
+    values = np.random.RandomState(2).normal(size=100000)
+    parts = [KLLSketch(k=200, seed=i).update(chunk)
+             for i, chunk in enumerate(np.array_split(values, 4))]
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+
+    assert merged.n == len(values)
+    assert abs(_rank(values, merged.quantile(0.5)) - 0.5) <= merged.error
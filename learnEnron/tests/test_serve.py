@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import os
+import pickle
+import numpy as np
+import pytest
+from learnEnron import artifact, feature_engineering, feature_scaling, serve
+
+DATASET = os.path.join(os.path.dirname(__file__), "..", "..", "resources",
+                       "data", "final_project_dataset.pkl")
+FEATURES = ["poi", "bonus", "ratio_to_poi", "ratio_from_poi"]
+
+
+@pytest.fixture(scope="module")
+def raw():
+    with open(DATASET, "rb") as f:
+        data = pickle.load(f)
+    data.pop("TOTAL")
+    return data
+
+
+def test_vectorize_derives_ratios_from_raw_records(raw):
+    records = [raw["LAY KENNETH L"], {"bonus": 1}]
+    matrix, valid, errors = serve.vectorize(records, FEATURES[1:])
+
+    lay = raw["LAY KENNETH L"]
+    assert valid == [0]
+    assert matrix[0, 1] == pytest.approx(1.0 * lay["from_this_person_to_poi"] /
+                                         lay["from_messages"])
+    assert errors[1].endswith("not present")
+    # The caller's record is left untouched.
+    assert "ratio_to_poi" not in lay
+
+
+def test_scorer_scores_a_raw_pkl_row(raw, tmp_path):
+    from sklearn.linear_model import LogisticRegression
+
+    data = feature_engineering.email_ratios(raw)
+    scaling = feature_scaling.fit(data, FEATURES[1:])
+    scaled = scaling.transform(data)
+    names = sorted(scaled)
+    matrix = np.array([[scaled[n][f] for f in FEATURES[1:]] for n in names])
+    labels = [int(scaled[n]["poi"]) for n in names]
+    clf = LogisticRegression(class_weight="balanced").fit(matrix, labels)
+
+    path = str(tmp_path / "my_artifact")
+    artifact.write_bundle(path, clf, scaled, FEATURES, scaling)
+
+    clf, feature_list, scaling = serve.load_model(path)
+    scorer = serve.Scorer(clf, feature_list, scaling=scaling).start()
+    try:
+        result = scorer.score({"LAY KENNETH L": raw["LAY KENNETH L"]},
+                              timeout=10)
+    finally:
+        scorer.stop()
+
+    row = matrix[names.index("LAY KENNETH L")]
+    expected = clf.predict_proba(row[None, :])[0, 1]
+    assert result["LAY KENNETH L"]["probability"] == pytest.approx(expected)
+
+
+def test_model_without_scaling_needs_opt_in(tmp_path, capsys):
+    from sklearn.dummy import DummyClassifier
+
+    with open(str(tmp_path / serve.CLF_PICKLE_FILENAME), "wb") as f:
+        pickle.dump(DummyClassifier().fit([[0], [1]], [0, 1]), f)
+    with open(str(tmp_path / serve.FEATURE_LIST_FILENAME), "wb") as f:
+        pickle.dump(["poi", "bonus"], f)
+
+    with pytest.raises(ValueError):
+        serve.load_model(str(tmp_path))
+    with pytest.raises(SystemExit):
+        serve.main(["--artifact", str(tmp_path)])
+    assert "--unscaled" in capsys.readouterr().err
+
+    clf, feature_list, scaling = serve.load_model(str(tmp_path),
+                                                  unscaled=True)
+    assert feature_list == ["poi", "bonus"] and scaling is None
+
+
+class _BonusRule(object):
+    """POI when the bonus is over 5, records every batch size."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, matrix):
+        self.batch_sizes.append(len(matrix))
+        return (matrix[:, 0] > 5).astype(int)
+
+
+@pytest.fixture
+def scorer():
+    scorer = serve.Scorer(_BonusRule(), ["poi", "bonus"],
+                          max_wait_ms=50).start()
+    yield scorer
+    scorer.stop()
+
+
+def test_http_transport(scorer):
+    import json
+    import threading
+    from urllib.error import HTTPError
+    from urllib.request import Request, urlopen
+
+    server = serve.make_server(scorer, port=0)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    url = "http://127.0.0.1:{0}".format(server.server_address[1])
+
+    def post(body):
+        request = Request(url + "/score", body,
+                          {"Content-Type": "application/json"})
+        return json.loads(urlopen(request, timeout=10).read().decode("utf-8"))
+
+    try:
+        body = json.dumps({"records": {"A": {"bonus": 9},
+                                       "B": {"bonus": "NaN"},
+                                       "C": {}}}).encode("utf-8")
+        results = post(body)["results"]
+        assert results["A"] == {"probability": 1.0, "prediction": 1}
+        assert results["B"] == {"probability": 0.0, "prediction": 0}
+        assert results["C"]["error"].endswith("not present")
+
+        with pytest.raises(HTTPError) as error:
+            post(b"{not json")
+        assert error.value.code == 400
+        health = urlopen(url + "/health", timeout=10).read().decode("utf-8")
+        assert json.loads(health) == {"status": "ok"}
+        stats = json.loads(urlopen(url + "/stats",
+                                   timeout=10).read().decode("utf-8"))
+        assert stats["count"] == 1 and stats["batches"] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_unix_socket_transport(scorer, tmp_path):
+    import json
+    import socket
+    import threading
+
+    path = str(tmp_path / "poi.sock")
+    server = serve.make_server(scorer, unix=path)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(10)
+    try:
+        client.connect(path)
+        lines = client.makefile("rb")
+        client.sendall(b'{"records": {"A": {"bonus": 9}}}\n'
+                       b'not json\n{"stats": true}\n')
+        responses = [json.loads(lines.readline().decode("utf-8"))
+                     for _ in range(3)]
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+
+    assert responses[0] == {"results": {"A": {"probability": 1.0,
+                                              "prediction": 1}}}
+    assert responses[1] == {"error": "invalid JSON"}
+    assert responses[2]["count"] == 1
+
+
+def test_concurrent_requests_share_a_batch():
+    import threading
+
+    clf = _BonusRule()
+    # A long wait, so every request joins the first batch.
+    scorer = serve.Scorer(clf, ["poi", "bonus"], max_batch=8,
+                          max_wait_ms=2000).start()
+    results = {}
+    start = threading.Event()
+
+    def request(i):
+        start.wait()
+        results[i] = scorer.score({"P{0}".format(i): {"bonus": i}},
+                                  timeout=10)
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(8)]
+    try:
+        for thread in threads:
+            thread.start()
+        start.set()
+        for thread in threads:
+            thread.join()
+    finally:
+        scorer.stop()
+
+    assert scorer.batches == 1
+    assert max(clf.batch_sizes) == 8
+    for i in range(8):
+        assert results[i] == {"P{0}".format(i): {"probability": float(i > 5),
+                                                 "prediction": int(i > 5)}}
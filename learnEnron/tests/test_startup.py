@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import hashlib
+import importlib.util
+import io
+import os
+import pytest
+from learnEnron.mail_store import MailStore
+from .conftest import TARBALL_EMAILS
+
+STARTUP = os.path.join(os.path.dirname(__file__), "..", "..", "resources",
+                       "tools", "startup.py")
+
+
+@pytest.fixture
+def startup():
+    spec = importlib.util.spec_from_file_location("startup", STARTUP)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class _Response(object):
+    """Stand-in for urlopen's response, honouring a Range header."""
+
+    def __init__(self, payload, request):
+        start = 0
+        value = request.get_header("Range")
+        if value:
+            start = int(value.split("=")[1].rstrip("-"))
+        self.code = 206 if start else 200
+        self.body = io.BytesIO(payload[start:])
+        self.headers = {"Content-Length": str(len(payload) - start)}
+
+    def getcode(self):
+        return self.code
+
+    def read(self, size):
+        return self.body.read(size)
+
+
+def test_download_resumes_partial_file(startup, tmp_path, monkeypatch):
+    import urllib.request
+
+    payload = os.urandom(5000)
+    requests = []
+
+    def urlopen(request):
+        requests.append(request.get_header("Range"))
+        return _Response(payload, request)
+
+    monkeypatch.setattr(urllib.request, "urlopen", urlopen)
+    target = str(tmp_path / "enron.tgz")
+    with open(target + ".part", "wb") as part:
+        part.write(payload[:1200])
+
+    startup.download("http://example.invalid/enron.tgz", target,
+                     chunk_size=1000)
+
+    assert requests == ["bytes=1200-"]
+    assert not os.path.exists(target + ".part")
+    with open(target, "rb") as f:
+        assert f.read() == payload
+
+
+def test_verify_records_then_checks_digest(startup, tarball):
+    # Nothing to check a download against.
+    with pytest.raises(ValueError):
+        startup.verify(tarball)
+
+    startup.verify(tarball, record=True)
+    with open(tarball + ".sha256") as f:
+        recorded = f.read().split()[0]
+    with open(tarball, "rb") as f:
+        assert recorded == hashlib.sha256(f.read()).hexdigest()
+
+    with open(tarball, "ab") as f:
+        f.write(b"corrupt")
+    with pytest.raises(ValueError):
+        startup.verify(tarball)
+
+
+def test_ingest_streams_into_deduplicated_store(startup, tarball, tmp_path):
+    store_dir = str(tmp_path / "store")
+
+    assert startup.ingest(tarball, store_dir) == len(TARBALL_EMAILS)
+
+    with MailStore(store_dir) as store:
+        assert len(store) == len(TARBALL_EMAILS)
+        assert len(store.unique_keys()) == len(TARBALL_EMAILS) - 1
+        for key, text in TARBALL_EMAILS.items():
+            assert store.read(key) == text.encode("latin-1")
+
+
+def test_download_needs_a_known_digest(startup, tmp_path, monkeypatch):
+    import urllib.request
+
+    payload = b"corrupted resume"
+    monkeypatch.setattr(urllib.request, "urlopen",
+                        lambda request: _Response(payload, request))
+    target = str(tmp_path / "enron.tgz")
+    argv = ["--source", "http://example.invalid/enron.tgz",
+            "--tarball", target, "--store", str(tmp_path / "store")]
+
+    with pytest.raises(SystemExit):
+        startup.main(argv)
+    assert not os.path.exists(target)
+
+    with pytest.raises(SystemExit):
+        startup.main(argv + ["--sha256", "0" * 64])
+    # The bad download is neither kept nor recorded.
+    assert not os.path.exists(target)
+    assert not os.path.exists(target + ".sha256")
+
+
+def test_main_only_replaces_its_own_store(startup, tarball, tmp_path):
+    store_dir = str(tmp_path / "store")
+    os.makedirs(store_dir)
+    with open(os.path.join(store_dir, "notes.txt"), "w") as f:
+        f.write("keep me")
+
+    with pytest.raises(SystemExit):
+        startup.main(["--source", tarball, "--store", store_dir])
+    assert os.listdir(store_dir) == ["notes.txt"]
+
+    os.remove(os.path.join(store_dir, "notes.txt"))
+    for _ in range(2):
+        startup.main(["--source", tarball, "--store", store_dir])
+        with MailStore(store_dir) as store:
+            assert len(store) == len(TARBALL_EMAILS)
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import gzip
+import tarfile
+from learnEnron.parse_out_email_txt import parseOutText
+from learnEnron.tar_index import TarIndex, build_index
+from .conftest import TARBALL_EMAILS
+
+
+def test_members_read_back_across_blocks(tarball, tmp_path):
+    bgz = str(tmp_path / "enron.bgz")
+    # Small blocks, so members straddle block boundaries.
+    index = build_index(tarball, bgz, block_size=512, verbose=False)
+
+    with index:
+        assert len(index) == len(TARBALL_EMAILS)
+        assert len(index.blocks) > 3
+        for name, text in TARBALL_EMAILS.items():
+            assert name in index
+            assert index.read(name) == text.encode("latin-1")
+
+
+def test_block_gzip_is_still_a_valid_tar(tarball, tmp_path):
+    bgz = str(tmp_path / "enron.bgz")
+    build_index(tarball, bgz, block_size=512, verbose=False).close()
+
+    with gzip.open(bgz, "rb") as copy, gzip.open(tarball, "rb") as original:
+        assert copy.read() == original.read()
+    with tarfile.open(bgz, "r:gz") as tfile:
+        assert sorted(tfile.getnames()) == sorted(TARBALL_EMAILS)
+
+
+def test_reopened_index_feeds_parse_out_text(tarball, tmp_path):
+    bgz = str(tmp_path / "enron.bgz")
+    build_index(tarball, bgz, verbose=False).close()
+
+    with TarIndex(bgz) as index:
+        text = parseOutText(index.open_text("maildir/lay-k/inbox/1."),
+                            stem=False)
+    assert "Here is our forecast" in text
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import json
+import pytest
+from learnEnron import pipeline, trace
+
+
+@pytest.fixture(autouse=True)
+def stop_tracing():
+    yield
+    trace.disable()
+
+
+def test_disabled_by_default_records_nothing(tmp_path):
+    assert not trace.is_enabled()
+    with trace.span("quiet") as s:
+        pass
+    assert not hasattr(s, "wall0")
+
+
+def test_jsonl_spans_nest_and_measure_memory(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    trace.enable(path)
+
+    @trace.traced("outer")
+    def outer():
+        with trace.span("inner", rows=3):
+            block = bytearray(2 * 1024 * 1024)
+            del block
+        return 42
+
+    assert outer() == 42
+    trace.disable()
+
+    with open(path) as f:
+        events = [json.loads(line) for line in f]
+    assert [e["name"] for e in events] == ["inner", "outer"]
+    inner, outer = events
+    assert (inner["depth"], outer["depth"]) == (1, 0)
+    assert inner["rows"] == 3
+    assert inner["alloc_peak_kb"] >= 2048
+    # The child's peak counts towards the parent.
+    assert outer["alloc_peak_kb"] >= inner["alloc_peak_kb"]
+    assert outer["wall_s"] >= inner["wall_s"] >= 0
+
+
+def test_chrome_format_covers_pipeline_stages(tmp_path):
+    path = str(tmp_path / "trace.json")
+    trace.enable(path, memory=False)
+
+    pipe = pipeline.Pipeline(None, verbose=False)
+    pipe.add("load", lambda: [1, 2, 3])
+    pipe.add("total", sum, ["load"])
+    assert pipe.run("total") == 6
+    trace.disable()
+
+    with open(path) as f:
+        events = json.load(f)["traceEvents"]
+    assert sorted(e["name"] for e in events) == ["stage:load", "stage:total"]
+    assert all(e["ph"] == "X" and "cpu_s" in e["args"] for e in events)
+    assert "alloc_peak_kb" not in events[0]["args"]
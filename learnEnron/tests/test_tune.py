@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+import numpy as np
+from sklearn.exceptions import FitFailedWarning
+from learnEnron import tune
+
+
+def _data(n=60):
+    rng = np.random.RandomState(0)
+    labels = np.arange(n) % 4 == 0
+    features = rng.rand(n, 12)
+    features[:, 0] += 3 * labels
+    return features, labels.astype(int)
+
+
+def test_lr_pipe_preset_sets_the_pipeline_c():
+    features, labels = _data()
+    clf = tune.param_optimize_lr_pipe(features, labels, grid_search=False)
+    assert clf.named_steps["clf"].C == 10
+
+
+def test_gb_preset_uses_log_loss():
+    features, labels = _data()
+    clf = tune.param_optimize_gb(features, labels, grid_search=False)
+    assert clf.loss == "log_loss"
+    assert clf.predict(features).shape == labels.shape
+
+
+def test_lr_pipe_grid_keeps_k_within_the_features():
+    import warnings
+
+    features, labels = _data()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", FitFailedWarning)
+        clf = tune.param_optimize_lr_pipe(features[:, :9], labels, folds=2)
+    assert clf.named_steps["anova"].k in (6, 8, "all")
@@ -0,0 +1,246 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    trace
+    ~~~~~
+
+    Optional timing and memory tracing for the
+    poi_id pipeline, the tuners and the tester.
+
+    Every traced span records wall time, CPU time,
+    the peak RSS increase and, when memory tracing
+    is on, the tracemalloc allocation and peak
+    deltas. Spans are written as JSON lines or in
+    the Chrome trace format (chrome://tracing,
+    Perfetto).
+
+    Tracing is off by default. Turn it on with
+    enable(path) or by setting the LEARNENRON_TRACE
+    environment variable to an output path; a path
+    ending in .json gives the Chrome format.
+"""
+from __future__ import print_function
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+ENV_VAR = "LEARNENRON_TRACE"
+
+_state = {
+          "enabled": False,
+          "path": None,
+          "format": "jsonl",
+          "memory": False,
+          "events": [],
+          "stack": [],
+          "origin": 0.0
+          }
+_lock = threading.Lock()
+
+
+def _peak_rss():
+    """Peak resident set size of the process in kB."""
+
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes.
+    if os.uname()[0] == "Darwin":
+        peak //= 1024
+
+    return peak
+
+
+def enable(path, fmt=None, memory=True):
+    """
+    Start tracing.
+
+    Parameters
+    ----------
+    path = string
+        Output file.
+    fmt = string
+        "jsonl" or "chrome", defaults by file extension.
+    memory = Boolean
+        Track allocations with tracemalloc. This slows
+        Python code down, so it can be turned off.
+    """
+
+    if fmt is None:
+        fmt = "chrome" if path.endswith(".json") else "jsonl"
+    if fmt not in ("jsonl", "chrome"):
+        raise ValueError("fmt must be 'jsonl' or 'chrome'")
+
+    _state.update(enabled=True, path=path, format=fmt, memory=memory,
+                  events=[], stack=[], origin=time.time())
+
+    if fmt == "jsonl":
+        # Start a fresh file, events are appended as they end.
+        open(path, "w").close()
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    if not _state.get("registered"):
+        atexit.register(disable)
+        _state["registered"] = True
+
+
+def disable():
+    """Stop tracing and write any buffered events."""
+
+    if not _state["enabled"]:
+        return
+
+    if _state["format"] == "chrome":
+        with open(_state["path"], "w") as out:
+            json.dump({"traceEvents": _state["events"],
+                       "displayTimeUnit": "ms"}, out)
+    if _state["memory"] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+    _state.update(enabled=False, events=[], stack=[])
+
+
+def is_enabled():
+    return _state["enabled"]
+
+
+def _write(event):
+    with _lock:
+        if _state["format"] == "chrome":
+            _state["events"].append(event)
+        else:
+            with open(_state["path"], "a") as out:
+                out.write(json.dumps(event) + "\n")
+
+
+class span(object):
+    """
+    Context manager tracing one block of code.
+
+    Example
+    -------
+    with trace.span("featureFormat", rows=len(data)):
+        data = featureFormat(data, features)
+
+    Parameters
+    ----------
+    name = string
+        Name of the span.
+    **args
+        Extra values stored with the event.
+    """
+
+    def __init__(self, name, **args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        if not _state["enabled"]:
+            return self
+
+        self.peak = 0
+        if _state["memory"]:
+            current, peak = tracemalloc.get_traced_memory()
+            # Hand the peak so far to the enclosing span
+            # before resetting it for this one.
+            if _state["stack"]:
+                parent = _state["stack"][-1]
+                parent.peak = max(parent.peak, peak - parent.mem0)
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            self.mem0 = current
+
+        _state["stack"].append(self)
+        self.rss0 = _peak_rss()
+        self.cpu0 = time.process_time()
+        self.wall0 = time.time()
+
+        return self
+
+    def __exit__(self, *exc):
+        if not _state["enabled"] or not _state["stack"]:
+            return False
+
+        wall = time.time() - self.wall0
+        cpu = time.process_time() - self.cpu0
+        _state["stack"].pop()
+
+        args = dict(self.args)
+        args.update(
+                    wall_s=round(wall, 6),
+                    cpu_s=round(cpu, 6),
+                    peak_rss_delta_kb=_peak_rss() - self.rss0
+                    )
+
+        if _state["memory"]:
+            current, peak = tracemalloc.get_traced_memory()
+            self.peak = max(self.peak, peak - self.mem0)
+            args.update(
+                        alloc_delta_kb=round((current - self.mem0) / 1024.0, 1),
+                        alloc_peak_kb=round(self.peak / 1024.0, 1)
+                        )
+            if _state["stack"]:
+                parent = _state["stack"][-1]
+                parent.peak = max(parent.peak, self.peak + self.mem0 - parent.mem0)
+
+        if _state["format"] == "chrome":
+            event = {
+                     "name": self.name,
+                     "ph": "X",
+                     "ts": round((self.wall0 - _state["origin"]) * 1e6),
+                     "dur": round(wall * 1e6),
+                     "pid": os.getpid(),
+                     "tid": threading.current_thread().ident,
+                     "args": args
+                     }
+        else:
+            event = {
+                     "name": self.name,
+                     "start": self.wall0,
+                     "depth": len(_state["stack"])
+                     }
+            event.update(args)
+        _write(event)
+
+        return False
+
+
+def traced(name=None):
+    """
+    Decorator tracing every call of a function.
+
+    Example
+    -------
+    @trace.traced("tune.param_optimize_lr")
+    def param_optimize_lr(features, labels):
+        ...
+    """
+
+    def decorator(func):
+        span_name = name or "{0}.{1}".format(func.__module__, func.__name__)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state["enabled"]:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+if os.environ.get(ENV_VAR):
+    enable(os.environ[ENV_VAR])
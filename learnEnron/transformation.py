@@ -4,7 +4,6 @@ before creating figures.
 """
 
 import numpy as np
-import pandas as pd
 
 
 def log_10(x):
@@ -12,16 +12,28 @@
     machine learning algorithm.
 """
 
-from sklearn.model_selection import GridSearchCV, StratifiedKFold
-from sklearn import (
-                     ensemble,
-                     linear_model,
-                     feature_selection,
-                     pipeline,
-                     decomposition
-                     )
+from . import feature_format, trace
 
+# scikit-learn is imported inside each function, so
+# importing this module stays cheap for scoring jobs.
 
+
+def _best_estimator(search, features, labels):
+    """Fit a GridSearchCV and return its best estimator."""
+
+    # One array for every fit, float32 features stay float32.
+    features = feature_format.as_float(features)
+
+    # Will take time...
+    search.fit(features, labels)
+
+    print("Best classifier score:", search.best_score_, ":",
+          search.best_params_)
+
+    return search.best_estimator_
+
+
+@trace.traced("tune.param_optimize_gb")
 def param_optimize_gb(features, labels, grid_search=True):
     """
     Hyper parameter optimization
@@ -44,6 +56,9 @@ def param_optimize_gb(features, labels, grid_search=True):
         parameter optimization.
     """
 
+    from sklearn import ensemble
+    from sklearn.model_selection import GridSearchCV, StratifiedKFold
+
     # How many splits
     n = 2
     cv = StratifiedKFold(n_splits=n, shuffle=True)
@@ -55,7 +70,7 @@ def param_optimize_gb(features, labels, grid_search=True):
     clf = ensemble.GradientBoostingClassifier()
 
     parameters = [{
-                   "loss": ["deviance", "exponential"],
+                   "loss": ["log_loss", "exponential"],
                    "n_estimators": [120, 300, 500, 800, 1200],
                    "max_depth": [3, 5, 7, 9, 12, 15, 17, 25],
                    "min_samples_split": [2, 5, 10, 15, 100],
@@ -71,7 +86,7 @@ def param_optimize_gb(features, labels, grid_search=True):
                        'subsample': [0.8],
                        'n_estimators': [120],
                        'max_depth': [25],
-                       'loss': ['deviance'],
+                       'loss': ['log_loss'],
                        'min_samples_split': [2],
                        'min_samples_leaf': [2],
                        'max_features': ['sqrt']
@@ -84,16 +99,10 @@ def param_optimize_gb(features, labels, grid_search=True):
                        scoring=score
                        )
 
-    # Will take time...
-    clf.fit(features, labels)
-
-    print("Best classifier score:", clf.best_score_, ":", clf.best_params_)
-
-    clf = clf.best_estimator_
-
-    return clf
+    return _best_estimator(clf, features, labels)
 
 
+@trace.traced("tune.param_optimize_lr")
 def param_optimize_lr(features, labels, grid_search=True, folds=2):
     """
     Hyper parameter optimization
@@ -116,6 +125,9 @@ def param_optimize_lr(features, labels, grid_search=True, folds=2):
         parameter optimization.
     """
 
+    from sklearn import linear_model
+    from sklearn.model_selection import GridSearchCV, StratifiedKFold
+
     # How many splits
     n = folds
     cv = StratifiedKFold(n_splits=n, shuffle=True)
@@ -144,16 +156,10 @@ def param_optimize_lr(features, labels, grid_search=True, folds=2):
                        scoring=score
                        )
 
-    # Will take time...
-    clf.fit(features, labels)
-
-    print("Best classifier score:", clf.best_score_, ":", clf.best_params_)
-
-    clf = clf.best_estimator_
-
-    return clf
+    return _best_estimator(clf, features, labels)
 
 
+@trace.traced("tune.param_optimize_lr_pipe")
 def param_optimize_lr_pipe(features, labels, grid_search=True, folds=2):
     """
     Hyper parameter optimization
@@ -178,6 +184,14 @@ def param_optimize_lr_pipe(features, labels, grid_search=True, folds=2):
         parameter optimization.
     """
 
+    from sklearn import (
+                         linear_model,
+                         feature_selection,
+                         pipeline,
+                         decomposition
+                         )
+    from sklearn.model_selection import GridSearchCV, StratifiedKFold
+
     # Create an anova feature selection for classification.
     anovafilter = feature_selection.SelectKBest(feature_selection.f_classif)
 
@@ -203,8 +217,13 @@ def param_optimize_lr_pipe(features, labels, grid_search=True, folds=2):
     #
     # Pipeline steps can be ignored by setting None.
 
+    # Feature selection before tuning (e.g. rfe) can leave
+    # fewer features than the largest k, "all" covers them.
+    n_features = len(features[0])
+    anova_k = [k for k in [6, 8, 10, 12] if k < n_features] + ["all"]
+
     parameters = [{
-                   "anova__k": [6, 8, 10, 12, "all"],
+                   "anova__k": anova_k,
                    "r_dim__n_components": [2, 4],
                    "r_dim__whiten": [True, False],
                    "clf__C": [0.01, 0.1, 1, 10, 100],
@@ -215,7 +234,7 @@ def param_optimize_lr_pipe(features, labels, grid_search=True, folds=2):
     # search of all parameters.
     if grid_search is not True:
         parameters = [{
-                       "C": [10]
+                       "clf__C": [10]
                        }]
 
     clf = GridSearchCV(
@@ -225,11 +244,4 @@ def param_optimize_lr_pipe(features, labels, grid_search=True, folds=2):
                        scoring=score
                        )
 
-    # Will take time...
-    clf.fit(features, labels)
-
-    print("Best classifier score:", clf.best_score_, ":", clf.best_params_)
-
-    clf = clf.best_estimator_
-
-    return clf
+    return _best_estimator(clf, features, labels)
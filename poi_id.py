@@ -5,23 +5,33 @@ import pickle
 import os
 from tester import dump_classifier_and_data
 from learnEnron import (
+                        columnar,
                         feature_format,
                         feature_engineering,
                         feature_selection,
                         feature_scaling,
+                        outliers,
+                        pipeline,
+                        trace,
                         tune
                         )
 
 ro = True  # Outlier selection
 fs = True  # Feature selection
+ss = False  # Stability selection over resampled fits instead of one fit
+rfe = False  # Cross validated recursive feature elimination instead
 fe = True  # Feature engineering
 sc = True  # Feature scaling
 tu = True  # Cross validation and parameter optimization
+f32 = False  # Compute in float32 instead of float64, see learnEnron/drift.py
 
 gb = False  # Use gradient boosting
 lr = True  # Use logistic regression
 pipe = True  # Use pipe > anova features > pca > classifer
 
+cache = True  # Reuse unchanged stage outputs from earlier runs
+tr = False  # Write a per-stage timing and memory trace
+
 
 # Features_list is a list of strings, each of which is a feature name.
 # The first feature must be "poi".
@@ -53,85 +63,168 @@ features_list = ['poi',
 file_dir = os.path.dirname(os.path.realpath(__file__))
 f = os.path.join(file_dir, "resources", "data", "final_project_dataset.pkl")
 
-# Changed to rb for python to read binary
-with open(f, "rb") as data_file:
-    data_dict = pickle.load(data_file)
+# Stage outputs are cached here, keyed by a hash of each
+# stage's code, parameters and inputs. Changing one flag
+# only recomputes the stages downstream of it.
+cache_dir = os.path.join(file_dir, ".pipeline_cache")
+
+# JSON lines trace, one event per stage and tune call.
+# Name it .json instead to open it in chrome://tracing.
+trace_file = os.path.join(file_dir, "poi_id_trace.jsonl")
+
+
+def load_data(path, digest):
+    # Changed to rb for python to read binary
+    with open(path, "rb") as data_file:
+        # Typed columns with missing-value masks
+        # instead of "NaN" strings from here on.
+        return columnar.from_datadict(pickle.load(data_file))
+
+
+def remove_outliers(data_dict, enabled, dtype):
+    # Screened in float64: rounded to float32, the TOTAL
+    # row no longer equals the sum of the other rows.
+    if enabled:
+        data_dict, report = outliers.screen(data_dict)
+        print(outliers.format_report(report))
+    # Later stages keep the dtype of the columns.
+    return data_dict.astype(dtype)
+
 
-# Remove outliers
-if ro:
-    # Total of all people
-    data_dict.pop("TOTAL", None)
-    # Not a person
-    data_dict.pop("THE TRAVEL AGENCY IN THE PARK", None)
-    # Only contains missing values
-    data_dict.pop("LOCKHART E", None)
+def engineer_features(data_dict, enabled):
+    if enabled:
+        data_dict = feature_engineering.email_ratios(data_dict)
+    return data_dict
 
-# Feature engineering
-if fe:
-    data_dict = feature_engineering.email_ratios(data_dict)
 
 # Feature selection
 #
 # When pipe is True an ANOVA feature selction using
 # KBest feature selection is used during GridSearchCV.
 # This is more effective than this feature selection approach.
-if fs:
-    # Chooses an AdaBoost classifier for feature selection.
-    #
-    # Overwrite this to try different SkLearn Classifiers.
-    clf_fs = feature_selection.get_fs_clf()
-    # Overwrite feature list after feature selection
-    features_list = feature_selection.selection(
-                                                 data_dict,
-                                                 features_list,
-                                                 clf_fs,
-                                                 cut_off=0.01
-                                                 )
-
-    print("Features to be used after feature selection:")
-    print(features_list)
-
-# Feature scaling
-if sc:
-    data_dict = feature_scaling.scale(data_dict, features_list)
-    print("All features scaled")
-
-# Store to my_dataset for easy export below.
-my_dataset = data_dict
-
-# Extract features and labels from dataset for local testing
-data = feature_format.featureFormat(
-                                    my_dataset,
-                                    features_list,
-                                    sort_keys=True
-                                    )
-labels, features = feature_format.targetFeatureSplit(data)
+#
+# rfe = True replaces the one-shot cut off with cross validated
+# recursive feature elimination, keeping the best scoring step.
+def select_features(data_dict, features_list, enabled, cut_off,
+                    stability=False, recursive=False):
+    features_list = list(features_list)
+    if enabled:
+        # Chooses an AdaBoost classifier for feature selection.
+        #
+        # Overwrite this to try different SkLearn Classifiers.
+        clf_fs = feature_selection.get_fs_clf()
+        # Overwrite feature list after feature selection
+        if recursive:
+            features_list, _ = feature_selection.rfe_cv(
+                                                     data_dict,
+                                                     features_list,
+                                                     clf_fs
+                                                     )
+        elif stability:
+            features_list, _ = feature_selection.stability_selection(
+                                                     data_dict,
+                                                     features_list,
+                                                     clf_fs,
+                                                     cut_off=cut_off
+                                                     )
+        else:
+            features_list = feature_selection.selection(
+                                                     data_dict,
+                                                     features_list,
+                                                     clf_fs,
+                                                     cut_off=cut_off
+                                                     )
+
+        print("Features to be used after feature selection:")
+        print(features_list)
+    return features_list
+
+
+def fit_scaling(data_dict, features_list, enabled):
+    # Kept with the model artifact to scale new records.
+    if enabled:
+        return feature_scaling.fit(data_dict, features_list)
+    return None
+
 
+def scale_features(data_dict, scaling):
+    if scaling is not None:
+        data_dict = scaling.transform(data_dict)
+        print("All features scaled")
+    return data_dict
+
+
+def format_features(my_dataset, features_list):
+    # Extract features and labels from dataset for local testing
+    data = feature_format.featureFormat(
+                                        my_dataset,
+                                        features_list,
+                                        sort_keys=True
+                                        )
+    return feature_format.targetFeatureSplit(data)
+
+
+# Tune the classifier to achieve better than .3 precision and recall
+#
 # No train test split is used.
 #
 # Final validation uses tester.py to compare to a test set.
 #
 # GridSearch CV involves an inner-loop stratified K-Fold
 # cross validation.
-features_train = features
-labels_train = labels
-
-# Tune the classifier to achieve better than .3 precision and recall
 #
 # View the tune module for details on full implementation.
-if tu:
-
-    if gb:
-        clf = tune.param_optimize_gb(features_train, labels_train,
-                                     grid_search=False)
-
-    if lr:
-        if pipe:
-            clf = tune.param_optimize_lr_pipe(features_train, labels_train,
-                                              grid_search=True, folds=3)
-        else:
-            clf = tune.param_optimize_lr(features_train, labels_train,
-                                         grid_search=True)
-
-# Dump the classifier, dataset, and features_list
-dump_classifier_and_data(clf, my_dataset, features_list)
+def tune_classifier(formatted, enabled, gb, lr, pipe):
+    labels_train, features_train = formatted
+    clf = None
+    if enabled:
+
+        if gb:
+            clf = tune.param_optimize_gb(features_train, labels_train,
+                                         grid_search=False)
+
+        if lr:
+            if pipe:
+                clf = tune.param_optimize_lr_pipe(features_train, labels_train,
+                                                  grid_search=True, folds=3)
+            else:
+                clf = tune.param_optimize_lr(features_train, labels_train,
+                                             grid_search=True)
+    return clf
+
+
+def build_pipeline():
+    stages = pipeline.Pipeline(cache_dir if cache else None)
+    stages.add("load", load_data,
+               params={"path": f, "digest": pipeline.file_digest(f)})
+    stages.add("outliers", remove_outliers, ["load"],
+               {"enabled": ro, "dtype": "float32" if f32 else "float64"})
+    stages.add("email_ratios", engineer_features, ["outliers"],
+               {"enabled": fe})
+    stages.add("selection", select_features, ["email_ratios"],
+               {"features_list": features_list, "enabled": fs,
+                "cut_off": 0.01, "stability": ss,
+                "recursive": rfe})
+    stages.add("scaling", fit_scaling, ["email_ratios", "selection"],
+               {"enabled": sc})
+    stages.add("scale", scale_features, ["email_ratios", "scaling"])
+    stages.add("featureFormat", format_features, ["scale", "selection"])
+    stages.add("tune", tune_classifier, ["featureFormat"],
+               {"enabled": tu, "gb": gb, "lr": lr, "pipe": pipe})
+    return stages
+
+
+if __name__ == '__main__':
+    if tr:
+        trace.enable(trace_file)
+
+    stages = build_pipeline()
+
+    clf = stages.run("tune")
+    # Store to my_dataset for easy export below.
+    my_dataset = stages.run("scale")
+    features_list = stages.run("selection")
+
+    # Dump the classifier, dataset, features_list and fitted scaling
+    dump_classifier_and_data(clf, my_dataset, features_list,
+                             scaling=stages.run("scaling"))
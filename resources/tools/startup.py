@@ -1,49 +1,260 @@
 #!/usr/bin/python
-from __future__ import print_function
+"""
+    startup
+    ~~~~~~~
 
+    Check dependencies and acquire the Enron corpus.
 
-print()
-print("checking for nltk")
-try:
-    import nltk
-except ImportError:
-    print("you should install nltk before continuing")
-
-print("checking for numpy")
-try:
-    import numpy
-except ImportError:
-    print("you should install numpy before continuing")
-
-print("checking for scipy")
-try:
-    import scipy
-except:
-    print("you should install scipy before continuing")
-
-print("checking for sklearn")
-try:
-    import sklearn
-except:
-    print("you should install sklearn before continuing")
-
-print()
-print("downloading the Enron dataset (this may take a while)")
-print("to check on progress, you can cd up one level, then execute <ls -lthr>")
-print("Enron dataset should be last item on the list, along with its current size")
-print("download will complete at about 423 MB")
-import urllib
-url = "https://www.cs.cmu.edu/~./enron/enron_mail_20150507.tgz"
-urllib.request.urlretrieve(url, filename="../enron_mail_20150507.tgz")
-print("download complete!")
-
-
-print()
-print("unzipping Enron dataset (this may take a while)")
-import tarfile
+    The tarball is taken from a local path or downloaded
+    from a URL. Partial downloads are resumed, the
+    sha256 checksum is verified (a download needs the
+    expected digest from --sha256), and the archive is
+    stream-decompressed straight into an indexed mail
+    store (see learnEnron.mail_store) instead of being
+    extracted into hundreds of thousands of files.
+
+    usage: startup.py [--source URL_OR_PATH] [--sha256 HEX]
+                      [--store DIR] [--keep-duplicates] [--extract]
+"""
+from __future__ import print_function
+import argparse
 import os
-os.chdir("..")
-tfile = tarfile.open("enron_mail_20150507.tgz", "r:gz")
-tfile.extractall(".")
+import re
+import shutil
+import sys
+import tarfile
+
+file_dir = os.path.dirname(os.path.realpath(__file__))
+resources_dir = os.path.dirname(file_dir)
+sys.path.append(os.path.dirname(resources_dir))
+
+URL = "https://www.cs.cmu.edu/~./enron/enron_mail_20150507.tgz"
+TARBALL = os.path.join(resources_dir, "enron_mail_20150507.tgz")
+STORE_DIR = os.path.join(resources_dir, "enron_store")
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def check_dependencies():
+    """Report any missing packages."""
+
+    for package in ["nltk", "numpy", "scipy", "sklearn"]:
+        print("checking for", package)
+        try:
+            __import__(package)
+        except ImportError:
+            print("you should install", package, "before continuing")
+
+
+def report(done, total):
+    """Print download or ingest progress on one line."""
+
+    if total:
+        print("\r{0:.1f} / {1:.1f} MB ({2:.0%})".format(
+              done / 1e6, total / 1e6, 1.0 * done / total), end="")
+    else:
+        print("\r{0:.1f} MB".format(done / 1e6), end="")
+    sys.stdout.flush()
+
+
+def download(url, filename, chunk_size=CHUNK_SIZE):
+    """
+    Download url to filename, resuming from
+    filename + ".part" if an earlier run stopped.
+
+    Parameters
+    ----------
+    url = string
+        Location of the tarball.
+    filename = string
+        Destination path.
+    """
+
+    from urllib.request import Request, urlopen
+
+    part = filename + ".part"
+    done = os.path.getsize(part) if os.path.exists(part) else 0
+
+    request = Request(url)
+    if done:
+        request.add_header("Range", "bytes={0}-".format(done))
+    response = urlopen(request)
+
+    # A server that ignores the range sends the whole file again.
+    if done and response.getcode() != 206:
+        done = 0
+    mode = "ab" if done else "wb"
+
+    length = response.headers.get("Content-Length")
+    total = done + int(length) if length else None
+    if done:
+        print("resuming download at {0:.1f} MB".format(done / 1e6))
+
+    with open(part, mode) as out:
+        while True:
+            chunk = response.read(chunk_size)
+            if not chunk:
+                break
+            out.write(chunk)
+            done += len(chunk)
+            report(done, total)
+    print()
+
+    os.rename(part, filename)
+
+
+def verify(filename, expected=None, record=False):
+    """
+    Check the tarball against a checksum.
+
+    The expected digest comes from the argument or
+    from a filename + ".sha256" file written on an
+    earlier verified run. With neither, a ValueError
+    is raised, unless record is True (for a tarball
+    the user supplied): the digest is then recorded
+    so later runs can check against it.
+    """
+
+    checksum_file = filename + ".sha256"
+    if expected is None and os.path.exists(checksum_file):
+        with open(checksum_file) as f:
+            expected = f.read().split()[0]
+    if expected is None and not record:
+        raise ValueError("no known sha256 for {0}, pass --sha256"
+                         .format(filename))
+
+    from learnEnron.fileutil import file_digest
+
+    print("verifying checksum")
+    actual = file_digest(filename)
+    if expected is not None and actual != expected.lower():
+        raise ValueError("checksum mismatch for {0}: expected {1}, got {2}"
+                         .format(filename, expected, actual))
+
+    with open(checksum_file, "w") as f:
+        f.write("{0}  {1}\n".format(actual, os.path.basename(filename)))
+    print("sha256", actual)
+
+
+def remove_store(store_dir):
+    """
+    Remove a mail store written by an earlier run.
+
+    Only a directory holding nothing but a mail
+    store index and its shards is removed, anything
+    else raises a ValueError.
+    """
+
+    from learnEnron.mail_store import INDEX_FILENAME
+
+    if not os.path.exists(store_dir):
+        return
+
+    names = os.listdir(store_dir)
+    store_files = re.compile(r"^(shard_\d+\.dat|{0}(\.tmp)?)$".format(
+                             re.escape(INDEX_FILENAME)))
+    if names and (INDEX_FILENAME not in names or
+                  not all(store_files.match(name) for name in names)):
+        raise ValueError("{0} is not a mail store, not removing it"
+                         .format(store_dir))
+
+    shutil.rmtree(store_dir)
+
+
+def ingest(filename, store_dir, dedup=True):
+    """
+    Stream-decompress the tarball into a mail store
+    in a single sequential read. With dedup, copies
+    of a message found in several folders are stored
+    once and mapped to the canonical copy.
+
+    Returns
+    -------
+    n = int
+        Number of messages stored.
+    """
+
+    from learnEnron.mail_store import MailStoreWriter
+
+    total = os.path.getsize(filename)
+    n = 0
+    with open(filename, "rb") as raw, \
+            tarfile.open(fileobj=raw, mode="r|gz") as tfile, \
+            MailStoreWriter(store_dir, dedup=dedup) as store:
+        for member in tfile:
+            if not member.isfile():
+                continue
+            store.add(member.name, tfile.extractfile(member).read())
+            n += 1
+            if n % 10000 == 0:
+                report(raw.tell(), total)
+        print()
+        if store.dedup is not None:
+            print(store.dedup.n_duplicates, "duplicates eliminated")
+
+    return n
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--source", default=URL,
+                        help="URL or local path of the tarball")
+    parser.add_argument("--tarball", default=TARBALL,
+                        help="where to keep the downloaded tarball")
+    parser.add_argument("--sha256", default=None,
+                        help="expected sha256 of the tarball")
+    parser.add_argument("--store", default=STORE_DIR,
+                        help="mail store directory to create")
+    parser.add_argument("--keep-duplicates", action="store_true",
+                        help="store every copy of duplicated messages")
+    parser.add_argument("--extract", action="store_true",
+                        help="also extract the maildir directory tree")
+    args = parser.parse_args(argv)
+
+    print()
+    check_dependencies()
+
+    print()
+    local = os.path.exists(args.source)
+    if local:
+        tarball = args.source
+        print("using local Enron dataset", tarball)
+    else:
+        tarball = args.tarball
+        if (args.sha256 is None and
+                not os.path.exists(tarball + ".sha256")):
+            parser.error("--sha256 is needed to verify the download")
+        if os.path.exists(tarball):
+            print("Enron dataset already downloaded")
+        else:
+            print("downloading the Enron dataset (about 423 MB)")
+            download(args.source, tarball)
+            print("download complete!")
+
+    try:
+        verify(tarball, args.sha256, record=local)
+    except ValueError as error:
+        if not local:
+            # Corrupt, download it again on the next run.
+            os.remove(tarball)
+        parser.error(str(error))
+
+    print()
+    print("ingesting Enron dataset into", args.store)
+    try:
+        remove_store(args.store)
+    except ValueError as error:
+        parser.error(str(error))
+    n = ingest(tarball, args.store, dedup=not args.keep_duplicates)
+    print("stored", n, "emails")
+
+    if args.extract:
+        print("unzipping Enron dataset (this may take a while)")
+        with tarfile.open(tarball, "r:gz") as tfile:
+            tfile.extractall(os.path.dirname(os.path.abspath(tarball)))
+
+    print("you're ready to go!")
+
 
-print("you're ready to go!")
+if __name__ == '__main__':
+    main()
@@ -8,13 +8,16 @@
     my_feature_list.pkl, respectively
 
     that process should happen at the end of poi_id.py
+
+    poi_id.py also writes a my_artifact bundle (see
+    learnEnron/artifact.py), which is preferred when
+    present
 """
 
 from __future__ import print_function
 import pickle
 from time import time
-from sklearn import model_selection, cross_validation
-from learnEnron import feature_format
+from learnEnron import artifact, feature_format, trace
 
 PERF_FORMAT_STRING = "\
 \tAccuracy: {:>0.{display_precision}f}\tPrecision: {:>0.{display_precision}f}\t\
@@ -23,10 +26,19 @@ RESULTS_FORMAT_STRING = "\tTotal predictions: {:4d}\tTrue positives: {:4d}\tFals
 \tFalse negatives: {:4d}\tTrue negatives: {:4d}"
 
 
-def test_classifier(clf, dataset, feature_list, folds=1000):
-    data = feature_format.featureFormat(dataset, feature_list, sort_keys=True)
+@trace.traced("tester.test_classifier")
+def test_classifier(clf, dataset, feature_list, folds=1000, dtype=None):
+    """
+    dtype is the dtype of the feature matrix,
+    see featureFormat.
+    """
+
+    from sklearn import model_selection
+
+    data = feature_format.featureFormat(dataset, feature_list, sort_keys=True,
+                                        dtype=dtype)
     labels, features = feature_format.targetFeatureSplit(data)
-    cv = cross_validation.StratifiedShuffleSplit(labels, folds, random_state=42)
+    cv = model_selection.StratifiedShuffleSplit(n_splits=folds, random_state=42)
 
     true_negatives = 0
     false_negatives = 0
@@ -34,7 +46,7 @@ def test_classifier(clf, dataset, feature_list, folds=1000):
     false_positives = 0
     
     t0 = time()
-    for train_idx, test_idx in cv:
+    for train_idx, test_idx in cv.split(features, labels):
         features_train = []
         features_test = []
         labels_train = []
@@ -109,9 +121,31 @@ def test_classifier(clf, dataset, feature_list, folds=1000):
 CLF_PICKLE_FILENAME = "my_classifier.pkl"
 DATASET_PICKLE_FILENAME = "my_dataset.pkl"
 FEATURE_LIST_FILENAME = "my_feature_list.pkl"
+ARTIFACT_DIRNAME = "my_artifact"
+
+
+def dump_classifier_and_data(clf, dataset, feature_list, legacy=True,
+                             scaling=None):
+    """
+    Write the artifact bundle, and the three
+    pickle files as well if legacy is True.
+
+    The pickled dataset is always a plain dict of
+    dicts, so loaders without learnEnron can read it.
 
+    scaling is the fitted feature_scaling.ScalingTransform,
+    kept in the bundle for scoring new records.
+    """
+
+    artifact.write_bundle(ARTIFACT_DIRNAME, clf, dataset, feature_list,
+                          scaling)
+    if not legacy:
+        return
+
+    if hasattr(dataset, "to_datadict"):
+        # columnar.TypedDataset
+        dataset = dataset.to_datadict()
 
-def dump_classifier_and_data(clf, dataset, feature_list):
     with open(CLF_PICKLE_FILENAME, "wb") as clf_outfile:
         pickle.dump(clf, clf_outfile)
     with open(DATASET_PICKLE_FILENAME, "wb") as dataset_outfile:
@@ -120,7 +154,19 @@ def dump_classifier_and_data(clf, dataset, feature_list):
         pickle.dump(feature_list, featurelist_outfile)
 
 
-def load_classifier_and_data():
+def load_classifier_and_data(verify=True):
+    """
+    Load from the artifact bundle if there is one,
+    from the three pickle files otherwise.
+
+    The dataset of a bundle has the dtype the bundle
+    was written in as its dtype attribute.
+    """
+
+    if artifact.is_bundle(ARTIFACT_DIRNAME):
+        bundle = artifact.ArtifactBundle(ARTIFACT_DIRNAME, verify=verify)
+        return bundle.classifier, bundle.dataset, bundle.feature_list
+
     with open(CLF_PICKLE_FILENAME, "rb") as clf_infile:
         clf = pickle.load(clf_infile)
     with open(DATASET_PICKLE_FILENAME, "rb") as dataset_infile:
@@ -133,8 +179,9 @@ def load_classifier_and_data():
 def main():
     # load up student's classifier, dataset, and feature_list
     clf, dataset, feature_list = load_classifier_and_data()
-    # Run testing script
-    test_classifier(clf, dataset, feature_list)
+    # Run testing script, in float32 if poi_id.py ran in float32
+    test_classifier(clf, dataset, feature_list,
+                    dtype=getattr(dataset, "dtype", None))
 
 
 if __name__ == '__main__':